@@ -1,10 +1,22 @@
-from typing import List, Set, Tuple
+from typing import List, Set, Tuple, Union
+
+import numpy as np
+
+from instrumentation import count, timed
+from phase_labels import PhaseCodes, PhaseLabels, encode_phases
+from scoring import indices_to_mask, score_phases
 
 DEFAULT_OVULATION_FORGIVENESS_WINDOW_DAYS = 3
 
+# Only the string "missing" is excluded from scoring. Any other label that is
+# not a phase name (NaN, "Luteal", ...) is scored as an ordinary non-luteal,
+# non-fertile day, as these functions always have.
+_UNKNOWN_LABEL = PhaseCodes.FOLLICULAR
 
+
+@timed()
 def compute_accuracy(
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     luteal_preds: Set[int],
     warmup_period: int = 0
 ) -> Tuple[float, int, int]:
@@ -14,11 +26,12 @@ def compute_accuracy(
     A correct prediction means:
         - If true label is 'luteal' or 'ovulation', index must be in luteal_preds.
         - If true label is anything else, index must NOT be in luteal_preds.
-        - 'missing' labels are excluded from the accuracy denominator.
+        - 'missing' labels are excluded from the accuracy denominator; any
+          other unrecognized label (e.g. NaN) counts as non-luteal.
 
     Parameters
     ----------
-    labels : List[str]
+    labels : List[str] or PhaseLabels
         Ground-truth phase labels.
     luteal_preds : set of int
         Indices predicted to be luteal or ovulation.
@@ -34,25 +47,15 @@ def compute_accuracy(
     total_considered : int
         Total valid labels considered (excluding warmup + missing).
     """
-    total_correct = 0
-    total_missing = 0
-
-    for i in range(warmup_period, len(labels)):
-        label = labels[i]
-
-        if label == "missing":
-            total_missing += 1
-            continue
-
-        if label in ("luteal", "ovulation"):
-            if i in luteal_preds:
-                total_correct += 1
-        else:
-            # Anything NOT predicted luteal is considered correct follicular
-            if i not in luteal_preds:
-                total_correct += 1
-
-    total_considered = len(labels) - warmup_period - total_missing
+    codes = encode_phases(labels, unknown=_UNKNOWN_LABEL)
+    scores = score_phases(
+        codes, indices_to_mask(luteal_preds, len(codes)), warmup_period=warmup_period
+    )["luteal"]
+
+    total_correct = int(scores["tp"] + scores["tn"])
+    total_considered = int(scores["considered"])
+    count("days_scored", total_considered)
+    total_missing = max(0, len(labels) - warmup_period) - total_considered
     print(f"Out of {len(labels)} labels, {total_missing} are missing")
 
     if total_considered == 0:
@@ -61,8 +64,9 @@ def compute_accuracy(
     return total_correct / total_considered, total_correct, total_considered
 
 
+@timed()
 def compute_ovulation_accuracy(
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     ovulation_preds: Set[int],
     warmup_period: int = 0,
     ovulation_forgiveness_window_days: int = DEFAULT_OVULATION_FORGIVENESS_WINDOW_DAYS
@@ -74,7 +78,7 @@ def compute_ovulation_accuracy(
 
     Parameters
     ----------
-    labels : List[str]
+    labels : List[str] or PhaseLabels
         Ground-truth labels.
     ovulation_preds : set of int
         Indices predicted as ovulation.
@@ -89,30 +93,32 @@ def compute_ovulation_accuracy(
     total_correct : int
     total_considered : int  # number of true ovulation labels
     """
-    total_correct = 0
-
-    # Count true ovulation labels in the considered region
-    total_considered = labels[warmup_period:].count("ovulation")
-
+    # Pad both ends so predictions just outside the series can still match within the window
+    pad = max(0, ovulation_forgiveness_window_days)
+    codes = encode_phases(labels, unknown=_UNKNOWN_LABEL)
+    codes = np.pad(codes, (pad, pad))
+
+    scores = score_phases(
+        codes,
+        luteal_mask=None,
+        ovulation_mask=indices_to_mask((idx + pad for idx in ovulation_preds), len(codes)),
+        warmup_period=warmup_period + pad,
+        ovulation_forgiveness_window_days=ovulation_forgiveness_window_days,
+    )["ovulation"]
+
+    total_considered = int(scores["considered"])
+    count("ovulation_days_scored", total_considered)
     if total_considered == 0:
         return 0.0, 0, 0
 
-    for pred_idx in ovulation_preds:
-        # Check window bounds
-        start = max(warmup_period, pred_idx - ovulation_forgiveness_window_days)
-        end = min(len(labels) - 1, pred_idx + ovulation_forgiveness_window_days)
-
-        for j in range(start, end + 1):
-            if labels[j] == "ovulation":
-                total_correct += 1
-                break
-
+    total_correct = int(scores["tp"])
     accuracy = total_correct / total_considered
     return accuracy, total_correct, total_considered
 
 
+@timed()
 def compute_fertility_accuracy(
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     fertility_preds: Set[int],
     warmup_period: int = 0
 ) -> Tuple[float, int, int]:
@@ -122,7 +128,7 @@ def compute_fertility_accuracy(
 
     Parameters
     ----------
-    labels : List[str]
+    labels : List[str] or PhaseLabels
         Ground-truth cycle phase labels.
     fertility_preds : set of int
         Predicted fertile/ovulation indices.
@@ -135,20 +141,19 @@ def compute_fertility_accuracy(
     total_correct : int
     total_considered : int  # true ovulation + fertile labels
     """
-    total_correct = 0
-
-    # Count ground-truth fertile-related labels
-    total_considered = (
-        labels[warmup_period:].count("ovulation") +
-        labels[warmup_period:].count("fertile")
-    )
-
+    codes = encode_phases(labels, unknown=_UNKNOWN_LABEL)
+    scores = score_phases(
+        codes,
+        luteal_mask=None,
+        fertility_mask=indices_to_mask(fertility_preds, len(codes)),
+        warmup_period=warmup_period,
+    )["fertility"]
+
+    total_considered = int(scores["considered"])
+    count("fertility_days_scored", total_considered)
     if total_considered == 0:
         return 0.0, 0, 0
 
-    for idx in fertility_preds:
-        if labels[idx] in ("ovulation", "fertile"):
-            total_correct += 1
-
+    total_correct = int(scores["tp"])
     accuracy = total_correct / total_considered
     return accuracy, total_correct, total_considered
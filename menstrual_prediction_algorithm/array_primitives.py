@@ -0,0 +1,180 @@
+"""
+NumPy backend for the spike detectors in `prediction_primitives`.
+
+Every function accepts either a 1-D series or a 2-D batch where each row is
+one user's series. Detectors return boolean masks with the same shape as the
+input; `mask_to_indices` converts a mask back to the index lists returned by
+the pure-Python detectors.
+
+The rolling window sums are accumulated in exactly the same order as the
+reference implementation (initial sum, then `+= data[i] - data[i - n]`), so the
+emitted indices are identical, not merely close.
+"""
+
+from typing import List, Optional, Union
+
+import numpy as np
+
+
+def _as_batch(data) -> np.ndarray:
+    """Return `data` as a float64 2-D array (one row per series)."""
+    arr = np.asarray(data, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[np.newaxis, :]
+    if arr.ndim != 2:
+        raise ValueError(f"Expected a 1-D or 2-D array, got {arr.ndim} dimensions")
+    return arr
+
+
+def _restore_shape(mask: np.ndarray, data) -> np.ndarray:
+    """Drop the batch axis again when the caller passed a 1-D series."""
+    return mask[0] if np.ndim(data) == 1 else mask
+
+
+def rolling_window_sums(data, n: int = 14) -> np.ndarray:
+    """
+    Compute the window sum of data[i-n : i] for every i >= n.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    n : int, default 14
+        Window size.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (..., len - n). Column k holds the sum preceding index n + k.
+
+    Notes
+    -----
+    - The sums are a cumulative sum of the initial window followed by the
+      per-step differences, which reproduces the incremental update of the
+      pure-Python detectors bit for bit.
+    """
+    batch = _as_batch(data)
+    num_days = batch.shape[1]
+    if n <= 0 or num_days < n:
+        return _restore_shape(np.empty((batch.shape[0], 0)), data)
+
+    steps = np.empty((batch.shape[0], num_days - n))
+    if num_days > n:
+        steps[:, 0] = np.cumsum(batch[:, :n], axis=1)[:, -1]
+        steps[:, 1:] = batch[:, n:-1] - batch[:, :num_days - n - 1]
+
+    return _restore_shape(np.cumsum(steps, axis=1), data)
+
+
+def _window_means(batch: np.ndarray, n: int, window_means: Optional[np.ndarray]) -> np.ndarray:
+    """Means of the windows preceding index n .. len - 1, as a batch."""
+    if window_means is None:
+        return _as_batch(rolling_window_sums(batch, n)) / n
+    return _as_batch(window_means)[:, :batch.shape[1] - n]
+
+
+def windowed_spike_mask(data, n: int = 14, window_means: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Vectorized equivalent of `identify_windowed_spikes`.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    n : int, default 14
+        Size of the sliding window used to compute the average.
+    window_means : np.ndarray, optional
+        Precomputed means of every window data[..., k : k + n], e.g.
+        `RollingStats.window_means(n)`. Computed with `rolling_window_sums`
+        if omitted.
+
+    Returns
+    -------
+    np.ndarray of bool
+        Same shape as `data`; True where a spike occurred.
+    """
+    batch = _as_batch(data)
+    mask = np.zeros(batch.shape, dtype=bool)
+    if n <= 0 or batch.shape[1] < n:
+        return _restore_shape(mask, data)
+
+    window_avg = _window_means(batch, n, window_means)
+    mask[:, n:] = batch[:, n:] > window_avg
+
+    return _restore_shape(mask, data)
+
+
+def weighted_windowed_spike_mask(data, n: int = 14, window_means: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Batched equivalent of `identify_weighted_windowed_spikes`.
+
+    The run state makes each day depend on the previous one, so the kernel
+    steps through time once while evaluating every user in the batch at the
+    same time step with array operations.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    n : int, default 14
+        Window size for the rolling average.
+    window_means : np.ndarray, optional
+        Precomputed means of every window data[..., k : k + n], e.g.
+        `RollingStats.window_means(n)`. Computed with `rolling_window_sums`
+        if omitted.
+
+    Returns
+    -------
+    np.ndarray of bool
+        Same shape as `data`; True where a spike occurred.
+    """
+    batch = _as_batch(data)
+    num_users, num_days = batch.shape
+    mask = np.zeros(batch.shape, dtype=bool)
+    if n <= 0 or num_days < n:
+        return _restore_shape(mask, data)
+
+    base_avg = _window_means(batch, n, window_means)
+
+    in_run = np.zeros(num_users, dtype=bool)
+    run_length = np.full(num_users, n, dtype=np.int64)
+
+    for k, i in enumerate(range(n, num_days)):
+        run_weight = run_length / n
+        threshold_multiplier = np.where(in_run, run_weight, 2 - run_weight)
+        spiked = batch[:, i] > threshold_multiplier * base_avg[:, k]
+
+        # A run starts or ends: both reset the run length
+        changed = spiked != in_run
+        run_length[changed] = 0
+        in_run = spiked
+        mask[:, i] = spiked
+
+        run_length += 1
+
+    return _restore_shape(mask, data)
+
+
+def mask_to_indices(mask: np.ndarray) -> Union[np.ndarray, List[np.ndarray]]:
+    """
+    Convert a spike mask into index arrays.
+
+    Parameters
+    ----------
+    mask : np.ndarray of bool
+        1-D or 2-D spike mask.
+
+    Returns
+    -------
+    np.ndarray or List[np.ndarray]
+        For a 1-D mask, the spike indices. For a 2-D mask, one index array per row.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim == 1:
+        return np.flatnonzero(mask)
+    if mask.shape[0] == 0:
+        return []
+
+    rows, cols = np.nonzero(mask)
+    boundaries = np.searchsorted(rows, np.arange(1, mask.shape[0]))
+    return np.split(cols, boundaries)
@@ -0,0 +1,204 @@
+"""
+Headless batch evaluation of the cycle detectors over the mcPHASES validation set.
+
+Participants are scored independently, so they are split across a process
+pool. Each worker runs one of the `compute_*_accuracy` entry points from
+`menstrual_cycle_prediction` with visualization disabled and its console
+output suppressed. When instrumentation is enabled, each worker's metrics
+are sent back and merged into the parent's.
+
+With --reports DIR, a per-participant plot of the period-adjusting
+predictions against the truth labels is also rendered (headless, in
+parallel) together with an index.html.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+import instrumentation
+from data_processing_utils import low_pass
+from menstrual_cycle_prediction import (
+    _compute_true_luteal_indices,
+    compute_spiked_prediction_accuracy,
+    compute_weighted_window_spiked_prediction_accuracy,
+    compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy,
+    period_adjusting_identify_weighted_windowed_spikes,
+)
+from phase_labels import PhaseLabels
+from validation_loading import VALIDATION_FILES, load_validation_cohort
+from visualize import ReportPanel, render_reports
+
+
+DETECTORS = {
+    "spiked": compute_spiked_prediction_accuracy,
+    "weighted_window": compute_weighted_window_spiked_prediction_accuracy,
+    "period_adjusting": compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy,
+}
+
+
+@instrumentation.timed()
+def load_validation_data(
+    filepaths: Sequence[str] = VALIDATION_FILES,
+) -> Tuple[Dict[str, List[float]], Dict[str, List[float]], Dict[str, PhaseLabels]]:
+    """
+    Load and merge every validation CSV once.
+
+    The files are read through the columnar cache in `validation_loading`.
+
+    Parameters
+    ----------
+    filepaths : sequence of str
+        mcPHASES CSV files to merge.
+
+    Returns
+    -------
+    temp_data, min_hr_data, labels : dict
+        Per-participant temperature, minimum heart rate and phase labels.
+    """
+    return load_validation_cohort(filepaths).to_dicts()
+
+
+def _evaluate_participant(
+    task: Tuple[str, str, List[float], PhaseLabels, int, bool]
+) -> Tuple[Tuple[str, float, int, int], Optional[Dict]]:
+    """Worker entry point: score a single participant with the named detector."""
+    participant, detector, data, labels, window_size, instrumented = task
+
+    if instrumented:
+        instrumentation.enable()
+        instrumentation.reset()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        accuracy, total_correct, total_considered = DETECTORS[detector](
+            data, labels, window_size=window_size, visualize=False
+        )
+
+    metrics = instrumentation.report() if instrumented else None
+    return (participant, accuracy, total_correct, total_considered), metrics
+
+
+def evaluate_participants(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, PhaseLabels],
+    detector: str = "period_adjusting",
+    window_size: int = 14,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, float]:
+    """
+    Score a detector for every participant in parallel.
+
+    Parameters
+    ----------
+    temp_data : dict
+        Participant id → temperature series.
+    labels : dict
+        Participant id → ground-truth phase labels.
+    detector : str, default "period_adjusting"
+        Key into `DETECTORS`.
+    window_size : int, default 14
+        Rolling window size passed to the detector.
+    max_workers : int, optional
+        Process pool size. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    results : pd.DataFrame
+        One row per participant with accuracy, total_correct and total_considered.
+    average_accuracy : float
+        Mean of the per-participant accuracies.
+    """
+    if detector not in DETECTORS:
+        raise ValueError(f"Unknown detector {detector!r}; expected one of {sorted(DETECTORS)}")
+
+    instrumented = instrumentation.is_enabled()
+    tasks = [
+        (participant, detector, temp_data[participant], labels[participant], window_size, instrumented)
+        for participant in sorted(temp_data)
+    ]
+    if not tasks:
+        raise ValueError("No participants to evaluate.")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * max_workers))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        outputs = list(pool.map(_evaluate_participant, tasks, chunksize=chunksize))
+
+    rows = [row for row, _ in outputs]
+    for _, metrics in outputs:
+        if metrics is not None:
+            instrumentation.merge(metrics)
+
+    results = pd.DataFrame(
+        rows, columns=["participant", "accuracy", "total_correct", "total_considered"]
+    )
+    return results, float(results["accuracy"].mean())
+
+
+def build_report_panels(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, PhaseLabels],
+    results: Optional[pd.DataFrame] = None,
+    window_size: int = 14,
+) -> Dict[str, ReportPanel]:
+    """
+    Period-adjusting predictions vs. truth for every participant, ready for `render_reports`.
+
+    Parameters
+    ----------
+    temp_data, labels : dict
+        As for `evaluate_participants`.
+    results : pd.DataFrame, optional
+        Output of `evaluate_participants`; adds the accuracy to each caption.
+    window_size : int, default 14
+        Rolling window size passed to the detector.
+    """
+    accuracy = {} if results is None else dict(zip(results["participant"], results["accuracy"]))
+    panels = {}
+    for participant in sorted(temp_data):
+        smoothed = low_pass(temp_data[participant], window_size=3)
+        _, _, spike_indices, _ = period_adjusting_identify_weighted_windowed_spikes(
+            smoothed, labels[participant], n=window_size
+        )
+        caption = f"accuracy {accuracy[participant]:.3f}" if participant in accuracy else ""
+        panels[participant] = ReportPanel(
+            smoothed, spike_indices,
+            smoothed, _compute_true_luteal_indices(labels[participant], window_size),
+            caption=caption,
+        )
+    return panels
+
+
+def main() -> None:
+    """Run a full validation sweep with the period-adjusting detector."""
+    parser = argparse.ArgumentParser(description="Score the period-adjusting detector on mcPHASES.")
+    parser.add_argument("--reports", metavar="DIR", help="also render per-participant reports into DIR")
+    parser.add_argument("--format", choices=("png", "svg"), default="png", help="report image format")
+    args = parser.parse_args()
+
+    temp_data, _, labels = load_validation_data()
+    results, average_accuracy = evaluate_participants(temp_data, labels)
+
+    print(results.to_string(index=False))
+    print(f"Average accuracy: {average_accuracy:.4f} over {len(results)} participants")
+
+    if args.reports:
+        index = render_reports(
+            build_report_panels(temp_data, labels, results), args.reports, fmt=args.format,
+            title="mcPHASES: period-adjusting detector",
+        )
+        print(f"Reports written to {index}")
+
+    report_path = instrumentation.export_if_enabled()
+    if report_path:
+        print(f"Metrics written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
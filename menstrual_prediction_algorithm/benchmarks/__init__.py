@@ -0,0 +1,10 @@
+"""
+Benchmarks for the prediction pipeline.
+
+Run from the `menstrual_prediction_algorithm` directory, e.g.:
+    python -m benchmarks.spike_detectors
+    python -m benchmarks.pipeline --users 200 --days 365
+
+`cohort` generates synthetic users x days cohorts and `harness` measures
+time and peak memory and records the results as JSON.
+"""
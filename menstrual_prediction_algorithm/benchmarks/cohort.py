@@ -0,0 +1,207 @@
+"""
+Parametric synthetic cohort for benchmarks.
+
+`generate_cohort` draws N users x D days of temperature deviation, lowest
+heart rate and phase labels with per-cycle length and luteal length
+variation, a biphasic temperature / heart-rate shift after ovulation, and
+gaps (isolated missed days plus multi-day dropouts, e.g. the ring left on the
+charger). Everything is generated with array operations, so cohorts of tens
+of thousands of users are cheap to build.
+
+Labels follow the truth CSV conventions: period for the first
+`period_length` days of a cycle, fertile for the `fertile_days` days before
+ovulation, one ovulation day, luteal until the next period, follicular
+otherwise, and missing on unobserved days.
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from gap_filling import weighted_past_fill
+from phase_labels import PhaseCodes
+
+
+MIN_CYCLE_LENGTH = 21
+MAX_CYCLE_LENGTH = 45
+
+
+class Cohort(NamedTuple):
+    """Synthetic cohort; every array is (users x days)."""
+
+    start: np.datetime64
+    temperature: np.ndarray       # float64, NaN on unobserved days
+    min_heart_rate: np.ndarray    # float64, NaN on unobserved days
+    labels: np.ndarray            # uint8 PhaseCodes, MISSING on unobserved days
+    observed: np.ndarray          # bool
+
+    @property
+    def num_users(self) -> int:
+        return self.temperature.shape[0]
+
+    @property
+    def num_days(self) -> int:
+        return self.temperature.shape[1]
+
+    @property
+    def dates(self) -> np.ndarray:
+        """datetime64[D] calendar shared by all users."""
+        return self.start + np.arange(self.num_days)
+
+
+def generate_cohort(
+    num_users: int = 1_000,
+    num_days: int = 365,
+    seed: int = 0,
+    cycle_length_mean: float = 28.5,
+    cycle_length_sd: float = 2.5,
+    luteal_length_mean: float = 13.5,
+    luteal_length_sd: float = 1.0,
+    period_length: int = 5,
+    fertile_days: int = 5,
+    temperature_shift: float = 0.3,
+    temperature_noise: float = 0.1,
+    heart_rate_shift: float = 2.5,
+    heart_rate_noise: float = 1.5,
+    missing_day_rate: float = 0.05,
+    dropout_rate: float = 0.01,
+    dropout_length_mean: float = 5.0,
+    start: str = "2024-01-01",
+) -> Cohort:
+    """
+    Generate a synthetic cohort with realistic cycles and gaps.
+
+    Parameters
+    ----------
+    num_users, num_days : int
+        Cohort size.
+    seed : int, default 0
+        Seed for `np.random.default_rng`; equal seeds give equal cohorts.
+    cycle_length_mean, cycle_length_sd : float
+        Normal distribution of cycle lengths in days, rounded and clipped to
+        [MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH]. Drawn independently per cycle.
+    luteal_length_mean, luteal_length_sd : float
+        Days from ovulation to the next period, drawn per cycle.
+    period_length : int, default 5
+        Days labelled "period" at the start of each cycle.
+    fertile_days : int, default 5
+        Days labelled "fertile" before ovulation.
+    temperature_shift, temperature_noise : float
+        Luteal temperature rise (°C, reached two days after ovulation) and
+        daily noise SD. Each user also gets a random baseline offset.
+    heart_rate_shift, heart_rate_noise : float
+        Luteal rise and noise SD of the lowest heart rate (bpm).
+    missing_day_rate : float, default 0.05
+        Probability of an isolated missed day.
+    dropout_rate, dropout_length_mean : float
+        Daily probability that a multi-day dropout starts, and its mean
+        (geometric) length.
+    start : str, default "2024-01-01"
+        First calendar day.
+
+    Returns
+    -------
+    Cohort
+    """
+    rng = np.random.default_rng(seed)
+    days = np.arange(num_days)
+
+    # ------------------------------------------------------------------
+    # Cycles: start days per user, the first cycle already in progress
+    # ------------------------------------------------------------------
+    max_cycles = num_days // MIN_CYCLE_LENGTH + 4
+    shape = (num_users, max_cycles)
+    lengths = np.clip(
+        np.rint(rng.normal(cycle_length_mean, cycle_length_sd, shape)),
+        MIN_CYCLE_LENGTH, MAX_CYCLE_LENGTH,
+    ).astype(np.int64)
+    luteal = np.clip(
+        np.rint(rng.normal(luteal_length_mean, luteal_length_sd, shape)),
+        period_length + 1, lengths - fertile_days - 1,
+    ).astype(np.int64)
+    offset = rng.integers(0, lengths[:, 0])
+    starts = np.cumsum(lengths, axis=1) - lengths - offset[:, None]
+    starts = np.minimum(starts, num_days)    # cycles starting after the last day are unused
+
+    # One searchsorted over all users: shift each row into its own range
+    stride = num_days + 2 * MAX_CYCLE_LENGTH
+    row_base = np.arange(num_users)[:, None] * stride
+    flat_starts = (starts + row_base).ravel()
+    cycle = np.searchsorted(flat_starts, (days + row_base).ravel(), side="right") - 1
+    cycle = cycle.reshape(num_users, num_days)
+
+    cycle_day = days - np.take(starts.ravel(), cycle)
+    ovulation_day = np.take((lengths - luteal).ravel(), cycle)
+
+    # ------------------------------------------------------------------
+    # Labels
+    # ------------------------------------------------------------------
+    labels = np.full((num_users, num_days), PhaseCodes.FOLLICULAR, dtype=np.uint8)
+    labels[cycle_day > ovulation_day] = PhaseCodes.LUTEAL
+    labels[(cycle_day >= ovulation_day - fertile_days) & (cycle_day < ovulation_day)] = PhaseCodes.FERTILE
+    labels[cycle_day == ovulation_day] = PhaseCodes.OVULATION
+    labels[cycle_day < period_length] = PhaseCodes.PERIOD
+
+    # ------------------------------------------------------------------
+    # Signals: biphasic shift ramping up over two days after ovulation
+    # ------------------------------------------------------------------
+    ramp = np.clip((cycle_day - ovulation_day) / 2.0, 0.0, 1.0)
+    temperature = (
+        rng.normal(0.0, 0.1, (num_users, 1))
+        + temperature_shift * ramp
+        + rng.normal(0.0, temperature_noise, (num_users, num_days))
+    )
+    min_heart_rate = (
+        rng.normal(55.0, 5.0, (num_users, 1))
+        + heart_rate_shift * ramp
+        + rng.normal(0.0, heart_rate_noise, (num_users, num_days))
+    )
+
+    # ------------------------------------------------------------------
+    # Gaps: isolated missed days plus dropouts (difference-array marking)
+    # ------------------------------------------------------------------
+    missing = rng.random((num_users, num_days)) < missing_day_rate
+    rows, cols = np.nonzero(rng.random((num_users, num_days)) < dropout_rate)
+    ends = np.minimum(cols + rng.geometric(1.0 / dropout_length_mean, len(cols)), num_days)
+    marks = np.zeros((num_users, num_days + 1), dtype=np.int64)
+    np.add.at(marks, (rows, cols), 1)
+    np.add.at(marks, (rows, ends), -1)
+    missing |= np.cumsum(marks[:, :-1], axis=1) > 0
+    missing[:, 0] = False                    # every export starts with a recording
+
+    temperature[missing] = np.nan
+    min_heart_rate[missing] = np.nan
+    labels[missing] = PhaseCodes.MISSING
+
+    return Cohort(
+        start=np.datetime64(start, "D"),
+        temperature=temperature,
+        min_heart_rate=min_heart_rate,
+        labels=labels,
+        observed=~missing,
+    )
+
+
+def filled_signals(cohort: Cohort, n: int = 3) -> np.ndarray:
+    """
+    Temperature with gaps filled by `weighted_past_fill`, as in `load_daily_data`.
+
+    Unlike the loader, which raises on a leading gap, leading gaps are
+    backfilled on purpose: synthetic users may start with dropped-out days.
+    """
+    return weighted_past_fill(cohort.temperature, n=n, leading="backfill")
+
+
+def to_app_frame(cohort: Cohort, user: int) -> pd.DataFrame:
+    """One user's observed days as an Oura daily export (date, temperature_trend_deviation)."""
+    observed = cohort.observed[user]
+    return pd.DataFrame({
+        "date": pd.to_datetime(cohort.dates[observed]),
+        "temperature_trend_deviation": cohort.temperature[user, observed],
+    })
+
+
+def to_app_frames(cohort: Cohort) -> List[pd.DataFrame]:
+    """`to_app_frame` for every user."""
+    return [to_app_frame(cohort, user) for user in range(cohort.num_users)]
@@ -0,0 +1,158 @@
+"""
+Timing / peak-memory measurement and JSON result records.
+
+A result file holds the environment (commit, versions, parameters) and one
+entry per benchmark, so runs from different commits can be compared with
+`compare_results` to spot regressions.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+RESULTS_DIR = "benchmarks/results"
+
+
+def measure(fn: Callable[[], object], repeat: int = 3, quiet: bool = True) -> Dict:
+    """
+    Time `fn` and record its peak traced memory.
+
+    Timing runs are separate from the memory run, since tracemalloc slows
+    allocation-heavy code down considerably. NumPy buffers are traced too.
+
+    Parameters
+    ----------
+    fn : callable
+        Zero-argument callable to benchmark.
+    repeat : int, default 3
+        Number of timed runs.
+    quiet : bool, default True
+        Swallow anything `fn` prints or warns (the accuracy helpers and
+        loaders are chatty).
+
+    Returns
+    -------
+    dict
+        seconds_min, seconds_median, seconds (all runs), peak_memory_bytes.
+    """
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            stack.enter_context(warnings.catch_warnings())
+            warnings.simplefilter("ignore")
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds_min": min(seconds),
+        "seconds_median": statistics.median(seconds),
+        "seconds": seconds,
+        "peak_memory_bytes": peak,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Short hash of HEAD, with a "-dirty" suffix for uncommitted changes; None outside git."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def environment(parameters: Dict) -> Dict:
+    """Metadata stored alongside the results."""
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "parameters": parameters,
+    }
+
+
+def write_results(results: Dict[str, Dict], parameters: Dict, path: Optional[str] = None) -> str:
+    """
+    Write a result record to JSON.
+
+    Parameters
+    ----------
+    results : dict
+        Benchmark name → `measure` output (or a {"skipped": reason} entry).
+    parameters : dict
+        Cohort / run parameters, stored verbatim.
+    path : str, optional
+        Output file. Defaults to RESULTS_DIR/<commit>_<timestamp>.json.
+
+    Returns
+    -------
+    str
+        Path written.
+    """
+    record = {"environment": environment(parameters), "results": results}
+    if path is None:
+        stamp = record["environment"]["timestamp"].replace(":", "").replace("-", "")
+        path = os.path.join(RESULTS_DIR, f"{record['environment']['commit'] or 'nogit'}_{stamp}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+    return path
+
+
+def compare_results(baseline_path: str, current_path: str, threshold: float = 1.2) -> List[str]:
+    """
+    Print a per-benchmark comparison of two result files.
+
+    Returns the names whose best time or peak memory grew by more than
+    `threshold` (a ratio), i.e. the regressions. The best of the timed runs
+    is compared, as it is the least affected by machine noise.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    with open(current_path) as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<55} {'time':>8} {'memory':>8}")
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None or "skipped" in before or "skipped" in now:
+            continue
+        time_ratio = now["seconds_min"] / max(before["seconds_min"], 1e-12)
+        memory_ratio = now["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1)
+        flag = ""
+        if time_ratio > threshold or memory_ratio > threshold:
+            regressions.append(name)
+            flag = "  <-- regression"
+        print(f"{name:<55} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x{flag}")
+    return regressions
@@ -0,0 +1,70 @@
+"""
+Throughput of the batched HMM decoder on a synthetic cohort.
+
+Decodes `num_users` user-years (365 days, temperature + minimum heart rate)
+with Viterbi and forward-backward, and runs EM iterations on a subset. The
+cohort is generated and decoded in blocks so memory stays bounded.
+
+Usage:
+    python -m benchmarks.hmm_decoder [num_users] [block_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.cohort import generate_cohort
+from hmm_decoder import GaussianHMM, prepare_observations
+from phase_labels import PhaseCodes
+
+DAYS_PER_YEAR = 365
+
+
+def main() -> None:
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    block_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    # Fit once on a small cohort
+    train = generate_cohort(2_000, DAYS_PER_YEAR, seed=0)
+    train_obs = prepare_observations(train.temperature, train.min_heart_rate)
+    start = time.perf_counter()
+    model = GaussianHMM.fit_supervised(train_obs, train.labels).fit_em(train_obs, max_iterations=5)
+    em_s = time.perf_counter() - start
+    print(f"EM fit: {len(model.log_likelihood_history)} iterations on {len(train_obs)} user-years in {em_s:.2f}s")
+
+    timings = {"generate": 0.0, "prepare": 0.0, "viterbi": 0.0, "forward_backward": 0.0}
+    correct = considered = 0
+    for block, first in enumerate(range(0, num_users, block_size)):
+        users = min(block_size, num_users - first)
+
+        start = time.perf_counter()
+        cohort = generate_cohort(users, DAYS_PER_YEAR, seed=block + 1)
+        timings["generate"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        obs = prepare_observations(cohort.temperature, cohort.min_heart_rate)
+        timings["prepare"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        states = model.viterbi(obs)
+        timings["viterbi"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.posteriors(obs)
+        timings["forward_backward"] += time.perf_counter() - start
+
+        labelled = cohort.labels != PhaseCodes.MISSING
+        luteal = np.isin(states, (PhaseCodes.LUTEAL, PhaseCodes.OVULATION))
+        true_luteal = np.isin(cohort.labels, (PhaseCodes.LUTEAL, PhaseCodes.OVULATION))
+        correct += int((luteal == true_luteal)[labelled].sum())
+        considered += int(labelled.sum())
+
+    print(f"{num_users} user-years in blocks of {block_size}")
+    for name, seconds in timings.items():
+        print(f"  {name:<17} {seconds:8.2f}s  ({num_users / seconds:,.0f} user-years/s)")
+    print(f"  luteal accuracy (Viterbi vs. synthetic truth): {correct / considered:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Time and peak-memory benchmarks for every pipeline stage on a synthetic cohort.
+
+Stages: `low_pass`, both detectors in `prediction_primitives`,
+`period_adjusting_identify_weighted_windowed_spikes`, the `accuracy`
+functions, `load_raw_data` on a warm cache, a cold `load_daily_frame` ingest
+of the real export, and the Streamlit app helpers (`prepare_df`,
+`infer_menses_starts`, `label_phases`). Results are written as JSON (see `harness`).
+
+Usage:
+    python -m benchmarks.pipeline [--users N] [--days D] [--repeat R] [--output PATH]
+    python -m benchmarks.pipeline --compare BASELINE.json CURRENT.json
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from accuracy import compute_accuracy, compute_fertility_accuracy, compute_ovulation_accuracy
+from array_primitives import weighted_windowed_spike_mask
+from benchmarks.cohort import filled_signals, generate_cohort, to_app_frames
+from benchmarks.harness import compare_results, measure, write_results
+from daily_aggregation import load_daily_frame
+from data_loading import SLEEP_EXPORT_PATH, load_raw_data
+from data_processing_utils import low_pass
+from menstrual_cycle_prediction import period_adjusting_identify_weighted_windowed_spikes
+from phase_labels import PhaseLabels
+from prediction_primitives import identify_windowed_spikes, identify_weighted_windowed_spikes
+from rolling_stats import RollingStats
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SWEEP_WINDOW_SIZES = (10, 12, 14, 16, 18)
+
+Stage = Tuple[str, Callable[[], object]]
+
+
+def _rolling_stats_sweep(batch: np.ndarray) -> List[np.ndarray]:
+    """Weighted spike masks for every sweep window size off one set of prefix sums."""
+    stats = RollingStats(batch)
+    return [
+        weighted_windowed_spike_mask(batch, size, window_means=stats.window_means(size))
+        for size in SWEEP_WINDOW_SIZES
+    ]
+
+
+def detector_stages(cohort, n: int = 14) -> List[Stage]:
+    """Filtering, spike detection and scoring, one call per user."""
+    rows = filled_signals(cohort).tolist()
+    labels = [PhaseLabels(codes) for codes in cohort.labels]
+    smoothed = [low_pass(row) for row in rows]
+
+    # Predictions to score, computed once outside the timed region
+    predictions = [
+        period_adjusting_identify_weighted_windowed_spikes(data, user_labels, n=n)
+        for data, user_labels in zip(smoothed, labels)
+    ]
+    batch = np.array(smoothed)
+    luteal = [set(p[2]) for p in predictions]
+    ovulation = [set(p[0]) for p in predictions]
+    fertility = [set(p[1]) for p in predictions]
+
+    return [
+        ("low_pass", lambda: [low_pass(row) for row in rows]),
+        ("identify_windowed_spikes", lambda: [identify_windowed_spikes(s, n) for s in smoothed]),
+        ("identify_weighted_windowed_spikes", lambda: [identify_weighted_windowed_spikes(s, n) for s in smoothed]),
+        ("period_adjusting_identify_weighted_windowed_spikes", lambda: [
+            period_adjusting_identify_weighted_windowed_spikes(s, l, n=n) for s, l in zip(smoothed, labels)
+        ]),
+        ("window_sweep_rolling_window_sums", lambda: [
+            weighted_windowed_spike_mask(batch, size) for size in SWEEP_WINDOW_SIZES
+        ]),
+        ("window_sweep_rolling_stats", lambda: _rolling_stats_sweep(batch)),
+        ("compute_accuracy", lambda: [
+            compute_accuracy(l, p, warmup_period=n) for l, p in zip(labels, luteal)
+        ]),
+        ("compute_ovulation_accuracy", lambda: [
+            compute_ovulation_accuracy(l, p, warmup_period=n) for l, p in zip(labels, ovulation)
+        ]),
+        ("compute_fertility_accuracy", lambda: [
+            compute_fertility_accuracy(l, p, warmup_period=n) for l, p in zip(labels, fertility)
+        ]),
+    ]
+
+
+def loading_stages() -> List[Stage]:
+    """
+    Loading the real export: `load_raw_data` on a warm cache, and a cold
+    `load_daily_frame` ingest (the step behind it) into an empty cache dir.
+    """
+    def cold():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            return load_daily_frame(SLEEP_EXPORT_PATH, cache_dir)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        load_raw_data()     # make sure the warm run hits the cache
+    return [("load_raw_data", load_raw_data), ("load_daily_frame.cold_ingest", cold)]
+
+
+def app_stages(cohort) -> List[Stage]:
+    """Streamlit helpers, one call per user on the user's observed days."""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import ovulation_hackathon_app as app
+
+    raws = to_app_frames(cohort)
+    prepared = [app.prepare_df(raw) for raw in raws]
+    starts = [app.infer_menses_starts(df) for df in prepared]
+
+    return [
+        ("app.prepare_df", lambda: [app.prepare_df(raw) for raw in raws]),
+        ("app.infer_menses_starts", lambda: [app.infer_menses_starts(df) for df in prepared]),
+        ("app.label_phases", lambda: [app.label_phases(df, s) for df, s in zip(prepared, starts)]),
+    ]
+
+
+def run(num_users: int, num_days: int, repeat: int, seed: int = 0) -> Dict[str, Dict]:
+    """Build the cohort and measure every stage; unavailable stages are recorded as skipped."""
+    cohort = generate_cohort(num_users, num_days, seed=seed)
+    results = {}
+
+    def record(stages: List[Stage]) -> None:
+        for name, fn in stages:
+            results[name] = measure(fn, repeat=repeat)
+            print(f"{name:<55} {results[name]['seconds_min']:8.3f}s "
+                  f"{results[name]['peak_memory_bytes'] / 2**20:8.1f} MiB")
+
+    def skip(names: List[str], reason: str) -> None:
+        for name in names:
+            results[name] = {"skipped": reason}
+            print(f"{name:<55} skipped: {reason}")
+
+    record([("generate_cohort", lambda: generate_cohort(num_users, num_days, seed=seed))])
+    record(detector_stages(cohort))
+
+    if os.path.exists(SLEEP_EXPORT_PATH):
+        record(loading_stages())
+    else:
+        skip(["load_raw_data", "load_daily_frame.cold_ingest"], f"{SLEEP_EXPORT_PATH} not found")
+
+    try:
+        stages = app_stages(cohort)
+    except ImportError as e:
+        skip(["app.prepare_df", "app.infer_menses_starts", "app.label_phases"], str(e))
+    else:
+        record(stages)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/<commit>_<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare_results(*args.compare)
+        sys.exit(1 if regressions else 0)
+
+    results = run(args.users, args.days, args.repeat, seed=args.seed)
+    path = write_results(
+        results,
+        {"users": args.users, "days": args.days, "repeat": args.repeat, "seed": args.seed},
+        args.output,
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare per-row `ast.literal_eval` of readiness blobs against the vectorized
+extractor in `readiness`, on the real sleep export replicated to a larger
+column.
+
+Usage:
+    python -m benchmarks.readiness_parsing [num_rows]
+"""
+
+import ast
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import measure
+from data_loading import SLEEP_EXPORT_PATH
+from readiness import READINESS_FIELDS, extract_readiness_fields
+
+
+def _literal_eval_fields(readiness: pd.Series) -> pd.DataFrame:
+    """The legacy approach: evaluate every blob, then look the fields up."""
+    rows = []
+    for entry in readiness:
+        blob = ast.literal_eval(entry) if isinstance(entry, str) else {}
+        merged = {**blob.get("contributors", {}), **blob}
+        rows.append([
+            np.nan if merged.get(field) is None else float(merged[field])
+            for field in READINESS_FIELDS
+        ])
+    return pd.DataFrame(rows, index=readiness.index, columns=list(READINESS_FIELDS))
+
+
+def main() -> None:
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    column = pd.read_csv(SLEEP_EXPORT_PATH, usecols=["readiness"])["readiness"]
+    readiness = pd.Series(np.resize(column.to_numpy(dtype=object), num_rows))
+
+    literal_eval = measure(lambda: _literal_eval_fields(readiness), repeat=1)
+    vectorized = measure(lambda: extract_readiness_fields(readiness), repeat=1)
+    identical = extract_readiness_fields(readiness).equals(_literal_eval_fields(readiness))
+
+    eval_s, fast_s = literal_eval["seconds_min"], vectorized["seconds_min"]
+    print(f"readiness fields ({num_rows} rows, {len(READINESS_FIELDS)} fields)")
+    print(f"  literal_eval: {eval_s:.3f}s  {literal_eval['peak_memory_bytes'] / 2**20:.1f} MiB")
+    print(f"  vectorized:   {fast_s:.3f}s  {vectorized['peak_memory_bytes'] / 2**20:.1f} MiB  ({eval_s / fast_s:.1f}x)")
+    print(f"  identical values: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the pure-Python spike detectors against the NumPy backend in
+`array_primitives` on a synthetic (users x days) cohort.
+
+Usage:
+    python -m benchmarks.spike_detectors [num_users] [num_days]
+"""
+
+import sys
+
+import numpy as np
+
+from prediction_primitives import (
+    identify_windowed_spikes,
+    identify_weighted_windowed_spikes,
+)
+from array_primitives import (
+    windowed_spike_mask,
+    weighted_windowed_spike_mask,
+    mask_to_indices,
+)
+from benchmarks.harness import measure
+
+
+def _synthetic_cohort(num_users: int, num_days: int, seed: int = 0) -> np.ndarray:
+    """Temperature-like series with a ~28 day cycle plus noise, one row per user."""
+    rng = np.random.default_rng(seed)
+    phase = rng.uniform(0, 2 * np.pi, size=(num_users, 1))
+    days = np.arange(num_days)
+    cycle = 0.3 * (np.sin(2 * np.pi * days / 28 + phase) > 0)
+    return 36.4 + cycle + rng.normal(0, 0.1, size=(num_users, num_days))
+
+
+def main() -> None:
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    num_days = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    n = 14
+
+    cohort = _synthetic_cohort(num_users, num_days)
+    rows = cohort.tolist()
+
+    for name, python_fn, array_fn in (
+        ("windowed", identify_windowed_spikes, windowed_spike_mask),
+        ("weighted_windowed", identify_weighted_windowed_spikes, weighted_windowed_spike_mask),
+    ):
+        python = measure(lambda: [python_fn(row, n) for row in rows], repeat=1)
+        array = measure(lambda: array_fn(cohort, n), repeat=1)
+
+        expected = [python_fn(row, n) for row in rows]
+        matches = all(
+            list(got) == want for got, want in zip(mask_to_indices(array_fn(cohort, n)), expected)
+        )
+
+        python_s, array_s = python["seconds_min"], array["seconds_min"]
+        print(f"{name} ({num_users} x {num_days}, n={n})")
+        print(f"  python: {python_s:.3f}s  {python['peak_memory_bytes'] / 2**20:.1f} MiB")
+        print(f"  numpy:  {array_s:.3f}s  {array['peak_memory_bytes'] / 2**20:.1f} MiB  ({python_s / array_s:.1f}x)")
+        print(f"  identical indices: {matches}")
+
+
+if __name__ == "__main__":
+    main()
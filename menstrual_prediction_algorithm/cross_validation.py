@@ -0,0 +1,396 @@
+"""
+Cross-validated tuning of the period-adjusting detector.
+
+`parameter_search` ranks configurations on every mcPHASES participant, so the
+best score it reports is measured on the data it was tuned on. This module
+holds participants out instead: each fold picks the configuration with the
+best mean luteal accuracy on its training participants and reports the
+accuracy of that configuration on the held-out ones.
+
+Participants are keyed "<id>_<study_interval>", and several people took part
+in both the 2022 and the 2024 study. Splits are grouped by person (the id
+without the interval), so both intervals of a person are always on the same
+side of a split:
+
+    leave_one_participant_out   one fold per person
+    grouped_k_fold              k folds of whole people
+
+A configuration's score on a participant does not depend on the fold, so the
+participants x configurations score table is computed once, in parallel
+across a process pool whose workers receive the smoothed series once (as in
+`parameter_search`). Each fold then fits and scores from the shared table.
+Held-out results are reported per fold and pooled, with person-level
+bootstrap confidence intervals.
+
+Usage:
+    python cross_validation.py [--scheme lopo|kfold] [--folds 5] [--output DIR]
+"""
+
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_processing_utils import low_pass
+from menstrual_cycle_prediction import period_adjusting_identify_weighted_windowed_spikes
+from parameter_search import grid_configs
+from phase_labels import PhaseLabels, encode_phases
+from rolling_stats import RollingStats
+from scoring import indices_to_mask, score_phases
+
+
+METRICS = ("luteal_accuracy", "ovulation_accuracy", "fertility_accuracy")
+SCHEMES = ("lopo", "kfold")
+
+Split = Tuple[List[str], List[str]]     # (train participants, test participants)
+
+# Shared read-only inputs for worker processes (set by _init_worker)
+_SMOOTHED: Dict[str, List[float]] = {}
+_CODES: Dict[str, np.ndarray] = {}
+_CONFIGS: List[Dict[str, int]] = []
+
+
+# --------------------------------------------------------------------------------------
+# SPLITS
+# --------------------------------------------------------------------------------------
+
+def participant_group(participant: str) -> str:
+    """Person a participant key belongs to ("22_2024" → "22")."""
+    return participant.rsplit("_", 1)[0]
+
+
+def _groups(participants: Sequence[str]) -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = {}
+    for participant in sorted(participants):
+        groups.setdefault(participant_group(participant), []).append(participant)
+    return groups
+
+
+def leave_one_participant_out(participants: Sequence[str]) -> List[Split]:
+    """One split per person, holding out every study interval of that person."""
+    groups = _groups(participants)
+    return [
+        ([p for other, members in groups.items() if other != group for p in members], held_out)
+        for group, held_out in groups.items()
+    ]
+
+
+def grouped_k_fold(participants: Sequence[str], k: int = 5, seed: int = 0) -> List[Split]:
+    """
+    `k` splits of whole people with balanced numbers of participants.
+
+    People are shuffled with `seed` and then dealt, largest first, to the fold
+    that currently holds the fewest participants.
+    """
+    groups = _groups(participants)
+    if not 2 <= k <= len(groups):
+        raise ValueError(f"k must be between 2 and the number of people ({len(groups)})")
+
+    order = list(groups)
+    random.Random(seed).shuffle(order)
+    order.sort(key=lambda group: len(groups[group]), reverse=True)   # stable: ties keep the shuffle
+
+    folds: List[List[str]] = [[] for _ in range(k)]
+    for group in order:
+        min(folds, key=len).extend(groups[group])
+
+    everyone = sorted(participants)
+    splits = []
+    for test in folds:
+        held_out = set(test)
+        splits.append(([p for p in everyone if p not in held_out], sorted(test)))
+    return splits
+
+
+# --------------------------------------------------------------------------------------
+# SCORE TABLE
+# --------------------------------------------------------------------------------------
+
+def _init_worker(smoothed: Dict[str, List[float]], codes: Dict[str, np.ndarray], configs: List[Dict[str, int]]) -> None:
+    global _SMOOTHED, _CODES, _CONFIGS
+    _SMOOTHED, _CODES, _CONFIGS = smoothed, codes, configs
+
+
+def _score_participant(participant: str) -> np.ndarray:
+    """
+    Score every configuration on one participant loaded into this process.
+
+    Returns
+    -------
+    np.ndarray
+        (configs x 5): luteal, ovulation and fertility accuracy, then the
+        luteal correct and considered day counts.
+    """
+    smoothed, codes = _SMOOTHED[participant], _CODES[participant]
+    stats = RollingStats(smoothed)
+    num_days = len(codes)
+    scores = np.zeros((len(_CONFIGS), 5))
+
+    for row, config in enumerate(_CONFIGS):
+        n = config["n"]
+        ovulation, fertility, spikes, _ = period_adjusting_identify_weighted_windowed_spikes(
+            smoothed, codes, window_means=stats.window_means(n).tolist(), **config
+        )
+        result = score_phases(
+            codes,
+            luteal_mask=indices_to_mask(spikes, num_days),
+            ovulation_mask=indices_to_mask(ovulation, num_days),
+            fertility_mask=indices_to_mask(fertility, num_days),
+            warmup_period=n,
+        )
+        luteal = result["luteal"]
+        scores[row] = (
+            luteal["accuracy"],
+            result["ovulation"]["accuracy"],
+            result["fertility"]["accuracy"],
+            luteal["tp"] + luteal["tn"],
+            luteal["considered"],
+        )
+    return scores
+
+
+def score_table(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, Union[List[str], PhaseLabels]],
+    configs: List[Dict[str, int]],
+    max_workers: Optional[int] = None,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Score every configuration on every participant in parallel.
+
+    Returns
+    -------
+    participants : list of str
+        Row order of the table (sorted).
+    table : np.ndarray
+        (participants x configs x 5), see `_score_participant`.
+    """
+    participants = sorted(temp_data)
+    if not participants:
+        raise ValueError("No participants to evaluate.")
+
+    smoothed = {p: low_pass(temp_data[p], window_size=3) for p in participants}
+    codes = {p: encode_phases(labels[p]) for p in participants}
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(participants) // (4 * max_workers))
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(smoothed, codes, configs),
+    ) as pool:
+        table = np.stack(list(pool.map(_score_participant, participants, chunksize=chunksize)))
+
+    return participants, table
+
+
+# --------------------------------------------------------------------------------------
+# BOOTSTRAP
+# --------------------------------------------------------------------------------------
+
+def bootstrap_ci(
+    accuracy: np.ndarray,
+    correct: np.ndarray,
+    considered: np.ndarray,
+    groups: Sequence[str],
+    num_resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap intervals for mean and pooled accuracy.
+
+    People (not participant keys) are resampled with replacement, keeping
+    both study intervals of a person together.
+
+    Parameters
+    ----------
+    accuracy : np.ndarray
+        Per-participant accuracy.
+    correct, considered : np.ndarray
+        Per-participant correct and considered day counts.
+    groups : sequence of str
+        Person of each participant (see `participant_group`).
+    num_resamples : int, default 2000
+        Number of bootstrap resamples.
+    confidence : float, default 0.95
+        Coverage of the interval.
+    seed : int, default 0
+        Seed of the resampling generator.
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows "mean_accuracy" (mean of the per-participant accuracies) and
+        "pooled_accuracy" (all correct days / all considered days), columns
+        estimate, ci_low and ci_high.
+    """
+    _, group_index = np.unique(np.asarray(groups), return_inverse=True)
+    num_groups = group_index.max() + 1
+    per_group = np.stack([
+        np.bincount(group_index, weights=values, minlength=num_groups)
+        for values in (accuracy, np.ones(len(accuracy)), correct, considered)
+    ])
+
+    sample = np.random.default_rng(seed).integers(0, num_groups, size=(num_resamples, num_groups))
+    totals = per_group[:, sample].sum(axis=-1)          # (4 x resamples)
+    resampled = {
+        "mean_accuracy": totals[0] / totals[1],
+        "pooled_accuracy": totals[2] / np.maximum(totals[3], 1),
+    }
+    estimates = {
+        "mean_accuracy": float(np.mean(accuracy)),
+        "pooled_accuracy": float(np.sum(correct) / max(np.sum(considered), 1)),
+    }
+
+    tail = (1 - confidence) / 2 * 100
+    return pd.DataFrame(
+        [
+            (name, estimates[name], *np.percentile(resampled[name], [tail, 100 - tail]))
+            for name in resampled
+        ],
+        columns=["metric", "estimate", "ci_low", "ci_high"],
+    ).set_index("metric")
+
+
+# --------------------------------------------------------------------------------------
+# CROSS-VALIDATION
+# --------------------------------------------------------------------------------------
+
+def cross_validate(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, Union[List[str], PhaseLabels]],
+    scheme: str = "lopo",
+    k: int = 5,
+    configs: Optional[List[Dict[str, int]]] = None,
+    rank_by: str = "luteal_accuracy",
+    seed: int = 0,
+    num_resamples: int = 2000,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Tune on the training participants of each fold and score the held-out ones.
+
+    Parameters
+    ----------
+    temp_data : dict
+        Participant id → raw temperature series.
+    labels : dict
+        Participant id → ground-truth phase labels.
+    scheme : str, default "lopo"
+        "lopo" (leave one person out) or "kfold" (grouped k-fold).
+    k : int, default 5
+        Number of folds for "kfold".
+    configs : list of dict, optional
+        Candidate configurations. Defaults to `parameter_search.DEFAULT_GRID`.
+    rank_by : str, default "luteal_accuracy"
+        Metric maximised on the training participants.
+    seed : int, default 0
+        Seed for the k-fold shuffle and the bootstrap.
+    num_resamples : int, default 2000
+        Bootstrap resamples for the pooled confidence intervals.
+    max_workers : int, optional
+        Process pool size. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    folds : pd.DataFrame
+        One row per fold: sizes, the chosen configuration, its mean training
+        accuracy and its held-out mean and pooled accuracies.
+    held_out : pd.DataFrame
+        One row per participant, scored by the configuration chosen without it.
+    summary : pd.DataFrame
+        Held-out mean and pooled luteal accuracy with bootstrap intervals.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown scheme {scheme!r}; expected one of {SCHEMES}")
+    if rank_by not in METRICS:
+        raise ValueError(f"Unknown metric {rank_by!r}; expected one of {METRICS}")
+
+    configs = grid_configs() if configs is None else configs
+    participants, table = score_table(temp_data, labels, configs, max_workers)
+    row_of = {participant: row for row, participant in enumerate(participants)}
+    metric = METRICS.index(rank_by)
+
+    splits = (
+        leave_one_participant_out(participants) if scheme == "lopo"
+        else grouped_k_fold(participants, k, seed)
+    )
+
+    fold_rows, held_out_rows = [], []
+    for fold, (train, test) in enumerate(splits):
+        train_rows = [row_of[p] for p in train]
+        test_rows = [row_of[p] for p in test]
+
+        # Fit: best mean training score (first configuration wins ties)
+        train_means = table[train_rows, :, metric].mean(axis=0)
+        best = int(np.argmax(train_means))
+        test_scores = table[test_rows, best]
+
+        fold_rows.append({
+            "fold": fold,
+            "num_train": len(train),
+            "num_test": len(test),
+            **configs[best],
+            f"train_{rank_by}": float(train_means[best]),
+            **{name: float(test_scores[:, i].mean()) for i, name in enumerate(METRICS)},
+            "pooled_luteal_accuracy": float(test_scores[:, 3].sum() / max(test_scores[:, 4].sum(), 1)),
+        })
+        for participant, scores in zip(test, test_scores):
+            held_out_rows.append({
+                "participant": participant,
+                "group": participant_group(participant),
+                "fold": fold,
+                **{name: float(scores[i]) for i, name in enumerate(METRICS)},
+                "total_correct": int(scores[3]),
+                "total_considered": int(scores[4]),
+            })
+
+    folds = pd.DataFrame(fold_rows)
+    held_out = pd.DataFrame(held_out_rows).sort_values("participant").reset_index(drop=True)
+    summary = bootstrap_ci(
+        held_out["luteal_accuracy"].to_numpy(),
+        held_out["total_correct"].to_numpy(),
+        held_out["total_considered"].to_numpy(),
+        held_out["group"].tolist(),
+        num_resamples=num_resamples,
+        seed=seed,
+    )
+
+    # Tuned on everyone and scored on everyone, for comparison
+    in_sample = table[:, :, metric].mean(axis=0).max()
+    summary.loc["in_sample_mean_accuracy"] = (float(in_sample), np.nan, np.nan)
+    return folds, held_out, summary
+
+
+def main() -> None:
+    """Cross-validate the default parameter grid over the mcPHASES validation set."""
+    from validation_loading import load_validation_cohort
+
+    parser = argparse.ArgumentParser(description="Cross-validated tuning of the period-adjusting detector.")
+    parser.add_argument("--scheme", choices=SCHEMES, default="lopo")
+    parser.add_argument("--folds", type=int, default=5, help="number of folds for --scheme kfold")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="DIR", help="write folds.csv and held_out.csv into DIR")
+    args = parser.parse_args()
+
+    temp_data, _, labels = load_validation_cohort().to_dicts()
+    folds, held_out, summary = cross_validate(temp_data, labels, scheme=args.scheme, k=args.folds, seed=args.seed)
+
+    print(folds.to_string(index=False, float_format="{:.4f}".format))
+    print()
+    print(summary.to_string(float_format="{:.4f}".format))
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        folds.to_csv(os.path.join(args.output, "folds.csv"), index=False)
+        held_out.to_csv(os.path.join(args.output, "held_out.csv"), index=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+"""
+Next-period forecasts from a per-user index of past cycle starts.
+
+`CycleHistoryIndex` collects period evidence for many users: "period"
+labels, `tag_generic_period` tags from the Oura `tag_*.csv` export, and the
+periods predicted after detected spike drops (`period_indices` of
+`period_adjusting_identify_weighted_windowed_spikes`). Evidence is grouped
+into periods: a day more than MERGE_GAP_DAYS after the user's previous
+evidence starts a new period. Within a period, the first user-reported day
+is its start; a period that only has detected days starts at the first one.
+
+For every user the index keeps the start of the current (open) period and
+running cycle-length statistics (count, mean and sum of squared deviations)
+over the completed cycles, so a forecast is O(1):
+
+    next period start = last start + expected cycle length
+    ovulation         = next period start - LUTEAL_PHASE_DAYS
+
+The expected length is shrunk towards a population prior (PRIOR_CYCLES
+pseudo-cycles of DEFAULT_CYCLE_LENGTH_DAYS), which dominates until a user has
+a few cycles. The uncertainty combines cycle-to-cycle variation with the
+uncertainty of the mean.
+
+Days are integer day numbers (days since 1970-01-01 for real dates; see
+`to_day_numbers`), or any other consistent day index such as
+`day_in_study`. Updates take columnar (user, day, source) arrays for a whole
+cohort at once and are vectorized; evidence must arrive in time order per
+user, and days before a user's latest evidence are ignored.
+
+Usage:
+    python cycle_forecast.py
+"""
+
+import os
+from enum import IntEnum
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from menstrual_cycle_prediction import FERTILE_DAYS_BEFORE_LUTEAL, FERTILE_DAYS_DURING_LUTEAL
+from phase_labels import PhaseCodes, PhaseLabels, encode_phases
+
+
+PERIOD_TAG = "tag_generic_period"
+
+DEFAULT_CYCLE_LENGTH_DAYS = 28.0
+DEFAULT_CYCLE_STD_DAYS = 4.0
+PRIOR_CYCLES = 1.0              # weight of the population prior, in cycles
+MIN_CYCLE_LENGTH_DAYS = 18      # shorter or longer gaps are not counted as one cycle
+MAX_CYCLE_LENGTH_DAYS = 50      # (missed logs, a missed detection, gaps in wear)
+MERGE_GAP_DAYS = 10             # evidence this close to the previous evidence is the same period
+LUTEAL_PHASE_DAYS = 14
+
+NO_DAY = np.iinfo(np.int64).min // 4        # "no start yet"; differences with it stay in range
+_LAST_DAY = np.iinfo(np.int64).max
+
+
+class StartSource(IntEnum):
+    """Where the start of a period came from."""
+
+    REPORTED = 0    # period label or tag entered by the user
+    DETECTED = 1    # period predicted after a detected spike drop
+
+
+class PeriodForecast(NamedTuple):
+    """
+    One user's forecast. Day fields use the index's day numbers.
+
+    The fertile window and ovulation are placed relative to the forecast
+    period start and share its uncertainty `next_period_std`.
+    """
+    last_period_start: int
+    next_period_start: int
+    next_period_std: float
+    ovulation: int
+    fertile_start: int
+    fertile_end: int
+    cycle_length: float
+    cycle_length_std: float
+    num_cycles: int
+
+    def next_period_range(self, z: float = 1.645) -> Tuple[int, int]:
+        """Earliest and latest likely start (default: a 90% normal interval)."""
+        spread = z * self.next_period_std
+        return int(np.floor(self.next_period_start - spread)), int(np.ceil(self.next_period_start + spread))
+
+
+# --------------------------------------------------------------------------------------
+# INDEX
+# --------------------------------------------------------------------------------------
+
+class CycleHistoryIndex:
+    """
+    Per-user cycle starts and running cycle-length statistics.
+
+    Users are rows of columnar state arrays, so bulk updates and cohort-wide
+    forecasts are array operations.
+    """
+
+    _STATE = {
+        "last_evidence": (np.int64, NO_DAY),     # latest evidence day
+        "last_reported": (np.int64, NO_DAY),     # latest user-reported evidence day
+        "period_start": (np.int64, NO_DAY),      # start of the open period
+        "period_source": (np.uint8, StartSource.DETECTED),
+        "previous_start": (np.int64, NO_DAY),    # start of the period before it
+        "count": (np.float64, 0.0),              # completed cycles counted
+        "mean": (np.float64, 0.0),
+        "m2": (np.float64, 0.0),                 # sum of squared deviations from the mean
+    }
+
+    def __init__(self):
+        self.users: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._state = {name: np.full(0, fill, dtype=dtype) for name, (dtype, fill) in self._STATE.items()}
+        self._log: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []    # closed (rows, starts, sources)
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def __contains__(self, user: str) -> bool:
+        return user in self._rows
+
+    def _row_indices(self, users: np.ndarray) -> np.ndarray:
+        """Rows of `users`, adding new users (state arrays grow by doubling)."""
+        unique, inverse = np.unique(users.astype(str), return_inverse=True)
+        for user in unique.tolist():
+            if user not in self._rows:
+                self._rows[user] = len(self.users)
+                self.users.append(user)
+
+        capacity = len(self._state["count"])
+        if len(self.users) > capacity:
+            grow = max(len(self.users), 2 * capacity) - capacity
+            for name, (dtype, fill) in self._STATE.items():
+                self._state[name] = np.concatenate([self._state[name], np.full(grow, fill, dtype=dtype)])
+
+        return np.array([self._rows[user] for user in unique.tolist()], dtype=np.int64)[inverse]
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add(self, user: str, day: int, source: StartSource = StartSource.REPORTED) -> None:
+        """Add one day of period evidence for one user."""
+        self.update([user], [day], source)
+
+    def update(
+        self,
+        users,
+        days,
+        sources: Union[StartSource, np.ndarray] = StartSource.REPORTED,
+    ) -> None:
+        """
+        Add period evidence for many users at once.
+
+        Parameters
+        ----------
+        users : array-like of str
+            User of each evidence day.
+        days : array-like of int
+            Day number of each evidence day (any order).
+        sources : StartSource or array-like of StartSource
+            Source of each evidence day, or one source for all of them.
+        """
+        state = self._state
+        days = np.asarray(days, dtype=np.int64)
+        if days.size == 0:
+            return
+        sources = np.broadcast_to(np.asarray(sources, dtype=np.uint8), days.shape)
+        rows = self._row_indices(np.asarray(users))
+
+        # Evidence older than what a user already has is ignored
+        keep = days >= state["last_evidence"][rows]
+        order = np.lexsort((sources[keep], days[keep], rows[keep]))
+        rows, days, sources = rows[keep][order], days[keep][order], sources[keep][order]
+
+        # A detected drop shortly after a reported period is a mid-cycle false
+        # positive: it cannot start a new cycle
+        reported = sources == StartSource.REPORTED
+        last_reported = pd.Series(np.where(reported, days, NO_DAY)).groupby(rows).cummax().to_numpy()
+        since_reported = days - np.maximum(last_reported, state["last_reported"][rows])
+        spurious = ~reported & (since_reported > MERGE_GAP_DAYS) & (since_reported < MIN_CYCLE_LENGTH_DAYS)
+        rows, days, sources = rows[~spurious], days[~spurious], sources[~spurious]
+        if rows.size == 0:
+            return
+        np.maximum.at(state["last_reported"], rows[reported[~spurious]], days[reported[~spurious]])
+
+        # Group the evidence into periods
+        first_of_user = np.r_[True, rows[1:] != rows[:-1]]
+        previous = np.r_[NO_DAY, days[:-1]]
+        previous[first_of_user] = state["last_evidence"][rows[first_of_user]]
+        new_period = (days - previous) > MERGE_GAP_DAYS
+        group_first = new_period | first_of_user
+        group = np.cumsum(group_first) - 1
+
+        reported = sources == StartSource.REPORTED
+        first_reported = np.full(group[-1] + 1, _LAST_DAY, dtype=np.int64)
+        np.minimum.at(first_reported, group[reported], days[reported])
+        has_reported = first_reported != _LAST_DAY
+        group_row = rows[group_first]
+        group_new = new_period[group_first]
+        group_start = np.where(has_reported, first_reported, days[group_first])
+        group_source = np.where(has_reported, StartSource.REPORTED, StartSource.DETECTED).astype(np.uint8)
+
+        # Evidence continuing the open period: a reported day replaces a detected start
+        continuing = ~group_new & has_reported
+        continuing_rows = group_row[continuing]
+        detected = state["period_source"][continuing_rows] == StartSource.DETECTED
+        state["period_start"][continuing_rows[detected]] = group_start[continuing][detected]
+        state["period_source"][continuing_rows[detected]] = StartSource.REPORTED
+
+        self._add_periods(group_row[group_new], group_start[group_new], group_source[group_new])
+        last_of_user = np.r_[first_of_user[1:], True]
+        state["last_evidence"][rows[last_of_user]] = days[last_of_user]
+
+    def _add_periods(self, rows: np.ndarray, starts: np.ndarray, sources: np.ndarray) -> None:
+        """Open new periods (sorted by user, then day); each closes the user's previous one."""
+        if rows.size == 0:
+            return
+        state = self._state
+        first = np.r_[True, rows[1:] != rows[:-1]]
+        last = np.r_[rows[1:] != rows[:-1], True]
+
+        previous_starts = np.r_[NO_DAY, starts[:-1]]
+        previous_starts[first] = state["period_start"][rows[first]]
+
+        # Closing: every user's open period, and every new period but the user's last
+        open_rows = rows[first]
+        had_open = state["period_start"][open_rows] != NO_DAY
+        closing_rows = np.concatenate([open_rows[had_open], rows[~last]])
+        closing_starts = np.concatenate([state["period_start"][open_rows][had_open], starts[~last]])
+        closing_previous = np.concatenate([state["previous_start"][open_rows][had_open], previous_starts[~last]])
+        closing_sources = np.concatenate([state["period_source"][open_rows][had_open], sources[~last]])
+        self._log.append((closing_rows, closing_starts, closing_sources))
+
+        lengths = closing_starts - closing_previous
+        counted = (
+            (closing_previous != NO_DAY)
+            & (lengths >= MIN_CYCLE_LENGTH_DAYS)
+            & (lengths <= MAX_CYCLE_LENGTH_DAYS)
+        )
+        self._add_lengths(closing_rows[counted], lengths[counted].astype(np.float64))
+
+        state["previous_start"][rows[last]] = previous_starts[last]
+        state["period_start"][rows[last]] = starts[last]
+        state["period_source"][rows[last]] = sources[last]
+
+    def _add_lengths(self, rows: np.ndarray, lengths: np.ndarray) -> None:
+        """Merge a batch of cycle lengths into the running statistics (Chan et al.)."""
+        if rows.size == 0:
+            return
+        state = self._state
+        size = len(state["count"])
+        count = np.bincount(rows, minlength=size).astype(np.float64)
+        mean = np.bincount(rows, weights=lengths, minlength=size) / np.maximum(count, 1)
+        m2 = np.bincount(rows, weights=(lengths - mean[rows]) ** 2, minlength=size)
+
+        total = state["count"] + count
+        delta = mean - state["mean"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, count / total, 0.0)
+        state["m2"] += m2 + delta ** 2 * state["count"] * share
+        state["mean"] += delta * share
+        state["count"] = total
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _closed_starts(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(rows, starts, sources) of every closed period, consolidated into one chunk."""
+        if not self._log:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+        if len(self._log) > 1:
+            self._log = [tuple(np.concatenate(parts) for parts in zip(*self._log))]
+        return self._log[0]
+
+    def cycle_starts(self, user: str) -> np.ndarray:
+        """Every period start of `user` (the last one may still change)."""
+        row = self._rows[user]
+        rows, starts, _ = self._closed_starts()
+        closed = starts[rows == row]
+        open_start = self._state["period_start"][row]
+        if open_start != NO_DAY:
+            closed = np.append(closed, open_start)
+        return np.sort(closed)
+
+    def _forecast_rows(self, rows: np.ndarray, today: Optional[int] = None) -> Dict[str, np.ndarray]:
+        state = self._state
+        last = state["period_start"][rows]
+        count, mean, m2 = state["count"][rows], state["mean"][rows], state["m2"][rows]
+
+        # The open period's cycle is already known, just not final: include it
+        open_length = (last - state["previous_start"][rows]).astype(np.float64)
+        has_open = (
+            (state["previous_start"][rows] != NO_DAY)
+            & (open_length >= MIN_CYCLE_LENGTH_DAYS)
+            & (open_length <= MAX_CYCLE_LENGTH_DAYS)
+        )
+        total = count + has_open
+        delta = np.where(has_open, open_length - mean, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, has_open / total, 0.0)
+        m2 = m2 + delta ** 2 * count * share
+        mean = mean + delta * share
+        count = total
+
+        # Shrink towards the population prior
+        weight = count + PRIOR_CYCLES
+        length = (PRIOR_CYCLES * DEFAULT_CYCLE_LENGTH_DAYS + count * mean) / weight
+        variance = (
+            PRIOR_CYCLES * DEFAULT_CYCLE_STD_DAYS ** 2
+            + m2
+            + PRIOR_CYCLES * count / weight * (mean - DEFAULT_CYCLE_LENGTH_DAYS) ** 2
+        ) / weight
+
+        # If the forecast day has already passed, assume missed periods and skip whole cycles
+        cycles = np.ones(len(rows))
+        if today is not None:
+            cycles = np.maximum(1.0, np.ceil((today - last) / length))
+
+        next_start = last + np.rint(cycles * length).astype(np.int64)
+        ovulation = next_start - LUTEAL_PHASE_DAYS
+        return {
+            "last_period_start": last,
+            "next_period_start": next_start,
+            "next_period_std": np.sqrt(cycles * variance * (1 + cycles / weight)),
+            "ovulation": ovulation,
+            "fertile_start": ovulation - FERTILE_DAYS_BEFORE_LUTEAL,
+            "fertile_end": ovulation + FERTILE_DAYS_DURING_LUTEAL - 1,
+            "cycle_length": length,
+            "cycle_length_std": np.sqrt(variance),
+            "num_cycles": count.astype(np.int64),
+        }
+
+    def forecast(self, user: str, today: Optional[int] = None) -> PeriodForecast:
+        """
+        Next period start and fertile window for one user, in O(1).
+
+        Parameters
+        ----------
+        user : str
+            A user with at least one period in the index.
+        today : int, optional
+            Day the forecast is made. When the expected start is already
+            past, whole cycles are added until it is not.
+        """
+        row = self._rows[user]
+        if self._state["period_start"][row] == NO_DAY:
+            raise ValueError(f"No period start known for user {user!r}")
+        values = self._forecast_rows(np.array([row]), today)
+        return PeriodForecast(**{name: value[0].item() for name, value in values.items()})
+
+    def forecast_all(self, today: Optional[int] = None) -> pd.DataFrame:
+        """`forecast` for every user with a known period start, as one frame indexed by user."""
+        rows = np.flatnonzero(self._state["period_start"][:len(self.users)] != NO_DAY)
+        frame = pd.DataFrame(self._forecast_rows(rows, today), index=np.array(self.users, dtype=object)[rows])
+        frame.index.name = "user"
+        return frame
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        """Write the index to one .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        log_rows, log_starts, log_sources = self._closed_starts()
+        np.savez(
+            path,
+            users=np.array(self.users, dtype=str),
+            log_rows=log_rows,
+            log_starts=log_starts,
+            log_sources=log_sources,
+            **{name: values[:len(self.users)] for name, values in self._state.items()},
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "CycleHistoryIndex":
+        """Rebuild an index written by `save`."""
+        index = cls()
+        with np.load(path) as saved:
+            index.users = saved["users"].tolist()
+            index._rows = {user: row for row, user in enumerate(index.users)}
+            index._state = {name: saved[name].copy() for name in cls._STATE}
+            index._log = [(saved["log_rows"], saved["log_starts"], saved["log_sources"])]
+        return index
+
+
+# --------------------------------------------------------------------------------------
+# EVIDENCE SOURCES
+# --------------------------------------------------------------------------------------
+
+def to_day_numbers(dates) -> np.ndarray:
+    """Dates (strings, datetimes or datetime64) as int64 days since 1970-01-01."""
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def from_day_number(day: int) -> np.datetime64:
+    return np.datetime64(int(day), "D")
+
+
+def period_label_days(labels: Union[List[str], PhaseLabels], first_day: int = 0) -> np.ndarray:
+    """Day numbers of the days labelled "period" (day 0 of `labels` is `first_day`)."""
+    return np.flatnonzero(encode_phases(labels) == PhaseCodes.PERIOD) + first_day
+
+
+def load_period_tags(path: str) -> np.ndarray:
+    """Day numbers of the `tag_generic_period` tags in an Oura tag export."""
+    tags = pd.read_csv(path, usecols=["start_day", "tag_type_code"])
+    return np.unique(to_day_numbers(tags.loc[tags["tag_type_code"] == PERIOD_TAG, "start_day"]))
+
+
+def index_validation_cohort(cohort, index: Optional[CycleHistoryIndex] = None) -> CycleHistoryIndex:
+    """
+    Bulk-add the "period" labels of a `validation_loading.ValidationCohort`.
+
+    Days are the cohort's `day_in_study` values, read straight from its
+    columns without splitting per participant.
+    """
+    index = CycleHistoryIndex() if index is None else index
+    users = np.repeat(cohort.participants, np.diff(cohort.offsets))
+    period = np.asarray(cohort.columns["phase"]) == PhaseCodes.PERIOD
+    index.update(users[period], np.asarray(cohort.columns["day_in_study"])[period], StartSource.REPORTED)
+    return index
+
+
+# --------------------------------------------------------------------------------------
+# EVALUATION
+# --------------------------------------------------------------------------------------
+
+def evaluate_on_validation(use_detected: bool = False, lead_days: int = 0, window_size: int = 14) -> pd.DataFrame:
+    """
+    Forecast every mcPHASES period start from the evidence before it.
+
+    For each participant and each labelled period start after the first,
+    the index holds only the evidence from more than `lead_days` days
+    earlier. The predicted start is the first start after the previous true
+    period: a period already opened by a detected drop, otherwise the
+    forecast next period start.
+
+    Parameters
+    ----------
+    use_detected : bool, default False
+        Also add the periods predicted after detected spike drops.
+    lead_days : int, default 0
+        How many days before the true start the prediction is made.
+    window_size : int, default 14
+        Rolling window size of the detector.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per forecast: participant, true and forecast start, error
+        (days) and the forecast standard deviation.
+    """
+    from data_processing_utils import low_pass
+    from menstrual_cycle_prediction import period_adjusting_identify_weighted_windowed_spikes
+    from validation_loading import load_validation_cohort
+
+    cohort = load_validation_cohort()
+    rows = []
+    for participant in cohort.participants.tolist():
+        days = np.asarray(cohort.column("day_in_study", participant), dtype=np.int64)
+        labels = cohort.labels(participant)
+        reported = days[period_label_days(labels)]
+        evidence = [(reported, np.full(len(reported), StartSource.REPORTED, dtype=np.uint8))]
+        if use_detected:
+            smoothed = low_pass(cohort.column("temperature", participant).tolist(), window_size=3)
+            _, _, _, period_indices = period_adjusting_identify_weighted_windowed_spikes(
+                smoothed, labels, n=window_size
+            )
+            detected = days[np.asarray(period_indices, dtype=np.int64)]
+            evidence.append((detected, np.full(len(detected), StartSource.DETECTED, dtype=np.uint8)))
+        evidence_days = np.concatenate([d for d, _ in evidence])
+        evidence_sources = np.concatenate([s for _, s in evidence])
+
+        truth = CycleHistoryIndex()
+        truth.update(np.full(len(reported), participant), reported)
+        if participant not in truth:
+            continue
+
+        true_starts = truth.cycle_starts(participant)
+        index, consumed = CycleHistoryIndex(), np.zeros(len(evidence_days), dtype=bool)
+        for previous, start in zip(true_starts[:-1].tolist(), true_starts[1:].tolist()):
+            batch = ~consumed & (evidence_days < start - lead_days)
+            index.update(np.full(batch.sum(), participant), evidence_days[batch], evidence_sources[batch])
+            consumed |= batch
+            if participant not in index:
+                continue
+            forecast = index.forecast(participant)
+            predicted = forecast.next_period_start
+            if forecast.last_period_start > previous + MERGE_GAP_DAYS:
+                predicted = forecast.last_period_start
+            rows.append((participant, start, predicted, predicted - start, forecast.next_period_std))
+
+    return pd.DataFrame(rows, columns=["participant", "true_start", "forecast_start", "error", "forecast_std"])
+
+
+def main() -> None:
+    """Score next-period forecasts on mcPHASES and forecast from the tag export."""
+    from feature_store import RAW_DATA_DIR, discover_exports
+
+    for use_detected, lead_days in ((False, 0), (True, 0), (True, 3)):
+        results = evaluate_on_validation(use_detected=use_detected, lead_days=lead_days)
+        errors = results["error"].abs()
+        within = (errors <= 1.645 * results["forecast_std"]).mean()
+        evidence = "labels + detected drops" if use_detected else "labels only"
+        print(f"mcPHASES, {evidence}, {lead_days} days ahead: "
+              f"{len(results)} forecasts, MAE {errors.mean():.2f} days, "
+              f"median {errors.median():.1f} days, {within:.0%} inside the 90% range")
+
+    tags = discover_exports(RAW_DATA_DIR).get("tag")
+    if tags is None:
+        return
+    index = CycleHistoryIndex()
+    days = load_period_tags(tags.path)
+    index.update(np.full(len(days), "me"), days)
+    forecast = index.forecast("me")
+    low, high = forecast.next_period_range()
+    print(f"\n{os.path.basename(tags.path)}: {len(index.cycle_starts('me'))} period starts, "
+          f"cycle {forecast.cycle_length:.1f} ± {forecast.cycle_length_std:.1f} days")
+    print(f"Next period: {from_day_number(forecast.next_period_start)} "
+          f"(likely {from_day_number(low)} .. {from_day_number(high)})")
+    print(f"Fertile window: {from_day_number(forecast.fertile_start)} .. {from_day_number(forecast.fertile_end)}, "
+          f"ovulation around {from_day_number(forecast.ovulation)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Day-level aggregation of Oura sleep sessions.
+
+The sleep export has one row per sleep session (`long_sleep`, `sleep`,
+`late_nap`, ...), so a day can appear several times and days without a
+recording do not appear at all. `aggregate_daily` reduces the sessions to one
+primary session per day and lays the result out on a contiguous calendar with
+explicit gap markers. The resulting frame is what the detectors consume.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from sleep_cache import CACHE_DIR, SESSION_TYPES, load_sleep_columns
+
+
+# readiness_status on calendar days without any session
+NO_SESSION = -1
+
+_SESSION_NAMES = np.array(SESSION_TYPES + ("unknown",), dtype=object)
+
+
+def primary_session_rows(day: np.ndarray, session_type: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    """
+    Row index of the primary session for each distinct day, in day order.
+
+    The primary session is the one with the most preferred type (order of
+    `SESSION_TYPES`, unknown types last), then the longest total sleep, then
+    the earliest row.
+
+    Parameters
+    ----------
+    day : np.ndarray
+        datetime64[D] day of each session.
+    session_type : np.ndarray
+        Index into SESSION_TYPES, -1 if unknown.
+    duration : np.ndarray
+        Total sleep duration of each session; NaN sorts last.
+
+    Returns
+    -------
+    np.ndarray
+        Row indices, one per distinct day.
+    """
+    priority = np.where(session_type < 0, len(SESSION_TYPES), session_type)
+    longest_first = -np.nan_to_num(np.asarray(duration, dtype=np.float64), nan=-np.inf)
+    order = np.lexsort((np.arange(len(day)), longest_first, priority, day))
+    _, first = np.unique(day[order], return_index=True)
+    return order[first]
+
+
+def aggregate_daily(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Reduce per-session columns to a calendar-aligned daily frame.
+
+    Parameters
+    ----------
+    columns : dict
+        Per-session arrays as returned by `sleep_cache.load_sleep_columns`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per calendar day from the first to the last recorded day, with
+        columns:
+
+        - day : datetime64
+        - observed : bool, False on days without any session
+        - gap_length : int, length of the run of unobserved days the day
+          belongs to (0 on observed days)
+        - num_sessions : int
+        - session_type : str ("long_sleep", ..., "unknown"), None on gaps
+        - total_sleep_duration, lowest_heart_rate, temperature_deviation :
+          float, taken from the primary session; NaN on gaps
+        - readiness_status : int8, READINESS_* code of the primary session,
+          or NO_SESSION on gaps
+    """
+    day = np.asarray(columns["day"], dtype="datetime64[D]")
+    if len(day) == 0:
+        raise ValueError("No sleep sessions to aggregate.")
+
+    rows = primary_session_rows(day, np.asarray(columns["session_type"]), columns["total_sleep_duration"])
+    days, num_sessions = np.unique(day, return_counts=True)
+
+    calendar = np.arange(days[0], days[-1] + np.timedelta64(1, "D"))
+    position = (days - days[0]).astype(np.int64)
+    observed = np.zeros(len(calendar), dtype=bool)
+    observed[position] = True
+
+    def spread(values: np.ndarray, fill, dtype) -> np.ndarray:
+        out = np.full(len(calendar), fill, dtype=dtype)
+        out[position] = values
+        return out
+
+    # Length of each run of unobserved days, broadcast over the run
+    run_id = np.cumsum(observed)
+    gap_length = np.bincount(run_id, weights=~observed).astype(np.int64)[run_id]
+    gap_length[observed] = 0
+
+    session_type = np.asarray(columns["session_type"])[rows]
+    return pd.DataFrame({
+        "day": calendar,
+        "observed": observed,
+        "gap_length": gap_length,
+        "num_sessions": spread(num_sessions, 0, np.int64),
+        "session_type": spread(_SESSION_NAMES[session_type], None, object),
+        "total_sleep_duration": spread(np.asarray(columns["total_sleep_duration"])[rows], np.nan, np.float64),
+        "lowest_heart_rate": spread(np.asarray(columns["lowest_heart_rate"])[rows], np.nan, np.float64),
+        "temperature_deviation": spread(np.asarray(columns["temperature_deviation"])[rows], np.nan, np.float64),
+        "readiness_status": spread(np.asarray(columns["readiness_status"])[rows], NO_SESSION, np.int8),
+    })
+
+
+def load_daily_frame(source: str, cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """Load a sleep export through the columnar cache and aggregate it by day."""
+    return aggregate_daily(load_sleep_columns(source, cache_dir))
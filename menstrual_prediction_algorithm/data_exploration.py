@@ -1,5 +1,5 @@
 from datetime import timedelta
-from data_loading import load_processed_data
+from data_loading import load_daily_data
 
 
 def find_longest_consecutive_day_run(dates):
@@ -43,7 +43,9 @@ def find_longest_consecutive_day_run(dates):
 
 
 def main():
-    tempData, minHeartRateData, labels, dates = load_processed_data()
+    daily = load_daily_data()
+    # The daily frame is calendar-aligned, so only days with a recording count
+    dates = daily.loc[daily["observed"], "day"].dt.date.tolist()
 
     start_idx, end_idx, run_len = find_longest_consecutive_day_run(dates)
 
@@ -1,60 +1,84 @@
-import ast
 import warnings
 from typing import List, Tuple, Dict
 
 import pandas as pd
-from data_processing_utils import remove_nan, str_to_date, weighted_past_average
+from data_processing_utils import remove_nan, str_to_date
+from daily_aggregation import load_daily_frame
+from gap_filling import weighted_past_fill
+from instrumentation import count, stage, timed
+from phase_labels import PhaseLabels
+from sleep_cache import READINESS_NOT_STRING
 
+SLEEP_EXPORT_PATH = "../raw_data/sleep_2024-03-22_2025-09-16.csv"
+TRUTH_LABELS_PATH = "../calendar_data_full_annotated.csv"
 
+
+@timed()
+def load_daily_data() -> pd.DataFrame:
+    """
+    Load the calendar-aligned daily frame that every detector consumes.
+
+    Sleep sessions are reduced to one primary session per day by
+    `daily_aggregation`, read through the columnar cache in `sleep_cache`, so
+    only the first run after the export changes pays for CSV parsing.
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns of `daily_aggregation.aggregate_daily`, plus:
+
+        - temperature : temperature deviation with missing and unobserved
+          days filled using a weighted past average (n=3)
+        - min_heart_rate : lowest heart rate, filled the same way
+        - phase : ground-truth phase label; "missing" on unobserved days
+          (their values are imputed, so they are not scored) and on days
+          without a truth label
+    """
+    with stage("sleep_sessions"):
+        daily = load_daily_frame(SLEEP_EXPORT_PATH)
+    count("days_loaded", len(daily))
+    count("days_unobserved", int((~daily["observed"]).sum()))
+
+    if (daily["readiness_status"] == READINESS_NOT_STRING).any():
+        warnings.warn("Non-string readiness entry encountered; filling with weighted average.")
+    with stage("imputation"):
+        count("nans_imputed", int(daily["temperature_deviation"].isna().sum() + daily["lowest_heart_rate"].isna().sum()))
+        daily["temperature"] = weighted_past_fill(daily["temperature_deviation"], n=3)
+        daily["min_heart_rate"] = remove_nan(daily["lowest_heart_rate"])
+
+    with stage("truth_labels"):
+        truth_df = pd.read_csv(TRUTH_LABELS_PATH)
+        truth = pd.Series(truth_df["phase"].to_numpy(), index=pd.to_datetime(truth_df["day"]))
+        phase = truth.reindex(daily["day"]).to_numpy(dtype=object)
+
+    unlabeled = daily["observed"].to_numpy() & pd.isna(phase)
+    if unlabeled.any():
+        warnings.warn(f"No truth label found for {unlabeled.sum()} observed dates; assigning 'missing'.")
+    phase[pd.isna(phase) | ~daily["observed"].to_numpy()] = "missing"
+    daily["phase"] = phase
+
+    return daily
+
+@timed()
 def load_raw_data() -> Tuple[List, List[float], List[float]]:
     """
-    Load and preprocess raw data for temperature deviation and min heart rate
+    Load and preprocess raw data for temperature deviation and min heart rate.
 
     Returns
     -------
     dates : List
-        List of Python date objects parsed from the raw CSV.
+        Every calendar day from the first to the last recording, as Python
+        date objects.
     temp_data : List[float]
         Temperature deviation values, filling missing entries using a
         weighted past average (n=3).
     min_hr_data : List[float]
         Cleaned list of minimum heart-rate values with NaNs removed.
     """
-    df = pd.read_csv("../raw_data/sleep_2024-03-22_2025-09-16.csv")
-
-    # Parse dates
-    dates = df["day"].apply(str_to_date).tolist()
-
-    # Clean heart data
-    min_hr_data = remove_nan(df["lowest_heart_rate"]).tolist()
-
-    # Readiness column contains temperature deviation inside a dictionary-like string
-    readiness_entries = df["readiness"]
-
-    temp_data: List[float] = []
-
-    for entry in readiness_entries:
-        try:
-            if isinstance(entry, str):
-                parsed = ast.literal_eval(entry)
-                temp = parsed.get("temperature_deviation")
-
-                if temp is not None and temp != "":
-                    temp_data.append(temp)
-                else:
-                    # Missing → fill using past n=3 weighted average
-                    temp_data.append(weighted_past_average(temp_data, n=3))
-            else:
-                # Non-string entry → fallback
-                warnings.warn("Non-string readiness entry encountered; filling with weighted average.")
-                temp_data.append(weighted_past_average(temp_data, n=3))
-
-        except (ValueError, SyntaxError) as e:
-            warnings.warn(f"Failed to parse readiness entry: {entry!r}. Error: {e}")
-            temp_data.append(weighted_past_average(temp_data, n=3))
-
-    return dates, temp_data, min_hr_data
+    daily = load_daily_data()
+    return daily["day"].dt.date.tolist(), daily["temperature"].tolist(), daily["min_heart_rate"].tolist()
 
+@timed()
 def load_truth_map() -> Dict:
     """
     Load ground-truth phase labels and map them to date keys.
@@ -64,7 +88,7 @@ def load_truth_map() -> Dict:
     truth_mapping : dict
         Dictionary mapping Python date objects → string phase labels.
     """
-    truth_df = pd.read_csv("../calendar_data_full_annotated.csv")
+    truth_df = pd.read_csv(TRUTH_LABELS_PATH)
     truth_mapping = {}
 
     for date_str, label in zip(truth_df["day"], truth_df["phase"]):
@@ -72,7 +96,8 @@ def load_truth_map() -> Dict:
 
     return truth_mapping
 
-def load_processed_data() -> Tuple[List[float], List[float], List[str], List]:
+@timed()
+def load_processed_data() -> Tuple[List[float], List[float], PhaseLabels, List]:
     """
     Load fully processed data: temperature deviation, heart rate, labels, and dates.
 
@@ -82,22 +107,18 @@ def load_processed_data() -> Tuple[List[float], List[float], List[str], List]:
         Cleaned temperature deviation series.
     min_hr_data : List[float]
         Cleaned minimum heart-rate series.
-    labels : List[str]
-        Ground-truth phase labels aligned with dates.
-        If a date is missing in the truth map, label is "missing".
+    labels : PhaseLabels
+        Ground-truth phase labels aligned with dates, integer-coded.
+        Unobserved dates and dates missing in the truth labels are "missing".
     dates : List
-        List of Python date objects.
+        Every calendar day from the first to the last recording, as Python
+        date objects.
     """
-    dates, temp_data, min_hr_data = load_raw_data()
-    truth_map = load_truth_map()
-
-    labels: List[str] = []
-
-    for date in dates:
-        if date in truth_map:
-            labels.append(truth_map[date])
-        else:
-            warnings.warn(f"No truth label found for date {date}; assigning 'missing'.")
-            labels.append("missing")
-
-    return temp_data, min_hr_data, labels, dates
+    daily = load_daily_data()
+
+    return (
+        daily["temperature"].tolist(),
+        daily["min_heart_rate"].tolist(),
+        PhaseLabels.from_strings(daily["phase"]),
+        daily["day"].dt.date.tolist(),
+    )
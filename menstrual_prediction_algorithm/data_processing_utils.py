@@ -1,7 +1,16 @@
 from datetime import date
 from typing import List, Dict, Iterable, Tuple, Set, Optional
+import numpy as np
 import pandas as pd
 
+from filters import moving_average
+from gap_filling import weighted_past_fill
+from phase_labels import PhaseCodes, PhaseLabels
+from scoring import indices_to_mask
+
+# Indexed by 2 * truth + prediction
+_CONFUSION_NAMES = np.array(["TN", "FP", "FN", "TP"])
+
 
 def str_to_date(string: str) -> date:
     """
@@ -63,15 +72,20 @@ def low_pass(data: Iterable[float], window_size: int = 3) -> List[float]:
     -------
     List[float]
         Smoothed data, length = len(data) - window_size.
+
+    Notes
+    -----
+    - Computed with running sums in O(n) via `filters.moving_average`.
+    - The final full window is not emitted; this length is kept because the
+      tuned detector results depend on it. Use `filters.smooth` for explicit
+      edge handling and other kernels.
     """
     data = list(data)
     if window_size <= 0:
         raise ValueError("window_size must be positive")
 
-    return [
-        sum(data[i:i + window_size]) / window_size
-        for i in range(len(data) - window_size)
-    ]
+    num_outputs = max(0, len(data) - window_size)
+    return moving_average(data, window_size, edge="valid")[:num_outputs].tolist()
 
 
 def weighted_past_average(data: List[float], n: int = 3) -> float:
@@ -128,22 +142,11 @@ def remove_nan(series: pd.Series, n: int = 3) -> pd.Series:
     Notes
     -----
     - If the first NaNs occur before at least `n` previous values exist,
-      the function raises an error.
+      the function raises an error. Use `gap_filling.weighted_past_fill`
+      directly for other leading-gap and long-dropout policies.
     """
-    series = series.copy()
-
-    for idx in series[series.isna()].index:
-        history = series[idx - n:idx].tolist()
-
-        if len(history) < n or any(pd.isna(history)):
-            raise ValueError(
-                f"Cannot compute weighted_past_average for index {idx}: "
-                f"requires {n} valid past values."
-            )
-
-        series.loc[idx] = weighted_past_average(history, n=n)
-
-    return series
+    filled = weighted_past_fill(series.to_numpy(dtype=np.float64), n=n)
+    return pd.Series(filled, index=series.index, name=series.name)
 
 
 def compute_confusion_matrix(
@@ -170,25 +173,14 @@ def compute_confusion_matrix(
     streamed_matrix : List[str]
         Per-index label: 'TP', 'TN', 'FP', 'FN'
     """
-    TN, TP, FP, FN = [], [], [], []
-    streamed = []
-
-    for i in range(total_data_size):
-        truth = i in true_labels
-        pred = i in pred_labels
-
-        if truth and pred:
-            TP.append(i)
-            streamed.append("TP")
-        elif truth and not pred:
-            FN.append(i)
-            streamed.append("FN")
-        elif not truth and pred:
-            FP.append(i)
-            streamed.append("FP")
-        else:
-            TN.append(i)
-            streamed.append("TN")
+    truth = indices_to_mask(true_labels, total_data_size)
+    pred = indices_to_mask(pred_labels, total_data_size)
+
+    TN = np.flatnonzero(~truth & ~pred).tolist()
+    TP = np.flatnonzero(truth & pred).tolist()
+    FP = np.flatnonzero(~truth & pred).tolist()
+    FN = np.flatnonzero(truth & ~pred).tolist()
+    streamed = _CONFUSION_NAMES[2 * truth + pred].tolist()
 
     return TN, TP, FP, FN, streamed
 
@@ -199,9 +191,9 @@ def create_generated_labels(
     fertility: Set[int],
     spike: Set[int],
     period: Set[int]
-) -> List[str]:
+) -> PhaseLabels:
     """
-    Generate label strings for each time index based on membership
+    Generate a phase label for each time index based on membership
     in different physiological phase index sets.
 
     Priority order:
@@ -216,21 +208,18 @@ def create_generated_labels(
 
     Returns
     -------
-    List[str]
+    PhaseLabels
         A label per data point.
     """
-    labels = []
-
-    for i in range(num_data_points):
-        if i in ovulation:
-            labels.append("ovulation")
-        elif i in fertility:
-            labels.append("fertile")
-        elif i in spike:
-            labels.append("luteal")
-        elif i in period:
-            labels.append("period")
-        else:
-            labels.append("follicular")
+    labels = PhaseLabels.filled(num_data_points, PhaseCodes.FOLLICULAR)
+
+    # Assign lowest priority first so higher-priority phases overwrite it
+    for indices, phase in (
+        (period, PhaseCodes.PERIOD),
+        (spike, PhaseCodes.LUTEAL),
+        (fertility, PhaseCodes.FERTILE),
+        (ovulation, PhaseCodes.OVULATION),
+    ):
+        labels.codes[indices_to_mask(indices, num_data_points)] = phase
 
     return labels
@@ -5,6 +5,8 @@ This script:
 1. Loads processed physiological and label data.
 2. Runs the weighted-window ovulation-adjusted prediction algorithm.
 3. Prints accuracy statistics.
+4. With MENSTRUAL_METRICS=1, writes stage timings and counters (see
+   `instrumentation`).
 
 Requires:
     - data_loading.load_processed_data
@@ -12,6 +14,7 @@ Requires:
 """
 
 from typing import Tuple
+import instrumentation
 from data_loading import load_processed_data
 from menstrual_cycle_prediction import (
     compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy
@@ -52,6 +55,10 @@ def main() -> None:
         f"(accuracy = {accuracy:.4f})"
     )
 
+    report_path = instrumentation.export_if_enabled()
+    if report_path:
+        print(f"Metrics written to {report_path}")
+
 
 if __name__ == "__main__":
     main()
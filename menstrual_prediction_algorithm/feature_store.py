@@ -0,0 +1,522 @@
+"""
+Daily feature store built from every Oura export in `raw_data/`.
+
+Each export kind (`dailyreadiness`, `dailysleep`, `sleep`, `workout`, `tag`,
+...) is reduced to one row per day by its `ExportSpec`, and all kinds are
+joined into a single calendar-aligned table (one row per day from the first
+to the last day of any export). Derived features are computed once, at
+ingest time, and stored alongside the raw ones.
+
+The table is stored like the sleep cache: one typed `.npy` file per column
+(float64, bool, or int16 codes for categorical columns) plus `meta.json`.
+
+Export file names encode their date range (`<kind>_<start>_<end>.csv`). On
+update, the newest export of each kind is used, and only its days after the
+last stored day of that kind are processed. The last stored day is re-read,
+since the previous export may have ended part-way through it. Days that are
+already stored are not re-read; pass `rebuild=True` after replacing history.
+
+Usage:
+    python feature_store.py
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from daily_aggregation import primary_session_rows
+from gap_filling import weighted_past_fill
+from readiness import READINESS_CONTRIBUTORS, extract_readiness_fields
+from sleep_cache import SESSION_TYPES
+
+
+RAW_DATA_DIR = "../raw_data"
+FEATURE_STORE_DIR = "../cache/feature_store"
+STORE_VERSION = 1
+
+_EXPORT_NAME = re.compile(r"^(?P<kind>[a-z0-9]+)_(?P<start>\d{4}-\d{2}-\d{2})_(?P<end>\d{4}-\d{2}-\d{2})\.csv$")
+
+
+class ExportFile(NamedTuple):
+    kind: str
+    start: str
+    end: str
+    path: str
+
+
+class ExportSpec(NamedTuple):
+    """
+    How one export kind becomes daily feature columns.
+
+    Daily exports list numeric columns, dict-like blob columns (column →
+    keys to extract) and categorical columns; rows are reduced to the last
+    row per day. Session/event exports supply `aggregate` instead, which maps
+    the raw rows to a frame indexed by day.
+    """
+
+    prefix: str
+    usecols: Tuple[str, ...]
+    numeric: Tuple[str, ...] = ()
+    blobs: Dict[str, Tuple[str, ...]] = {}
+    categorical: Tuple[str, ...] = ()
+    aggregate: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+    day_column: str = "day"
+
+
+class DerivedFeature(NamedTuple):
+    """
+    A feature computed from other columns.
+
+    `compute` receives a frame of consecutive days and returns one value per
+    row. Rows needing computation hold NaN in the feature's own column; the
+    preceding `lookback` rows hold their stored values (so recursive features
+    can continue from them).
+    """
+
+    name: str
+    inputs: Tuple[str, ...]
+    lookback: int
+    compute: Callable[[pd.DataFrame], np.ndarray]
+
+
+# ---------------------------------------------------------------------------
+# Session / event exports
+# ---------------------------------------------------------------------------
+
+def _duration_minutes(df: pd.DataFrame) -> pd.Series:
+    start = pd.to_datetime(df["start_datetime"], utc=True, errors="coerce")
+    end = pd.to_datetime(df["end_datetime"], utc=True, errors="coerce")
+    return (end - start).dt.total_seconds() / 60.0
+
+
+def _aggregate_sleep(df: pd.DataFrame) -> pd.DataFrame:
+    """Primary sleep session per day (see `daily_aggregation`), plus the session count."""
+    day = df["day"].to_numpy(dtype="datetime64[D]")
+    rows = primary_session_rows(
+        day,
+        pd.Categorical(df["type"], categories=SESSION_TYPES).codes,
+        pd.to_numeric(df["total_sleep_duration"], errors="coerce").to_numpy(),
+    )
+    columns = [c for c in _SLEEP_NUMERIC if c in df.columns]
+    out = df.iloc[rows][columns].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    out.index = pd.DatetimeIndex(day[rows])
+    out["num_sessions"] = pd.Series(day).value_counts().reindex(out.index).to_numpy(dtype=np.float64)
+    return out
+
+
+def _aggregate_workouts(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.assign(
+        duration_minutes=_duration_minutes(df),
+        calories=pd.to_numeric(df["calories"], errors="coerce"),
+        distance=pd.to_numeric(df["distance"], errors="coerce"),
+    )
+    grouped = df.groupby(pd.to_datetime(df["day"]))
+    return pd.DataFrame({
+        "count": grouped.size().astype(np.float64),
+        "duration_minutes": grouped["duration_minutes"].sum(),
+        "calories": grouped["calories"].sum(),
+        "distance": grouped["distance"].sum(),
+    })
+
+
+def _aggregate_sessions(df: pd.DataFrame) -> pd.DataFrame:
+    grouped = _duration_minutes(df).groupby(pd.to_datetime(df["day"]))
+    return pd.DataFrame({"count": grouped.size().astype(np.float64), "duration_minutes": grouped.sum()})
+
+
+def _aggregate_tags(df: pd.DataFrame) -> pd.DataFrame:
+    grouped = (df["tag_type_code"] == "tag_generic_period").groupby(pd.to_datetime(df["start_day"]))
+    return pd.DataFrame({"count": grouped.size().astype(np.float64), "period": grouped.any()})
+
+
+_SLEEP_NUMERIC = (
+    "total_sleep_duration",
+    "lowest_heart_rate",
+    "average_heart_rate",
+    "average_hrv",
+    "average_breath",
+    "efficiency",
+)
+
+EXPORT_SPECS: Dict[str, ExportSpec] = {
+    "dailyactivity": ExportSpec(
+        prefix="activity",
+        usecols=("day", "score", "steps", "active_calories", "total_calories", "average_met_minutes",
+                 "high_activity_time", "medium_activity_time", "low_activity_time", "sedentary_time",
+                 "resting_time", "non_wear_time", "inactivity_alerts", "contributors"),
+        numeric=("score", "steps", "active_calories", "total_calories", "average_met_minutes",
+                 "high_activity_time", "medium_activity_time", "low_activity_time", "sedentary_time",
+                 "resting_time", "non_wear_time", "inactivity_alerts"),
+        blobs={"contributors": ("meet_daily_targets", "move_every_hour", "recovery_time",
+                                "stay_active", "training_frequency", "training_volume")},
+    ),
+    "dailycardiovascularage": ExportSpec(
+        prefix="cardio", usecols=("day", "vascular_age"), numeric=("vascular_age",),
+    ),
+    "dailyreadiness": ExportSpec(
+        prefix="readiness",
+        usecols=("day", "score", "temperature_deviation", "temperature_trend_deviation", "contributors"),
+        numeric=("score", "temperature_deviation", "temperature_trend_deviation"),
+        blobs={"contributors": READINESS_CONTRIBUTORS},
+    ),
+    "dailyresilience": ExportSpec(
+        prefix="resilience",
+        usecols=("day", "level", "contributors"),
+        blobs={"contributors": ("sleep_recovery", "daytime_recovery", "stress")},
+        categorical=("level",),
+    ),
+    "dailysleep": ExportSpec(
+        prefix="sleep",
+        usecols=("day", "score", "contributors"),
+        numeric=("score",),
+        blobs={"contributors": ("deep_sleep", "efficiency", "latency", "rem_sleep",
+                                "restfulness", "timing", "total_sleep")},
+    ),
+    "dailyspo2": ExportSpec(
+        prefix="spo2",
+        usecols=("day", "breathing_disturbance_index", "spo2_percentage"),
+        numeric=("breathing_disturbance_index",),
+        blobs={"spo2_percentage": ("average",)},
+    ),
+    "dailystress": ExportSpec(
+        prefix="stress",
+        usecols=("day", "stress_high", "recovery_high", "day_summary"),
+        numeric=("stress_high", "recovery_high"),
+        categorical=("day_summary",),
+    ),
+    "vo2max": ExportSpec(prefix="vo2max", usecols=("day", "vo2_max"), numeric=("vo2_max",)),
+    "sleep": ExportSpec(
+        prefix="night", usecols=("day", "type") + _SLEEP_NUMERIC, aggregate=_aggregate_sleep,
+    ),
+    "workout": ExportSpec(
+        prefix="workout", usecols=("day", "start_datetime", "end_datetime", "calories", "distance"),
+        aggregate=_aggregate_workouts,
+    ),
+    "session": ExportSpec(
+        prefix="session", usecols=("day", "start_datetime", "end_datetime"), aggregate=_aggregate_sessions,
+    ),
+    "tag": ExportSpec(
+        prefix="tag", usecols=("start_day", "tag_type_code"), aggregate=_aggregate_tags, day_column="start_day",
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Derived features
+# ---------------------------------------------------------------------------
+
+def _filled_temperature(frame: pd.DataFrame) -> np.ndarray:
+    # Stored (already filled) values first, so the recursive fill continues from them
+    temperature = frame["temperature"].fillna(frame["readiness_temperature_deviation"])
+    return weighted_past_fill(temperature, n=3, leading="backfill")
+
+
+def _smoothed_temperature(frame: pd.DataFrame) -> np.ndarray:
+    # Causal 3-day mean, as moving_average(..., edge="causal"), but summing each
+    # window directly: running sums round differently depending on where the
+    # frame starts, so an update would not reproduce a full rebuild bit for bit.
+    temperature = frame["temperature"].to_numpy(dtype=np.float64)
+    padded = np.pad(temperature, (2, 0), mode="edge")
+    return sliding_window_view(padded, 3).sum(axis=-1) / 3
+
+
+def _heart_rate_delta(frame: pd.DataFrame) -> np.ndarray:
+    heart_rate = frame["night_lowest_heart_rate"]
+    baseline = heart_rate.rolling(28, min_periods=7).median()
+    return (heart_rate - baseline).to_numpy(dtype=np.float64)
+
+
+DERIVED_FEATURES = (
+    DerivedFeature("temperature", ("readiness_temperature_deviation",), 3, _filled_temperature),
+    DerivedFeature("temperature_smoothed", ("temperature",), 2, _smoothed_temperature),
+    DerivedFeature("lowest_heart_rate_delta", ("night_lowest_heart_rate",), 27, _heart_rate_delta),
+)
+
+
+# ---------------------------------------------------------------------------
+# Ingest
+# ---------------------------------------------------------------------------
+
+def parse_export_name(path: str) -> Optional[ExportFile]:
+    """Parse `<kind>_<start>_<end>.csv`; returns None for other files."""
+    match = _EXPORT_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    return ExportFile(match["kind"], match["start"], match["end"], path)
+
+
+def discover_exports(raw_dir: str = RAW_DATA_DIR) -> Dict[str, ExportFile]:
+    """Newest export (latest end date, then latest start) of every kind in `raw_dir`."""
+    newest: Dict[str, ExportFile] = {}
+    for name in sorted(os.listdir(raw_dir)):
+        export = parse_export_name(os.path.join(raw_dir, name))
+        if export is None:
+            continue
+        current = newest.get(export.kind)
+        if current is None or (export.end, export.start) > (current.end, current.start):
+            newest[export.kind] = export
+    return newest
+
+
+def extract_export(path: str, spec: ExportSpec, after: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read one export and reduce it to daily feature columns.
+
+    Parameters
+    ----------
+    path : str
+        Export CSV.
+    spec : ExportSpec
+        How to reduce it.
+    after : str, optional
+        Only keep days strictly after this ISO date.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by day, columns named `<prefix>_<feature>`.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, usecols=[c for c in spec.usecols if c in header])
+    df = df[df[spec.day_column].notna()]
+    if after is not None:
+        df = df[pd.to_datetime(df[spec.day_column]) > pd.Timestamp(after)]
+
+    if spec.aggregate is not None:
+        out = spec.aggregate(df)
+    else:
+        df = df.drop_duplicates(spec.day_column, keep="last")
+        out = pd.DataFrame(index=pd.DatetimeIndex(pd.to_datetime(df[spec.day_column])))
+        for column in spec.numeric:
+            if column in df.columns:
+                out[column] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+        for column, keys in spec.blobs.items():
+            if column in df.columns:
+                fields = extract_readiness_fields(df[column], keys)
+                for key in keys:
+                    out[key] = fields[key].to_numpy()
+        for column in spec.categorical:
+            if column in df.columns:
+                out[column] = pd.Categorical(df[column].to_numpy(dtype=object))
+
+    out.index = pd.DatetimeIndex(out.index, name="day").normalize()
+    return out.add_prefix(f"{spec.prefix}_").sort_index()
+
+
+def _read_meta(store_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == STORE_VERSION else None
+
+
+def _missing_value(dtype):
+    return False if dtype == bool else np.nan
+
+
+def _merge(table: pd.DataFrame, features: pd.DataFrame) -> pd.DataFrame:
+    """Write `features` into `table`, extending its calendar as needed."""
+    if len(features) == 0:
+        return table
+    start, end = features.index.min(), features.index.max()
+    if len(table):
+        start, end = min(start, table.index.min()), max(end, table.index.max())
+    calendar = pd.date_range(start, end, freq="D", name="day")
+
+    bool_columns = [column for column in table.columns if table[column].dtype == bool]
+    table = table.reindex(calendar)
+    for column in bool_columns:
+        table[column] = table[column].fillna(False).astype(bool)
+
+    for column in features.columns:
+        values = features[column]
+        if values.dtype == bool:
+            if column not in table:
+                table[column] = False
+            table.loc[values.index, column] = values.to_numpy()
+            table[column] = table[column].astype(bool)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            if column not in table:
+                table[column] = pd.Series(np.nan, index=calendar, dtype=object)
+            table[column] = table[column].astype(object)
+            table.loc[values.index, column] = values.astype(object).to_numpy()
+        else:
+            if column not in table:
+                table[column] = np.nan
+            table.loc[values.index, column] = values.to_numpy(dtype=np.float64)
+    return table
+
+
+def _compute_derived(table: pd.DataFrame, first_new_row: int) -> pd.DataFrame:
+    """(Re)compute derived features for rows >= first_new_row."""
+    lookback = max(feature.lookback for feature in DERIVED_FEATURES)
+    start = max(0, first_new_row - lookback)
+    frame = table.iloc[start:].copy()
+    stale = np.arange(start, len(table)) >= first_new_row
+
+    for feature in DERIVED_FEATURES:
+        if not all(column in frame for column in feature.inputs):
+            continue
+        if feature.name not in frame:
+            frame[feature.name] = np.nan
+        frame.loc[stale, feature.name] = np.nan
+        frame[feature.name] = feature.compute(frame)
+        table[feature.name] = table.get(feature.name, np.nan)
+        table.iloc[first_new_row:, table.columns.get_loc(feature.name)] = frame[feature.name].to_numpy()[stale]
+    return table
+
+
+def _write_store(table: pd.DataFrame, meta: Dict, store_dir: str) -> None:
+    os.makedirs(store_dir, exist_ok=True)
+    columns, categories = {"day": "datetime64[D]"}, meta.get("categories", {})
+    np.save(os.path.join(store_dir, "day.npy"), table.index.to_numpy(dtype="datetime64[D]"))
+
+    for column in table.columns:
+        values = table[column]
+        if values.dtype == bool:
+            array = values.to_numpy(dtype=bool)
+        elif values.dtype == object:
+            # Categorical: append-only category list so stored codes stay valid
+            known = categories.setdefault(column, [])
+            known.extend(sorted(set(values.dropna()) - set(known)))
+            array = pd.Categorical(values, categories=known).codes.astype(np.int16)
+        else:
+            array = values.to_numpy(dtype=np.float64)
+        columns[column] = str(array.dtype)
+        np.save(os.path.join(store_dir, f"{column}.npy"), array)
+
+    meta.update({"version": STORE_VERSION, "columns": columns, "categories": categories})
+    tmp = os.path.join(store_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(store_dir, "meta.json"))
+
+
+def load_feature_store(store_dir: str = FEATURE_STORE_DIR) -> pd.DataFrame:
+    """
+    Load the feature table.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by day; categorical columns are decoded to `pd.Categorical`.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the store has not been built (see `update_feature_store`).
+    """
+    meta = _read_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No feature store in {store_dir!r}; run update_feature_store first.")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+
+    data = {}
+    for column in meta["columns"]:
+        if column == "day":
+            continue
+        if column in meta["categories"]:
+            data[column] = pd.Categorical.from_codes(load(column), meta["categories"][column])
+        else:
+            data[column] = load(column)
+    return pd.DataFrame(data, index=pd.DatetimeIndex(load("day"), name="day"))
+
+
+def update_feature_store(
+    raw_dir: str = RAW_DATA_DIR,
+    store_dir: str = FEATURE_STORE_DIR,
+    rebuild: bool = False,
+) -> Dict[str, int]:
+    """
+    Ingest new days from the exports in `raw_dir` into the feature store.
+
+    Parameters
+    ----------
+    raw_dir : str
+        Directory of Oura exports.
+    store_dir : str
+        Feature store directory.
+    rebuild : bool, default False
+        Discard the stored table and ingest everything again.
+
+    Returns
+    -------
+    dict
+        Export kind → number of days processed (0 if the export was unchanged).
+    """
+    meta = None if rebuild else _read_meta(store_dir)
+    if meta is None:
+        meta, table = {"sources": {}, "categories": {}}, pd.DataFrame()
+    else:
+        stored = load_feature_store(store_dir)
+        table = pd.DataFrame({
+            column: values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy(copy=True)
+            for column, values in stored.items()
+        }, index=stored.index)
+
+    processed: Dict[str, int] = {}
+    first_new_day = None
+    for kind, export in sorted(discover_exports(raw_dir).items()):
+        spec = EXPORT_SPECS.get(kind)
+        if spec is None:
+            continue
+        stat = os.stat(export.path)
+        source = meta["sources"].get(kind)
+        unchanged = (
+            source is not None
+            and source["file"] == os.path.basename(export.path)
+            and source["size"] == stat.st_size
+            and source["mtime_ns"] == stat.st_mtime_ns
+        )
+        if unchanged:
+            processed[kind] = 0
+            continue
+
+        # Re-read the last stored day: the previous export may have ended part-way through it
+        after = None
+        if source is not None and source.get("last_day"):
+            after = str((pd.Timestamp(source["last_day"]) - pd.Timedelta(days=1)).date())
+        features = extract_export(export.path, spec, after=after)
+        table = _merge(table, features)
+
+        processed[kind] = len(features)
+        last_day = features.index.max() if len(features) else None
+        meta["sources"][kind] = {
+            "file": os.path.basename(export.path),
+            "start": export.start,
+            "end": export.end,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "last_day": str(last_day.date()) if last_day is not None else (source or {}).get("last_day"),
+        }
+        if len(features):
+            first_new_day = min(first_new_day or features.index.min(), features.index.min())
+
+    if first_new_day is not None:
+        table = _compute_derived(table, int(table.index.get_loc(first_new_day)))
+        _write_store(table, meta, store_dir)
+    return processed
+
+
+def main() -> None:
+    """Update the feature store from `raw_data/` and summarize it."""
+    processed = update_feature_store()
+    for kind, days in processed.items():
+        print(f"{kind:<24} {days:>5} days processed")
+
+    table = load_feature_store()
+    print(f"{len(table)} days x {table.shape[1]} features "
+          f"({table.index.min().date()} to {table.index.max().date()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Smoothing filters over NumPy arrays.
+
+Every filter accepts a 1-D series or a 2-D (users x days) batch and smooths
+along the last axis. Window-based kernels take an explicit `edge` mode:
+
+    "valid"    only windows fully inside the data (length - window_size + 1)
+    "nearest"  pad by repeating the first/last sample; output keeps the input length
+    "reflect"  pad by mirroring around the first/last sample; output keeps the input length
+    "causal"   window ends at each sample (trailing window), padded with the
+               first sample; output keeps the input length
+
+Kernels are registered in `KERNELS` and can be selected by name with `smooth`.
+"""
+
+from typing import Callable, Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+EDGE_MODES = ("valid", "nearest", "reflect", "causal")
+
+
+def _as_float_array(data) -> np.ndarray:
+    arr = np.asarray(data, dtype=np.float64)
+    if arr.ndim not in (1, 2):
+        raise ValueError(f"Expected a 1-D or 2-D array, got {arr.ndim} dimensions")
+    return arr
+
+
+def _pad(data: np.ndarray, window_size: int, edge: str) -> np.ndarray:
+    """Pad the last axis so a "valid" pass yields the requested edge behaviour."""
+    if edge not in EDGE_MODES:
+        raise ValueError(f"Unknown edge mode {edge!r}; expected one of {EDGE_MODES}")
+    if edge == "valid":
+        return data
+
+    if edge == "causal":
+        before, after, mode = window_size - 1, 0, "edge"
+    else:
+        before, after = (window_size - 1) // 2, window_size // 2
+        mode = "edge" if edge == "nearest" else "reflect"
+
+    if mode == "reflect" and data.shape[-1] <= max(before, after):
+        raise ValueError("Series is too short for reflect padding with this window size")
+
+    pad_width = [(0, 0)] * (data.ndim - 1) + [(before, after)]
+    return np.pad(data, pad_width, mode=mode)
+
+
+def _check_window(window_size: int) -> None:
+    if window_size <= 0:
+        raise ValueError("window_size must be positive")
+
+
+def moving_average(data, window_size: int = 3, edge: str = "valid") -> np.ndarray:
+    """
+    Moving average computed from running sums in O(n) per series.
+
+    NaN samples only affect the windows that contain them.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    window_size : int, default 3
+        Number of samples averaged per output.
+    edge : str, default "valid"
+        Edge handling mode (see module docstring).
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed data along the last axis.
+    """
+    _check_window(window_size)
+    padded = _pad(_as_float_array(data), window_size, edge)
+    if padded.shape[-1] < window_size:
+        return np.empty(padded.shape[:-1] + (0,))
+
+    is_nan = np.isnan(padded)
+    zero_pad = [(0, 0)] * (padded.ndim - 1) + [(1, 0)]
+    sums = np.pad(np.cumsum(np.where(is_nan, 0.0, padded), axis=-1), zero_pad)
+    nans = np.pad(np.cumsum(is_nan, axis=-1), zero_pad)
+
+    window_sums = sums[..., window_size:] - sums[..., :-window_size]
+    window_nans = nans[..., window_size:] - nans[..., :-window_size]
+
+    averaged = window_sums / window_size
+    averaged[window_nans > 0] = np.nan
+    return averaged
+
+
+def exponential_moving_average(data, span: float = 3.0) -> np.ndarray:
+    """
+    Exponential moving average with smoothing factor alpha = 2 / (span + 1).
+
+    The filter is recursive, so it steps once through time while updating every
+    row of a batch at once. It is causal and always keeps the input length; the
+    first output equals the first sample.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    span : float, default 3.0
+        Span of the filter; must be >= 1.
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed data with the same shape as `data`.
+    """
+    if span < 1:
+        raise ValueError("span must be >= 1")
+
+    arr = _as_float_array(data)
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(arr)
+    if arr.shape[-1] == 0:
+        return out
+
+    out[..., 0] = arr[..., 0]
+    for i in range(1, arr.shape[-1]):
+        out[..., i] = alpha * arr[..., i] + (1.0 - alpha) * out[..., i - 1]
+    return out
+
+
+def moving_median(data, window_size: int = 3, edge: str = "valid") -> np.ndarray:
+    """
+    Sliding-window median.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    window_size : int, default 3
+        Number of samples per window.
+    edge : str, default "valid"
+        Edge handling mode (see module docstring).
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed data along the last axis.
+    """
+    _check_window(window_size)
+    padded = _pad(_as_float_array(data), window_size, edge)
+    if padded.shape[-1] < window_size:
+        return np.empty(padded.shape[:-1] + (0,))
+
+    return np.median(sliding_window_view(padded, window_size, axis=-1), axis=-1)
+
+
+def savitzky_golay_coefficients(window_size: int, polyorder: int) -> np.ndarray:
+    """
+    Least-squares smoothing weights for a centered Savitzky–Golay window.
+
+    Parameters
+    ----------
+    window_size : int
+        Odd number of samples per window.
+    polyorder : int
+        Degree of the fitted polynomial; must be less than `window_size`.
+
+    Returns
+    -------
+    np.ndarray
+        Weights to apply to each window (oldest sample first).
+    """
+    if window_size <= 0 or window_size % 2 == 0:
+        raise ValueError("window_size must be a positive odd number")
+    if not 0 <= polyorder < window_size:
+        raise ValueError("polyorder must be in [0, window_size)")
+
+    half = window_size // 2
+    offsets = np.arange(-half, half + 1, dtype=np.float64)
+    vandermonde = np.vander(offsets, polyorder + 1, increasing=True)
+    # Row 0 of the pseudo-inverse evaluates the fitted polynomial at offset 0
+    return np.linalg.pinv(vandermonde)[0]
+
+
+def savitzky_golay(data, window_size: int = 5, polyorder: int = 2, edge: str = "valid") -> np.ndarray:
+    """
+    Savitzky–Golay smoothing (local polynomial least squares).
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    window_size : int, default 5
+        Odd number of samples per window.
+    polyorder : int, default 2
+        Degree of the fitted polynomial.
+    edge : str, default "valid"
+        Edge handling mode (see module docstring). With "causal" the fitted
+        value is still taken at the window centre.
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed data along the last axis.
+    """
+    coefficients = savitzky_golay_coefficients(window_size, polyorder)
+    padded = _pad(_as_float_array(data), window_size, edge)
+    if padded.shape[-1] < window_size:
+        return np.empty(padded.shape[:-1] + (0,))
+
+    return sliding_window_view(padded, window_size, axis=-1) @ coefficients
+
+
+KERNELS: Dict[str, Callable[..., np.ndarray]] = {
+    "mean": moving_average,
+    "ema": exponential_moving_average,
+    "median": moving_median,
+    "savgol": savitzky_golay,
+}
+
+
+def smooth(data, kernel: str = "mean", **kwargs) -> np.ndarray:
+    """
+    Smooth `data` with a kernel selected by name.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    kernel : str, default "mean"
+        Key into `KERNELS`.
+    **kwargs
+        Passed through to the kernel (e.g. window_size, edge, span).
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed data.
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown kernel {kernel!r}; expected one of {sorted(KERNELS)}")
+    return KERNELS[kernel](data, **kwargs)
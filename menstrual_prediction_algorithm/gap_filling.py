@@ -0,0 +1,166 @@
+"""
+Causal gap filling for NumPy arrays.
+
+`weighted_past_fill` replaces each NaN with the linearly weighted average of
+the `n` preceding samples (weights n, n-1, ..., 1, newest first), the same
+rule as `data_processing_utils.weighted_past_average`. Filled values feed the
+following fills, so this is a recursive filter. It accepts a 1-D series or a
+2-D (users x days) batch.
+
+The recursion only links NaNs that are fewer than `n` samples apart, so NaNs
+are grouped into such clusters and the k-th NaN of every cluster (in every
+row) is filled in the same vectorized step. The number of steps is the size
+of the largest cluster, not the length of the series.
+
+Policies
+--------
+Leading gaps (NaNs in the first `n` samples, where a full history does not
+exist):
+
+    "raise"     raise ValueError (the legacy behaviour)
+    "keep"      leave NaN
+    "backfill"  use the next valid sample
+    "partial"   weighted average of the available past samples
+
+Long dropouts (runs of more than `max_gap` consecutive NaNs):
+
+    "fill"      fill like any other gap (the legacy behaviour)
+    "limit"     fill the first `max_gap` samples and leave the rest NaN
+    "keep"      leave the whole run NaN
+    "raise"     raise ValueError
+
+Fills whose history contains a NaN that was left in place are NaN as well.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+LEADING_POLICIES = ("raise", "keep", "backfill", "partial")
+LONG_GAP_POLICIES = ("fill", "limit", "keep", "raise")
+
+
+def _nan_runs(is_nan: np.ndarray):
+    """Per position: offset within its NaN run and length of that run (2-D input)."""
+    length = is_nan.shape[-1]
+    positions = np.broadcast_to(np.arange(length), is_nan.shape)
+    last_valid = np.maximum.accumulate(np.where(is_nan, -1, positions), axis=-1)
+    next_valid = np.minimum.accumulate(np.where(is_nan, length, positions)[:, ::-1], axis=-1)[:, ::-1]
+    return positions - last_valid - 1, next_valid - last_valid - 1, next_valid
+
+
+def _cluster_ranks(rows: np.ndarray, cols: np.ndarray, n: int) -> np.ndarray:
+    """Rank of each NaN within its cluster (NaNs closer than `n` samples in one row)."""
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.int64)
+    new_cluster = np.ones(len(rows), dtype=bool)
+    new_cluster[1:] = (rows[1:] != rows[:-1]) | (cols[1:] - cols[:-1] > n)
+    cluster_start = np.maximum.accumulate(np.where(new_cluster, np.arange(len(rows)), 0))
+    return np.arange(len(rows)) - cluster_start
+
+
+def weighted_past_fill(
+    data,
+    n: int = 3,
+    leading: str = "raise",
+    max_gap: Optional[int] = None,
+    long_gap: str = "fill",
+) -> np.ndarray:
+    """
+    Fill NaNs with the weighted average of the `n` preceding samples.
+
+    Wherever `remove_nan` / `weighted_past_average` succeed, the result is
+    identical to theirs.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D (users x days) batch.
+    n : int, default 3
+        Number of past samples used for each fill.
+    leading : str, default "raise"
+        Policy for NaNs in the first `n` samples (see module docstring).
+    max_gap : int, optional
+        Longest run of NaNs that is filled normally. None means no limit.
+    long_gap : str, default "fill"
+        Policy for runs longer than `max_gap` (see module docstring).
+
+    Returns
+    -------
+    np.ndarray
+        Filled float64 copy of `data`.
+
+    Raises
+    ------
+    ValueError
+        On a leading gap with leading="raise", or a long dropout with
+        long_gap="raise".
+    """
+    if n <= 0:
+        raise ValueError("n must be positive")
+    if leading not in LEADING_POLICIES:
+        raise ValueError(f"Unknown leading policy {leading!r}; expected one of {LEADING_POLICIES}")
+    if long_gap not in LONG_GAP_POLICIES:
+        raise ValueError(f"Unknown long_gap policy {long_gap!r}; expected one of {LONG_GAP_POLICIES}")
+
+    filled = np.array(data, dtype=np.float64)
+    if filled.ndim not in (1, 2):
+        raise ValueError(f"Expected a 1-D or 2-D array, got {filled.ndim} dimensions")
+    batch = filled.reshape(-1, filled.shape[-1])     # view: writes go to `filled`
+
+    is_nan = np.isnan(batch)
+    if not is_nan.any():
+        return filled
+    offset, run_length, next_valid = _nan_runs(is_nan)
+    to_fill = is_nan.copy()
+
+    # Long dropouts
+    if max_gap is not None:
+        too_long = is_nan & (run_length > max_gap)
+        if too_long.any():
+            if long_gap == "raise":
+                row, col = np.argwhere(too_long)[0]
+                raise ValueError(
+                    f"Gap of {run_length[row, col]} samples at index {col} exceeds max_gap={max_gap}."
+                )
+            if long_gap == "keep":
+                to_fill &= ~too_long
+            elif long_gap == "limit":
+                to_fill &= ~(too_long & (offset >= max_gap))
+
+    # Leading gaps
+    head = to_fill & (np.arange(batch.shape[-1]) < n)
+    if head.any():
+        if leading == "raise":
+            col = np.argwhere(head)[0][1]
+            raise ValueError(f"Cannot impute index {col}: requires {n} valid past values.")
+        if leading == "keep":
+            to_fill &= ~head
+        elif leading == "backfill":
+            rows, cols = np.nonzero(head)
+            source = next_valid[rows, cols]
+            has_source = source < batch.shape[-1]
+            batch[rows[has_source], cols[has_source]] = batch[rows[has_source], source[has_source]]
+            to_fill &= ~head
+
+    # Recursive fill, one cluster rank at a time
+    rows, cols = np.nonzero(to_fill)
+    ranks = _cluster_ranks(rows, cols, n)
+    partial = leading == "partial"
+    for rank in range(int(ranks.max(initial=-1)) + 1):
+        step = ranks == rank
+        r, c = rows[step], cols[step]
+        total = np.zeros(len(r))
+        weight_sum = np.zeros(len(r))
+        for i in range(n):
+            source = c - 1 - i
+            values = batch[r, np.maximum(source, 0)]
+            use = source >= 0
+            if partial:
+                use &= ~((c < n) & np.isnan(values))
+            total += np.where(use, (n - i) * values, 0.0)
+            weight_sum += np.where(use, n - i, 0)
+        batch[r, c] = np.divide(total, weight_sum, out=np.full(len(r), np.nan), where=weight_sum > 0)
+
+    return filled
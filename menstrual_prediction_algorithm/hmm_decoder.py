@@ -0,0 +1,570 @@
+"""
+Hidden-Markov phase decoder.
+
+The hidden state is the cycle phase (period → follicular → fertile →
+ovulation → luteal → period ...). Each phase may persist or hand over to the
+next one, so the decoder can only produce phase sequences in cycle order,
+unlike the threshold detectors in `prediction_primitives`. Emissions are
+diagonal Gaussians over per-user standardized features: smoothed temperature
+and, optionally, minimum heart rate.
+
+Every algorithm works on a (users x days x features) batch and loops over
+days only; each step is a NumPy operation over all users. Scores are kept in
+log space: Viterbi adds log probabilities, and forward-backward rescales by
+the running maximum before each matrix product (a log-sum-exp over the
+previous state). NaN features (missing days, or padding after a shorter
+series) contribute no evidence, so padded batches decode exactly like the
+individual series. Large batches are processed in chunks of users to bound
+memory.
+
+Typical use:
+
+    obs = prepare_observations(temperature_batch, min_hr_batch)
+    model = GaussianHMM.fit_supervised(obs, label_batch)
+    states = model.viterbi(obs)                 # PhaseCodes, users x days
+
+`fit_em` is available for unlabelled data, but on mcPHASES it lowers the
+luteal accuracy of the supervised fit (see `main`), so it is not used by
+default.
+"""
+
+import itertools
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from filters import moving_average
+from phase_labels import PhaseCodes, encode_phases
+
+
+# Hidden states in cycle order; each state may only stay or move to the next one
+HMM_STATES = (
+    PhaseCodes.PERIOD,
+    PhaseCodes.FOLLICULAR,
+    PhaseCodes.FERTILE,
+    PhaseCodes.OVULATION,
+    PhaseCodes.LUTEAL,
+)
+
+# Mean stay in days, used to initialize the self-transition probabilities
+DEFAULT_DURATIONS = {
+    PhaseCodes.PERIOD: 5.0,
+    PhaseCodes.FOLLICULAR: 8.0,
+    PhaseCodes.FERTILE: 5.0,
+    PhaseCodes.OVULATION: 1.0,
+    PhaseCodes.LUTEAL: 13.0,
+}
+
+# Initial emission means (in per-user standard deviations), one row per state
+DEFAULT_MEANS = {
+    PhaseCodes.PERIOD: -0.3,
+    PhaseCodes.FOLLICULAR: -0.6,
+    PhaseCodes.FERTILE: -0.6,
+    PhaseCodes.OVULATION: 0.0,
+    PhaseCodes.LUTEAL: 0.9,
+}
+
+DEFAULT_CHUNK_SIZE = 10_000
+MIN_VARIANCE = 1e-3
+
+_STATE_INDEX = np.full(len(PhaseCodes), -1, dtype=np.int64)
+_STATE_INDEX[list(HMM_STATES)] = np.arange(len(HMM_STATES))
+_STATE_CODES = np.array(HMM_STATES, dtype=np.uint8)
+
+
+def cyclic_topology() -> np.ndarray:
+    """Boolean (K x K) mask of allowed transitions: stay, or move to the next phase."""
+    k = len(HMM_STATES)
+    allowed = np.eye(k, dtype=bool)
+    allowed[np.arange(k), (np.arange(k) + 1) % k] = True
+    return allowed
+
+
+def durations_to_transitions(durations: Dict[int, float] = DEFAULT_DURATIONS) -> np.ndarray:
+    """Transition matrix whose geometric stays have the given mean durations (in days)."""
+    k = len(HMM_STATES)
+    stay = np.array([1.0 - 1.0 / max(durations[state], 1.0) for state in HMM_STATES])
+    transitions = np.zeros((k, k))
+    transitions[np.arange(k), np.arange(k)] = stay
+    transitions[np.arange(k), (np.arange(k) + 1) % k] = 1.0 - stay
+    return transitions
+
+
+def prepare_observations(
+    temperature,
+    min_heart_rate=None,
+    smoothing_window: int = 3,
+) -> np.ndarray:
+    """
+    Build the (users x days x features) observation batch.
+
+    Each feature is smoothed with a centered moving average (same length as
+    the input) and standardized per user, so users with different baselines
+    share one set of emission parameters.
+
+    Parameters
+    ----------
+    temperature : array-like
+        1-D series or (users x days) batch, NaN for missing days.
+    min_heart_rate : array-like, optional
+        Same shape as `temperature`; adds a second feature.
+    smoothing_window : int, default 3
+        Moving-average window; 1 disables smoothing.
+
+    Returns
+    -------
+    np.ndarray
+        float64 array of shape (users, days, features).
+    """
+    signals = [temperature] if min_heart_rate is None else [temperature, min_heart_rate]
+    features = []
+    for signal in signals:
+        batch = np.atleast_2d(np.asarray(signal, dtype=np.float64))
+        if smoothing_window > 1:
+            batch = moving_average(batch, window_size=smoothing_window, edge="nearest")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)     # users without any observation
+            center = np.nanmean(batch, axis=1, keepdims=True)
+            scale = np.nanstd(batch, axis=1, keepdims=True)
+        features.append((batch - center) / np.where(scale > 0, scale, 1.0))
+    return np.stack(features, axis=-1)
+
+
+def pad_batch(series: List, fill: float = np.nan, dtype=np.float64) -> np.ndarray:
+    """Stack series of different lengths into one (users x max_days) array."""
+    batch = np.full((len(series), max((len(s) for s in series), default=0)), fill, dtype=dtype)
+    for row, values in enumerate(series):
+        batch[row, :len(values)] = values
+    return batch
+
+
+def period_constraints(labels) -> np.ndarray:
+    """
+    Clamp reported period days to the period state.
+
+    Returns a constraint array for `viterbi` / `posteriors`: PERIOD where the
+    label is "period", MISSING (unconstrained) elsewhere.
+    """
+    codes = encode_phases(labels) if not isinstance(labels, np.ndarray) else labels
+    return np.where(codes == PhaseCodes.PERIOD, PhaseCodes.PERIOD, PhaseCodes.MISSING).astype(np.uint8)
+
+
+def _logsumexp_rows(values: np.ndarray) -> np.ndarray:
+    top = values.max(axis=-1)
+    finite = np.isfinite(top)
+    safe = np.where(finite, top, 0.0)
+    with np.errstate(divide="ignore"):
+        return np.where(finite, np.log(np.exp(values - safe[..., None]).sum(axis=-1)) + safe, -np.inf)
+
+
+def _series_lengths(obs: np.ndarray) -> np.ndarray:
+    """Days up to and including each user's last observed day (at least 1)."""
+    observed_day = ~np.isnan(obs).all(axis=-1)
+    return np.where(observed_day.any(axis=1), obs.shape[1] - np.argmax(observed_day[:, ::-1], axis=1), 1)
+
+
+class GaussianHMM:
+    """
+    Cyclic phase HMM with diagonal Gaussian emissions.
+
+    Parameters
+    ----------
+    start : np.ndarray
+        (K,) initial state probabilities, in HMM_STATES order.
+    transitions : np.ndarray
+        (K x K) transition probabilities; zeros outside `cyclic_topology()`.
+    means, variances : np.ndarray
+        (K x F) emission parameters.
+    """
+
+    def __init__(self, start: np.ndarray, transitions: np.ndarray, means: np.ndarray, variances: np.ndarray):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.variances = np.maximum(np.asarray(variances, dtype=np.float64), MIN_VARIANCE)
+
+    @property
+    def num_features(self) -> int:
+        return self.means.shape[1]
+
+    @classmethod
+    def default(cls, num_features: int = 1) -> "GaussianHMM":
+        """Prior model: DEFAULT_DURATIONS and DEFAULT_MEANS for every feature, unit variance."""
+        k = len(HMM_STATES)
+        means = np.repeat([[DEFAULT_MEANS[state]] for state in HMM_STATES], num_features, axis=1)
+        return cls(np.full(k, 1.0 / k), durations_to_transitions(), means, np.ones((k, num_features)))
+
+    # ------------------------------------------------------------------
+    # Emissions
+    # ------------------------------------------------------------------
+
+    def emission_log_likelihood(self, obs: np.ndarray, constraints: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Log-likelihood of every observation under every state.
+
+        Parameters
+        ----------
+        obs : np.ndarray
+            (users x days x features); NaN features contribute nothing.
+        constraints : np.ndarray, optional
+            (users x days) PhaseCodes; days with a code other than MISSING
+            are clamped to that state.
+
+        Returns
+        -------
+        np.ndarray
+            (users x days x K).
+        """
+        # Expand the squares so the (days x features) -> (days x K) step is a
+        # matrix product; missing features drop out through x = 0 and the mask
+        observed = ~np.isnan(obs)
+        x = np.where(observed, obs, 0.0)
+        constant = -0.5 * np.log(2 * np.pi * self.variances) - 0.5 * self.means ** 2 / self.variances  # K, F
+        log_likelihood = (
+            (x ** 2) @ (-0.5 / self.variances).T
+            + x @ (self.means / self.variances).T
+            + observed.astype(np.float64) @ constant.T
+        )
+
+        if constraints is not None:
+            clamp = _STATE_INDEX[np.asarray(constraints, dtype=np.intp)]
+            clamped = clamp >= 0
+            disallowed = clamped[..., None] & (np.arange(len(HMM_STATES)) != clamp[..., None])
+            log_likelihood[disallowed] = -np.inf
+        return log_likelihood
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+
+    def _viterbi_chunk(self, log_b: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        num_users, num_days, k = log_b.shape
+        with np.errstate(divide="ignore"):
+            log_a_to = np.ascontiguousarray(np.log(self.transitions).T)   # to, from
+            delta = np.log(self.start) + log_b[:, 0]
+
+        last = lengths - 1
+        end_state = np.zeros(num_users, dtype=np.intp)
+        end_state[last == 0] = delta[last == 0].argmax(axis=1)
+        backpointers = np.empty((num_days, num_users, k), dtype=np.uint8)
+        for t in range(1, num_days):
+            scores = delta[:, None, :] + log_a_to                      # B, to, from
+            best = scores.argmax(axis=2)
+            backpointers[t] = best
+            delta = np.take_along_axis(scores, best[..., None], axis=2)[..., 0] + log_b[:, t]
+            ends = last == t
+            end_state[ends] = delta[ends].argmax(axis=1)
+
+        # Backtrack from each user's own last day
+        path = np.empty((num_users, num_days), dtype=np.intp)
+        path[:, -1] = end_state
+        rows = np.arange(num_users)
+        for t in range(num_days - 1, 0, -1):
+            path[:, t - 1] = np.where(last == t - 1, end_state, backpointers[t, rows, path[:, t]])
+        return path
+
+    def viterbi(
+        self,
+        obs: np.ndarray,
+        constraints: Optional[np.ndarray] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> np.ndarray:
+        """
+        Most likely phase sequence for every user.
+
+        Each series ends at its last observed day; days after it (padding,
+        or a trailing dropout) are decoded as MISSING.
+
+        Parameters
+        ----------
+        obs : np.ndarray
+            (users x days x features), see `prepare_observations`.
+        constraints : np.ndarray, optional
+            (users x days) clamped states, see `emission_log_likelihood`.
+        chunk_size : int
+            Users decoded at once.
+
+        Returns
+        -------
+        np.ndarray
+            uint8 PhaseCodes, (users x days).
+        """
+        lengths = _series_lengths(obs)
+
+        states = np.empty(obs.shape[:2], dtype=np.uint8)
+        for start in range(0, obs.shape[0], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            log_b = self.emission_log_likelihood(
+                obs[chunk], None if constraints is None else constraints[chunk]
+            )
+            states[chunk] = _STATE_CODES[self._viterbi_chunk(log_b, lengths[chunk])]
+        states[np.arange(obs.shape[1]) >= lengths[:, None]] = PhaseCodes.MISSING
+        return states
+
+    def _forward_backward_chunk(self, log_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Log alphas, log betas and per-user log-likelihood for one chunk."""
+        num_users, num_days, k = log_b.shape
+        with np.errstate(divide="ignore"):
+            log_alpha = np.empty_like(log_b)
+            log_alpha[:, 0] = np.log(self.start) + log_b[:, 0]
+            for t in range(1, num_days):
+                top = log_alpha[:, t - 1].max(axis=1, keepdims=True)
+                top = np.where(np.isfinite(top), top, 0.0)
+                log_alpha[:, t] = np.log(np.exp(log_alpha[:, t - 1] - top) @ self.transitions) + top + log_b[:, t]
+
+            log_beta = np.empty_like(log_b)
+            log_beta[:, -1] = 0.0
+            for t in range(num_days - 2, -1, -1):
+                future = log_b[:, t + 1] + log_beta[:, t + 1]
+                top = future.max(axis=1, keepdims=True)
+                top = np.where(np.isfinite(top), top, 0.0)
+                log_beta[:, t] = np.log(np.exp(future - top) @ self.transitions.T) + top
+
+        return log_alpha, log_beta, _logsumexp_rows(log_alpha[:, -1])
+
+    def posteriors(
+        self,
+        obs: np.ndarray,
+        constraints: Optional[np.ndarray] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-day state probabilities (forward-backward).
+
+        Returns
+        -------
+        posteriors : np.ndarray
+            (users x days x K), columns in HMM_STATES order.
+        log_likelihood : np.ndarray
+            (users,) log-likelihood of each series.
+        """
+        gamma = np.empty(obs.shape[:2] + (len(HMM_STATES),))
+        log_likelihood = np.empty(obs.shape[0])
+        for start in range(0, obs.shape[0], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            log_b = self.emission_log_likelihood(
+                obs[chunk], None if constraints is None else constraints[chunk]
+            )
+            log_alpha, log_beta, ll = self._forward_backward_chunk(log_b)
+            gamma[chunk] = np.exp(log_alpha + log_beta - ll[:, None, None])
+            log_likelihood[chunk] = ll
+        return gamma, log_likelihood
+
+    def posterior_states(self, obs: np.ndarray, constraints: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Most probable state of each day on its own (maximum posterior), as PhaseCodes.
+
+        Days after a user's last observed day are MISSING, as in `viterbi`.
+        """
+        gamma, _ = self.posteriors(obs, constraints)
+        states = _STATE_CODES[gamma.argmax(axis=-1)]
+        states[np.arange(obs.shape[1]) >= _series_lengths(obs)[:, None]] = PhaseCodes.MISSING
+        return states
+
+    # ------------------------------------------------------------------
+    # Fitting
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def fit_supervised(cls, obs: np.ndarray, labels: np.ndarray) -> "GaussianHMM":
+        """
+        Estimate the emissions and start probabilities from labelled days.
+
+        Transitions keep the DEFAULT_DURATIONS prior: label sets that merge
+        phases (mcPHASES has no fertile or ovulation days, they are labelled
+        follicular) skip states, so their transition counts do not fit the
+        cyclic topology. `fit_em` refines them. States that never occur in
+        `labels` keep their default emissions.
+
+        Parameters
+        ----------
+        obs : np.ndarray
+            (users x days x features).
+        labels : np.ndarray
+            (users x days) PhaseCodes; MISSING days are ignored.
+        """
+        model = cls.default(obs.shape[-1])
+        state = _STATE_INDEX[np.asarray(labels, dtype=np.intp)]
+        k = len(HMM_STATES)
+
+        for s in range(k):
+            rows = obs[state == s]                                     # days x F
+            if ((~np.isnan(rows)).sum(axis=0) < 2).any():
+                continue
+            model.means[s] = np.nanmean(rows, axis=0)
+            model.variances[s] = np.maximum(np.nanvar(rows, axis=0), MIN_VARIANCE)
+
+        first = state[:, 0]
+        start_counts = np.bincount(first[first >= 0], minlength=k) + 1.0
+        model.start = start_counts / start_counts.sum()
+        return model
+
+    def fit_em(
+        self,
+        obs: np.ndarray,
+        max_iterations: int = 20,
+        tolerance: float = 1e-4,
+        constraints: Optional[np.ndarray] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> "GaussianHMM":
+        """
+        Refine the parameters in place with Baum-Welch (EM).
+
+        Forbidden transitions stay at zero. Iteration stops when the mean
+        per-day log-likelihood improves by less than `tolerance`. The labels
+        are not used, so the states may drift away from the labelled phases.
+
+        Returns
+        -------
+        GaussianHMM
+            self, with `log_likelihood_history` recording each iteration.
+        """
+        k = len(HMM_STATES)
+        observed = ~np.isnan(obs)
+        num_observed_days = max(int(observed.any(axis=-1).sum()), 1)
+        self.log_likelihood_history = []
+
+        for _ in range(max_iterations):
+            start_stats = np.zeros(k)
+            transition_stats = np.zeros((k, k))
+            weight = np.zeros((k, self.num_features))
+            first_moment = np.zeros((k, self.num_features))
+            second_moment = np.zeros((k, self.num_features))
+            total = 0.0
+
+            for start in range(0, obs.shape[0], chunk_size):
+                chunk = slice(start, start + chunk_size)
+                x = obs[chunk]
+                log_b = self.emission_log_likelihood(x, None if constraints is None else constraints[chunk])
+                log_alpha, log_beta, ll = self._forward_backward_chunk(log_b)
+                lengths = _series_lengths(x)
+                usable = np.isfinite(ll)
+                if not usable.all():
+                    log_alpha, log_beta, log_b, x, ll, lengths = (
+                        log_alpha[usable], log_beta[usable], log_b[usable], x[usable], ll[usable], lengths[usable]
+                    )
+                total += ll.sum()
+
+                gamma = np.exp(log_alpha + log_beta - ll[:, None, None])   # B, T, K
+                start_stats += gamma[:, 0].sum(axis=0)
+
+                # Expected transitions, summed over users and days. Transitions into
+                # the padded tail after a user's last observed day are skipped:
+                # there beta carries no evidence and would only echo the current A.
+                for t in range(x.shape[1] - 1):
+                    active = t + 1 < lengths
+                    if not active.any():
+                        break
+                    past = log_alpha[:, t]
+                    future = log_b[:, t + 1] + log_beta[:, t + 1]
+                    past_top = np.where(np.isfinite(past.max(axis=1)), past.max(axis=1), 0.0)
+                    future_top = np.where(np.isfinite(future.max(axis=1)), future.max(axis=1), 0.0)
+                    scale = np.exp(past_top + future_top - ll)
+                    p = np.exp(past - past_top[:, None]) * (scale * active)[:, None]
+                    q = np.exp(future - future_top[:, None])
+                    transition_stats += self.transitions * (p.T @ q)
+
+                seen = ~np.isnan(x)
+                values = np.where(seen, x, 0.0)
+                weight += np.einsum("btk,btf->kf", gamma, seen)
+                first_moment += np.einsum("btk,btf->kf", gamma, values)
+                second_moment += np.einsum("btk,btf->kf", gamma, values ** 2)
+
+            self.start = start_stats / start_stats.sum()
+            rows = transition_stats.sum(axis=1, keepdims=True)
+            self.transitions = np.where(rows > 0, transition_stats / np.where(rows > 0, rows, 1.0), self.transitions)
+            has_weight = weight > 0
+            means = np.where(has_weight, first_moment / np.where(has_weight, weight, 1.0), self.means)
+            variances = np.where(
+                has_weight, second_moment / np.where(has_weight, weight, 1.0) - means ** 2, self.variances
+            )
+            self.means = means
+            self.variances = np.maximum(variances, MIN_VARIANCE)
+
+            self.log_likelihood_history.append(total / num_observed_days)
+            history = self.log_likelihood_history
+            if len(history) > 1 and history[-1] - history[-2] < tolerance:
+                break
+        return self
+
+
+# --------------------------------------------------------------------------------------
+# mcPHASES EVALUATION
+# --------------------------------------------------------------------------------------
+
+def evaluate_on_validation(
+    use_heart_rate: bool = True,
+    clamp_periods: bool = True,
+    em: bool = False,
+    decoding: str = "viterbi",
+    warmup_period: int = 14,
+) -> Tuple["GaussianHMM", np.ndarray]:
+    """
+    Fit on the mcPHASES validation set and score the decoding.
+
+    The model is initialized from the labels (`fit_supervised`) and
+    optionally refined with EM. Scoring follows `compute_accuracy`: luteal or
+    ovulation vs. everything else, skipping `warmup_period` days, per
+    participant. The fit is in-sample.
+
+    Parameters
+    ----------
+    use_heart_rate : bool
+        Add minimum heart rate as a second feature.
+    clamp_periods : bool
+        Clamp labelled period days (see `period_constraints`), like the
+        period-adjusting detector uses reported periods.
+    em : bool, default False
+        Refine the supervised estimate with `fit_em`. EM maximizes the
+        likelihood without the labels and drifts away from the labelled
+        phases, so this lowers the accuracy on mcPHASES.
+    decoding : str
+        "viterbi" (best sequence) or "posterior" (best state per day).
+
+    Returns
+    -------
+    model : GaussianHMM
+    accuracy : np.ndarray
+        Per-participant luteal accuracy, in sorted participant order.
+    """
+    from scoring import encode_label_batch, score_phases
+    from validation_loading import load_validation_cohort
+
+    if decoding not in ("viterbi", "posterior"):
+        raise ValueError(f"Unknown decoding {decoding!r}; expected 'viterbi' or 'posterior'")
+
+    temp_data, min_hr_data, labels = load_validation_cohort().to_dicts()
+    participants = sorted(temp_data)
+    codes = encode_label_batch([labels[p] for p in participants])
+    obs = prepare_observations(
+        pad_batch([temp_data[p] for p in participants]),
+        pad_batch([min_hr_data[p] for p in participants]) if use_heart_rate else None,
+    )
+    constraints = period_constraints(codes) if clamp_periods else None
+
+    model = GaussianHMM.fit_supervised(obs, codes)
+    if em:
+        model.fit_em(obs, constraints=constraints)
+    if decoding == "viterbi":
+        states = model.viterbi(obs, constraints)
+    else:
+        states = model.posterior_states(obs, constraints)
+
+    luteal = (states == PhaseCodes.LUTEAL) | (states == PhaseCodes.OVULATION)
+    accuracy = score_phases(codes, luteal, warmup_period=warmup_period)["luteal"]["accuracy"]
+    return model, accuracy
+
+
+def main() -> None:
+    """Report the decoder's mcPHASES luteal accuracy for each input / fitting / decoding choice."""
+    print("heart rate  period clamping  EM     decoding    accuracy")
+    for use_heart_rate, clamp_periods, em, decoding in itertools.product(
+        (False, True), (False, True), (False, True), ("viterbi", "posterior")
+    ):
+        _, accuracy = evaluate_on_validation(use_heart_rate, clamp_periods, em, decoding)
+        print(f"{use_heart_rate!s:<11} {clamp_periods!s:<16} {em!s:<6} {decoding:<11} {np.nanmean(accuracy):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Stage timers and counters for the prediction pipeline.
+
+Loaders and detectors wrap their work in `stage(name)` blocks (or the
+`timed` decorator) and bump counters with `count(name, n)`. Stages nest, so
+a timer is keyed by its path, e.g.
+"compute_weighted_window_spiked_prediction_accuracy/detection".
+
+Instrumentation is off by default. Turn it on with `enable()` or by setting
+MENSTRUAL_METRICS=1 in the environment. While off, `stage` hands back a
+shared no-op context manager and `count` returns immediately, so the
+instrumented code only pays for a flag check.
+
+The collected metrics are available as a dict (`report`), as Prometheus
+text exposition format (`to_prometheus`), or written to a file
+(`write_report`, `export_if_enabled`).
+
+Example
+-------
+    MENSTRUAL_METRICS=1 MENSTRUAL_METRICS_REPORT=../cache/metrics.prom python dev_data_driver.py
+"""
+
+import contextlib
+import functools
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+
+METRICS_ENV = "MENSTRUAL_METRICS"
+REPORT_ENV = "MENSTRUAL_METRICS_REPORT"
+DEFAULT_REPORT_PATH = "../cache/metrics.prom"
+PROMETHEUS_PREFIX = "menstrual"
+
+_enabled = os.environ.get(METRICS_ENV, "") not in ("", "0")
+_timers: Dict[str, List[float]] = {}     # path → [calls, total seconds, max seconds]
+_counters: Dict[str, float] = {}
+_path: List[str] = []
+_NULL_STAGE = contextlib.nullcontext()
+
+
+# --------------------------------------------------------------------------------------
+# SWITCHES
+# --------------------------------------------------------------------------------------
+
+def enable() -> None:
+    """Start collecting metrics."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop collecting metrics; collected values are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop every collected timer and counter."""
+    _timers.clear()
+    _counters.clear()
+    _path.clear()
+
+
+# --------------------------------------------------------------------------------------
+# COLLECTION
+# --------------------------------------------------------------------------------------
+
+class _Stage:
+    """Times one stage and records it under the current stage path."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        _path.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        key = "/".join(_path)
+        _path.pop()
+        timer = _timers.get(key)
+        if timer is None:
+            _timers[key] = [1, elapsed, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing the enclosed block as stage `name`."""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call of the function as a stage (default: its name)."""
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add `value` to counter `name`."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+# --------------------------------------------------------------------------------------
+# EXPORT
+# --------------------------------------------------------------------------------------
+
+def report() -> Dict:
+    """
+    Snapshot of the collected metrics.
+
+    Returns
+    -------
+    dict
+        {"timers": {path: {"calls", "total_seconds", "max_seconds"}},
+         "counters": {name: value}}
+    """
+    return {
+        "timers": {
+            key: {"calls": int(calls), "total_seconds": total, "max_seconds": longest}
+            for key, (calls, total, longest) in _timers.items()
+        },
+        "counters": dict(_counters),
+    }
+
+
+def merge(other: Dict) -> None:
+    """Add a `report()` snapshot (e.g. from a worker process) into the collected metrics."""
+    for key, timer in other["timers"].items():
+        current = _timers.setdefault(key, [0, 0.0, 0.0])
+        current[0] += timer["calls"]
+        current[1] += timer["total_seconds"]
+        current[2] = max(current[2], timer["max_seconds"])
+    for name, value in other["counters"].items():
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{PROMETHEUS_PREFIX}_{name}")
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus() -> str:
+    """Collected metrics in Prometheus text exposition format."""
+    lines = []
+    timer_metrics = (
+        ("stage_calls_total", "counter", "Number of times each pipeline stage ran.", 0),
+        ("stage_seconds_total", "counter", "Wall-clock seconds spent in each pipeline stage.", 1),
+        ("stage_seconds_max", "gauge", "Longest single run of each pipeline stage in seconds.", 2),
+    )
+    for suffix, kind, help_text, field in timer_metrics:
+        if not _timers:
+            break
+        metric = _metric_name(suffix)
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for key, timer in sorted(_timers.items()):
+            lines.append(f'{metric}{{stage="{_label_value(key)}"}} {timer[field]:g}')
+
+    for name, value in sorted(_counters.items()):
+        metric = _metric_name(f"{name}_total")
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path: str) -> str:
+    """
+    Write the collected metrics to `path`.
+
+    Files ending in ".prom" or ".txt" get Prometheus text format (suitable
+    for a node_exporter textfile collector); anything else gets the JSON
+    form of `report()`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        if path.endswith((".prom", ".txt")):
+            f.write(to_prometheus())
+        else:
+            json.dump(report(), f, indent=2)
+    return path
+
+
+def export_if_enabled() -> Optional[str]:
+    """Write the report to MENSTRUAL_METRICS_REPORT (or DEFAULT_REPORT_PATH) if enabled."""
+    if not _enabled:
+        return None
+    return write_report(os.environ.get(REPORT_ENV, DEFAULT_REPORT_PATH))
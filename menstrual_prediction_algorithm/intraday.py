@@ -0,0 +1,304 @@
+"""
+Intraday (within-night) sleep signals from the Oura `sleep_*.csv` export.
+
+Each sleep session row carries
+
+- `heart_rate` / `hrv`: repr dicts with an `interval` (seconds) and an
+  `items` list of samples (None for gaps), starting at bedtime,
+- `sleep_phase_5_min`: one digit per 5 minutes (1 = deep, 2 = light,
+  3 = REM, 4 = awake),
+- `movement_30_sec`: one digit per 30 seconds (1 = still ... 4 = restless).
+
+They are decoded for the whole column at once into ragged arrays: one flat
+buffer (float32 for samples, uint8 for digits) plus an int64 offsets index,
+so row i is `values[offsets[i]:offsets[i + 1]]`. The buffers are cached as
+`.npy` files next to the sleep cache and memory-mapped on load.
+`nightly_features` reduces them to per-night features without a Python
+loop over nights.
+"""
+
+import os
+import re
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sleep_cache import SESSION_TYPES, cache_is_fresh, cache_path, write_cache_meta
+
+
+INTRADAY_CACHE_DIR = "../cache/intraday"
+INTRADAY_CACHE_VERSION = 1
+
+SLEEP_PHASE_INTERVAL_S = 300
+MOVEMENT_INTERVAL_S = 30
+DEEP_SLEEP = 1
+
+_ITEMS = re.compile(r"""['"]items['"]\s*:\s*\[([^\]]*)\]""")
+_INTERVAL = re.compile(r"""['"]interval['"]\s*:\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)""")
+
+_SAMPLE_SIGNALS = ("heart_rate", "hrv")
+_DIGIT_SIGNALS = {"sleep_phase": "sleep_phase_5_min", "movement": "movement_30_sec"}
+
+
+class RaggedArray:
+    """
+    Variable-length rows stored as one flat buffer plus offsets.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        All rows concatenated.
+    offsets : np.ndarray
+        int64 array of length rows + 1; row i is values[offsets[i]:offsets[i + 1]].
+    """
+
+    __slots__ = ("values", "offsets")
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_lengths(cls, values: np.ndarray, lengths: np.ndarray) -> "RaggedArray":
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] != len(values):
+            raise ValueError(f"Row lengths sum to {offsets[-1]} but there are {len(values)} values")
+        return cls(values, offsets)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def row_ids(self) -> np.ndarray:
+        """Row index of every value."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def positions(self) -> np.ndarray:
+        """Index of every value within its row."""
+        return np.arange(len(self.values)) - np.repeat(self.offsets[:-1], self.lengths)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        return self.values[self.offsets[row]:self.offsets[row + 1]]
+
+    def save(self, path: str, name: str) -> None:
+        np.save(os.path.join(path, f"{name}_values.npy"), self.values)
+        np.save(os.path.join(path, f"{name}_offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, path: str, name: str, mmap_mode: str = "r") -> "RaggedArray":
+        return cls(
+            np.load(os.path.join(path, f"{name}_values.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode=mmap_mode),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Decoding
+# ---------------------------------------------------------------------------
+
+def decode_sample_lists(blobs: pd.Series) -> Tuple[RaggedArray, np.ndarray]:
+    """
+    Decode a column of `{'interval': ..., 'items': [...]}` blobs.
+
+    Parameters
+    ----------
+    blobs : pd.Series
+        Repr or JSON strings; NaN cells decode to empty rows.
+
+    Returns
+    -------
+    samples : RaggedArray
+        float32 samples per row, NaN where the item was None/null.
+    interval : np.ndarray
+        float32 sampling interval in seconds per row (NaN if absent).
+    """
+    blobs = blobs.astype(object).where(blobs.map(lambda cell: isinstance(cell, str)))
+    items = blobs.str.extract(_ITEMS, expand=False).fillna("")
+    interval = pd.to_numeric(blobs.str.extract(_INTERVAL, expand=False), errors="coerce")
+
+    has_items = items.str.strip() != ""
+    lengths = np.where(has_items, items.str.count(",") + 1, 0)
+    text = ",".join(items[has_items]).replace("None", "nan").replace("null", "nan")
+    values = np.fromstring(text, dtype=np.float32, sep=",") if text else np.empty(0, dtype=np.float32)
+
+    return RaggedArray.from_lengths(values, lengths), interval.to_numpy(dtype=np.float32)
+
+
+def decode_digit_strings(strings: pd.Series) -> RaggedArray:
+    """
+    Decode a column of digit strings (e.g. "4422111...") into uint8 rows.
+
+    NaN cells decode to empty rows.
+    """
+    strings = strings.astype(object).where(strings.map(lambda cell: isinstance(cell, str)), "")
+    cells = strings.tolist()
+    lengths = np.fromiter((len(cell) for cell in cells), dtype=np.int64, count=len(cells))
+    values = np.frombuffer("".join(cells).encode("ascii"), dtype=np.uint8) - ord("0")
+    return RaggedArray.from_lengths(values.astype(np.uint8), lengths)
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def _cache_files():
+    names = ["day.npy", "session_type.npy"]
+    for signal in _SAMPLE_SIGNALS:
+        names += [f"{signal}_values.npy", f"{signal}_offsets.npy", f"{signal}_interval.npy"]
+    for signal in _DIGIT_SIGNALS:
+        names += [f"{signal}_values.npy", f"{signal}_offsets.npy"]
+    return names
+
+
+def ingest_intraday(source: str, cache_dir: str = INTRADAY_CACHE_DIR) -> str:
+    """
+    Decode the intraday columns of a sleep export and write them to the cache.
+
+    Returns
+    -------
+    str
+        Directory holding the cached arrays.
+    """
+    columns = ["day", "type", *_SAMPLE_SIGNALS, *_DIGIT_SIGNALS.values()]
+    # Read as strings: the long digit strings would otherwise be parsed as integers
+    df = pd.read_csv(source, usecols=columns, dtype=str)
+
+    path = cache_path(source, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "day.npy"), df["day"].to_numpy(dtype="datetime64[D]"))
+    np.save(os.path.join(path, "session_type.npy"),
+            pd.Categorical(df["type"], categories=SESSION_TYPES).codes.astype(np.int8))
+
+    for signal in _SAMPLE_SIGNALS:
+        samples, interval = decode_sample_lists(df[signal])
+        samples.save(path, signal)
+        np.save(os.path.join(path, f"{signal}_interval.npy"), interval)
+    for signal, column in _DIGIT_SIGNALS.items():
+        decode_digit_strings(df[column]).save(path, signal)
+
+    write_cache_meta(source, path, INTRADAY_CACHE_VERSION, rows=len(df))
+    return path
+
+
+def load_intraday(source: str, cache_dir: str = INTRADAY_CACHE_DIR) -> Dict:
+    """
+    Load the memory-mapped intraday arrays, ingesting the export first if needed.
+
+    Returns
+    -------
+    dict
+        One entry per sleep session row: "day" (datetime64[D]), "session_type"
+        (int8 index into SESSION_TYPES), "heart_rate" and "hrv" (float32
+        RaggedArray) with "heart_rate_interval" / "hrv_interval" (seconds),
+        "sleep_phase" and "movement" (uint8 RaggedArray).
+    """
+    path = cache_path(source, cache_dir)
+    if not cache_is_fresh(source, path, INTRADAY_CACHE_VERSION, _cache_files()):
+        ingest_intraday(source, cache_dir)
+
+    intraday = {
+        "day": np.load(os.path.join(path, "day.npy"), mmap_mode="r"),
+        "session_type": np.load(os.path.join(path, "session_type.npy"), mmap_mode="r"),
+    }
+    for signal in _SAMPLE_SIGNALS:
+        intraday[signal] = RaggedArray.load(path, signal)
+        intraday[f"{signal}_interval"] = np.load(os.path.join(path, f"{signal}_interval.npy"), mmap_mode="r")
+    for signal in _DIGIT_SIGNALS:
+        intraday[signal] = RaggedArray.load(path, signal)
+    return intraday
+
+
+# ---------------------------------------------------------------------------
+# Nightly features
+# ---------------------------------------------------------------------------
+
+def _row_sums(rows: np.ndarray, weights: np.ndarray, num_rows: int) -> np.ndarray:
+    return np.bincount(rows, weights=weights, minlength=num_rows)
+
+
+def _row_means(rows: np.ndarray, values: np.ndarray, num_rows: int) -> np.ndarray:
+    total = _row_sums(rows, values, num_rows)
+    count = _row_sums(rows, None, num_rows)
+    return np.divide(total, count, out=np.full(num_rows, np.nan), where=count > 0)
+
+
+def nightly_features(intraday: Dict) -> pd.DataFrame:
+    """
+    Per-session features from the intraday arrays.
+
+    Parameters
+    ----------
+    intraday : dict
+        As returned by `load_intraday`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per sleep session with columns:
+
+        - day, session_type
+        - hr_nadir_minutes : minutes after bedtime of the lowest heart rate
+          (first occurrence)
+        - hr_nadir_fraction : the same position as a fraction of the night
+        - hrv_deep_mean : mean HRV over samples scored as deep sleep
+        - hr_slope : least-squares heart-rate trend in bpm per hour. The
+          export has no intraday temperature, and the overnight heart-rate
+          trend follows the same thermoregulatory curve, so it serves as the
+          temperature proxy.
+        - movement_mean : mean 30-second movement score
+    """
+    heart_rate, hrv = intraday["heart_rate"], intraday["hrv"]
+    phases, movement = intraday["sleep_phase"], intraday["movement"]
+    num_rows = len(heart_rate)
+
+    # Heart-rate nadir: sort each row by value (NaN last), earliest position on ties
+    rows, positions = heart_rate.row_ids(), heart_rate.positions()
+    values = np.asarray(heart_rate.values, dtype=np.float64)
+    finite = np.isfinite(values)
+    order = np.lexsort((positions, np.where(finite, values, np.inf), rows))
+    nadir = np.full(num_rows, -1)
+    first_rows, first = np.unique(rows[order], return_index=True)
+    nadir[first_rows] = np.where(finite[order[first]], positions[order[first]], -1)
+
+    hr_interval = np.asarray(intraday["heart_rate_interval"], dtype=np.float64)
+    has_nadir = nadir >= 0
+    nadir_minutes = np.where(has_nadir, nadir * hr_interval / 60.0, np.nan)
+    span = np.maximum(heart_rate.lengths - 1, 1)
+    nadir_fraction = np.where(has_nadir, nadir / span, np.nan)
+
+    # Heart-rate slope: per-row least squares over finite samples
+    hours = positions * hr_interval[rows] / 3600.0
+    r, t, y = rows[finite], hours[finite], values[finite]
+    n = _row_sums(r, None, num_rows)
+    st, sy = _row_sums(r, t, num_rows), _row_sums(r, y, num_rows)
+    stt, sty = _row_sums(r, t * t, num_rows), _row_sums(r, t * y, num_rows)
+    denominator = n * stt - st * st
+    hr_slope = np.divide(n * sty - st * sy, denominator, out=np.full(num_rows, np.nan),
+                         where=(n >= 2) & (denominator > 0))
+
+    # HRV in deep sleep: HRV and sleep phases are both 5-minute samples from bedtime
+    hrv_rows, hrv_positions = hrv.row_ids(), hrv.positions()
+    in_phase = hrv_positions < phases.lengths[hrv_rows]
+    phase_index = np.where(in_phase, phases.offsets[:-1][hrv_rows] + hrv_positions, 0)
+    phase = np.where(in_phase, np.asarray(phases.values)[phase_index] if len(phases.values) else 0, 0)
+    hrv_values = np.asarray(hrv.values, dtype=np.float64)
+    deep = (phase == DEEP_SLEEP) & np.isfinite(hrv_values)
+    hrv_deep_mean = _row_means(hrv_rows[deep], hrv_values[deep], num_rows)
+
+    movement_mean = _row_means(movement.row_ids(), np.asarray(movement.values, dtype=np.float64), num_rows)
+
+    session_names = np.array(SESSION_TYPES + ("unknown",), dtype=object)
+    return pd.DataFrame({
+        "day": np.asarray(intraday["day"]),
+        "session_type": session_names[np.asarray(intraday["session_type"])],
+        "hr_nadir_minutes": nadir_minutes,
+        "hr_nadir_fraction": nadir_fraction,
+        "hrv_deep_mean": hrv_deep_mean,
+        "hr_slope": hr_slope,
+        "movement_mean": movement_mean,
+    })
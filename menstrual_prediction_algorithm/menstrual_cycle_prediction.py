@@ -8,10 +8,15 @@ Includes:
     - Optional visualization and label generation
 """
 
-from typing import List, Tuple, Set
+from typing import List, Optional, Sequence, Tuple, Set, Union
+
+import numpy as np
 
 from data_processing_utils import low_pass, create_generated_labels
+from instrumentation import count, stage, timed
+from phase_labels import PhaseCodes, PhaseLabels, encode_phases
 from prediction_primitives import (
+    incremental_window_means,
     identify_windowed_spikes,
     identify_weighted_windowed_spikes,
 )
@@ -39,8 +44,12 @@ OVULATION_FORGIVENESS_WINDOW_DAYS = 3
 
 def period_adjusting_identify_weighted_windowed_spikes(
     data: List[float],
-    labels: List[str],
-    n: int = 14
+    labels: Union[List[str], PhaseLabels],
+    n: int = 14,
+    fertile_days_before_luteal: int = FERTILE_DAYS_BEFORE_LUTEAL,
+    fertile_days_during_luteal: int = FERTILE_DAYS_DURING_LUTEAL,
+    period_length_days: int = PERIOD_LENGTH_DAYS,
+    window_means: Optional[Sequence[float]] = None,
 ) -> Tuple[List[int], List[int], List[int], List[int]]:
     """
     Label-aware variant of weighted windowed spike detection.
@@ -55,10 +64,19 @@ def period_adjusting_identify_weighted_windowed_spikes(
     ----------
     data : List[float]
         Smoothed temperature or physiological signal.
-    labels : List[str]
+    labels : List[str] or PhaseLabels
         Ground-truth labels for cycle tracking (e.g., follicular, luteal, period).
     n : int, default 14
         Rolling window size used for calculating moving average.
+    fertile_days_before_luteal : int, default FERTILE_DAYS_BEFORE_LUTEAL
+        Fertile days predicted before the expected spike.
+    fertile_days_during_luteal : int, default FERTILE_DAYS_DURING_LUTEAL
+        Fertile days predicted after the expected spike.
+    period_length_days : int, default PERIOD_LENGTH_DAYS
+        Length of the period predicted after a spike drop.
+    window_means : Sequence[float], optional
+        Precomputed means of data[k : k + n] (see `RollingStats.window_means`).
+        Computed incrementally if omitted.
 
     Returns
     -------
@@ -71,7 +89,8 @@ def period_adjusting_identify_weighted_windowed_spikes(
     if len(data) < n:
         return [], [], [], []
 
-    windowed_sum = sum(data[:n])
+    if window_means is None:
+        window_means = incremental_window_means(data, n)
     spike_indices = []
     ovulation_indices = []
     fertility_indices = []
@@ -79,9 +98,12 @@ def period_adjusting_identify_weighted_windowed_spikes(
 
     spiked_run = False
 
+    # Integer-coded comparison against "period" instead of per-day string compares
+    is_period = (encode_phases(labels) == PhaseCodes.PERIOD).tolist()
+
     # Initialize run size (distance since last period)
-    if "period" in labels[:n]:
-        current_run_size = n - labels.index("period")
+    if True in is_period[:n]:
+        current_run_size = n - is_period.index(True)
     else:
         current_run_size = n
 
@@ -89,11 +111,11 @@ def period_adjusting_identify_weighted_windowed_spikes(
         # ------------------------------------------------------------------
         # Predict fertility/ovulation window relative to expected spike day
         # ------------------------------------------------------------------
-        fertile_start_target = n - FERTILE_DAYS_BEFORE_LUTEAL
+        fertile_start_target = n - fertile_days_before_luteal
 
         if current_run_size == fertile_start_target and not spiked_run:
             # Fertile window spans BEFORE + AFTER luteal detection
-            fertile_span = FERTILE_DAYS_BEFORE_LUTEAL + FERTILE_DAYS_DURING_LUTEAL
+            fertile_span = fertile_days_before_luteal + fertile_days_during_luteal
 
             for offset in range(fertile_span):
                 idx = i + offset
@@ -101,7 +123,7 @@ def period_adjusting_identify_weighted_windowed_spikes(
                     fertility_indices.append(idx)
 
             # Ovulation roughly in the middle of fertile window
-            ov_idx = i + FERTILE_DAYS_BEFORE_LUTEAL
+            ov_idx = i + fertile_days_before_luteal
             if ov_idx < len(data):
                 ovulation_indices.append(ov_idx)
 
@@ -111,7 +133,7 @@ def period_adjusting_identify_weighted_windowed_spikes(
         run_weight = current_run_size / n
         run_weight = run_weight if spiked_run else (2 - run_weight)
 
-        threshold = run_weight * (windowed_sum / n)
+        threshold = run_weight * window_means[i - n]
 
         # ------------------------------------------------------------------
         # Spike detection logic
@@ -127,22 +149,18 @@ def period_adjusting_identify_weighted_windowed_spikes(
             # Spike ends — predict period region
             if spiked_run:
                 spiked_run = False
-                for offset in range(PERIOD_LENGTH_DAYS):
+                for offset in range(period_length_days):
                     idx = i + offset
                     if idx < len(data):
                         period_indices.append(idx)
                 current_run_size = 0
 
-        # ------------------------------------------------------------------
-        # Rolling window update
-        # ------------------------------------------------------------------
-        windowed_sum += data[i] - data[i - n]
         current_run_size += 1
 
         # ------------------------------------------------------------------
         # Recalibrate if user-reported period input appears
         # ------------------------------------------------------------------
-        if labels[i - 1] != "period" and labels[i] == "period":
+        if not is_period[i - 1] and is_period[i]:
             current_run_size = 1
             spiked_run = False
 
@@ -153,17 +171,21 @@ def period_adjusting_identify_weighted_windowed_spikes(
 # BASELINE SPIKE PREDICTIONS
 # --------------------------------------------------------------------------------------
 
-def _compute_true_luteal_indices(labels: List[str], window_size: int) -> List[int]:
+def _compute_true_luteal_indices(
+    labels: Union[List[str], PhaseLabels],
+    window_size: int
+) -> List[int]:
     """Helper for visualization."""
-    return [
-        i for i in range(window_size, len(labels))
-        if labels[i] in ("luteal", "ovulation")
-    ]
+    codes = encode_phases(labels)
+    is_luteal = (codes == PhaseCodes.LUTEAL) | (codes == PhaseCodes.OVULATION)
+    is_luteal[:window_size] = False
+    return np.flatnonzero(is_luteal).tolist()
 
 
+@timed()
 def compute_spiked_prediction_accuracy(
     data: List[float],
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     window_size: int = 14,
     visualize: bool = True
 ):
@@ -171,22 +193,27 @@ def compute_spiked_prediction_accuracy(
     Compute accuracy using basic spike detection (simple moving average).
     """
 
-    smoothed = low_pass(data, window_size=3)
-    spike_indices = identify_windowed_spikes(smoothed, n=window_size)
+    with stage("smoothing"):
+        smoothed = low_pass(data, window_size=3)
+    with stage("detection"):
+        spike_indices = identify_windowed_spikes(smoothed, n=window_size)
+    count("spikes_found", len(spike_indices))
 
-    accuracy, total_correct, total_considered = compute_accuracy(
-        labels, set(spike_indices), warmup_period=window_size
-    )
+    with stage("scoring"):
+        accuracy, total_correct, total_considered = compute_accuracy(
+            labels, set(spike_indices), warmup_period=window_size
+        )
 
     print(f"Accuracy: {accuracy:.3f}")
 
     if visualize:
-        true_spikes = _compute_true_luteal_indices(labels, window_size)
-        graph_stacked_with_highlights(
-            smoothed, spike_indices,
-            smoothed, true_spikes,
-            data0Name="predicted", data1Name="true_label"
-        )
+        with stage("plotting"):
+            true_spikes = _compute_true_luteal_indices(labels, window_size)
+            graph_stacked_with_highlights(
+                smoothed, spike_indices,
+                smoothed, true_spikes,
+                data0Name="predicted", data1Name="true_label"
+            )
 
     return accuracy, total_correct, total_considered
 
@@ -195,9 +222,10 @@ def compute_spiked_prediction_accuracy(
 # WEIGHTED WINDOW SPIKE PREDICTION
 # --------------------------------------------------------------------------------------
 
+@timed()
 def compute_weighted_window_spiked_prediction_accuracy(
     data: List[float],
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     window_size: int = 14,
     visualize: bool = True
 ):
@@ -205,22 +233,27 @@ def compute_weighted_window_spiked_prediction_accuracy(
     Compute accuracy using weighted-window spike detection.
     """
 
-    smoothed = low_pass(data, window_size=3)
-    spike_indices = identify_weighted_windowed_spikes(smoothed, n=window_size)
+    with stage("smoothing"):
+        smoothed = low_pass(data, window_size=3)
+    with stage("detection"):
+        spike_indices = identify_weighted_windowed_spikes(smoothed, n=window_size)
+    count("spikes_found", len(spike_indices))
 
-    accuracy, total_correct, total_considered = compute_accuracy(
-        labels, set(spike_indices), warmup_period=window_size
-    )
+    with stage("scoring"):
+        accuracy, total_correct, total_considered = compute_accuracy(
+            labels, set(spike_indices), warmup_period=window_size
+        )
 
     print(f"Accuracy: {accuracy:.3f}")
 
     if visualize:
-        true_spikes = _compute_true_luteal_indices(labels, window_size)
-        graph_stacked_with_highlights(
-            smoothed, spike_indices,
-            smoothed, true_spikes,
-            data0Name="predicted", data1Name="true_label"
-        )
+        with stage("plotting"):
+            true_spikes = _compute_true_luteal_indices(labels, window_size)
+            graph_stacked_with_highlights(
+                smoothed, spike_indices,
+                smoothed, true_spikes,
+                data0Name="predicted", data1Name="true_label"
+            )
 
     return accuracy, total_correct, total_considered
 
@@ -229,9 +262,10 @@ def compute_weighted_window_spiked_prediction_accuracy(
 # LABEL-AWARE SPIKE PREDICTION (PERIOD ADJUSTING)
 # --------------------------------------------------------------------------------------
 
+@timed()
 def compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy(
     data: List[float],
-    labels: List[str],
+    labels: Union[List[str], PhaseLabels],
     window_size: int = 14,
     visualize: bool = True,
     generate_labels: bool = False,
@@ -246,16 +280,19 @@ def compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_ac
     When generate_labels is True, generate labels and print mismatches for
     a diagnostic window (window_size .. max_inspect_index).
     """
-    smoothed = low_pass(data, window_size=3)
+    with stage("smoothing"):
+        smoothed = low_pass(data, window_size=3)
 
-    (
-        ovulation_indices,
-        fertility_indices,
-        spike_indices,
-        period_indices,
-    ) = period_adjusting_identify_weighted_windowed_spikes(
-        smoothed, labels, n=window_size
-    )
+    with stage("detection"):
+        (
+            ovulation_indices,
+            fertility_indices,
+            spike_indices,
+            period_indices,
+        ) = period_adjusting_identify_weighted_windowed_spikes(
+            smoothed, labels, n=window_size
+        )
+    count("spikes_found", len(spike_indices))
 
     # ------------------------------------------------------------------
     # Optional label generation comparison (restores mismatch printing)
@@ -280,17 +317,21 @@ def compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_ac
         match = 0
         total = 0
 
+        truth_codes = encode_phases(labels)
+        generated_codes = generated_labels.codes
+        period_or_follicular = (PhaseCodes.PERIOD, PhaseCodes.FOLLICULAR)
+
         for i in range(start, end):
-            truth = labels[i]
-            generated = generated_labels[i]
+            truth = truth_codes[i]
+            generated = generated_codes[i]
             total += 1
 
             # Original logic considered period <-> follicular as matching
-            if (truth == generated) or (truth == 'period' and generated == 'follicular') or (truth == 'follicular' and generated == 'period'):
+            if (truth == generated) or (truth in period_or_follicular and generated in period_or_follicular):
                 match += 1
             else:
                 # Print day relative to the full dataset (matches original style)
-                print(f"Day {i}: mismatch -> truth='{truth}' generated='{generated}'")
+                print(f"Day {i}: mismatch -> truth='{labels[i]}' generated='{generated_labels[i]}'")
 
         if total > 0:
             print(f"{match} matches in range [{start}, {end}) out of {total} "
@@ -301,18 +342,19 @@ def compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_ac
     # ------------------------------------------------------------------
     # Accuracy metrics
     # ------------------------------------------------------------------
-    luteal_acc, luteal_corr, luteal_total = compute_accuracy(
-        labels, set(spike_indices), warmup_period=window_size
-    )
+    with stage("scoring"):
+        luteal_acc, luteal_corr, luteal_total = compute_accuracy(
+            labels, set(spike_indices), warmup_period=window_size
+        )
 
-    ovulation_acc, ovu_corr, ovu_total = compute_ovulation_accuracy(
-        labels, set(ovulation_indices),
-        warmup_period=window_size
-    )
+        ovulation_acc, ovu_corr, ovu_total = compute_ovulation_accuracy(
+            labels, set(ovulation_indices),
+            warmup_period=window_size
+        )
 
-    fertility_acc, fert_corr, fert_total = compute_fertility_accuracy(
-        labels, set(fertility_indices), warmup_period=window_size
-    )
+        fertility_acc, fert_corr, fert_total = compute_fertility_accuracy(
+            labels, set(fertility_indices), warmup_period=window_size
+        )
 
     print(f"Luteal accuracy:    {luteal_acc:.3f}")
     print(f"Ovulation accuracy: {ovulation_acc:.3f}")
@@ -322,11 +364,12 @@ def compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_ac
     # Visualization
     # ------------------------------------------------------------------
     if visualize:
-        true_spikes = _compute_true_luteal_indices(labels, window_size)
-        graph_stacked_with_highlights(
-            smoothed, spike_indices,
-            smoothed, true_spikes,
-            data0Name="predicted", data1Name="true_label"
-        )
+        with stage("plotting"):
+            true_spikes = _compute_true_luteal_indices(labels, window_size)
+            graph_stacked_with_highlights(
+                smoothed, spike_indices,
+                smoothed, true_spikes,
+                data0Name="predicted", data1Name="true_label"
+            )
 
     return luteal_acc, luteal_corr, luteal_total
@@ -0,0 +1,285 @@
+"""
+Streaming version of `period_adjusting_identify_weighted_windowed_spikes`.
+
+`OnlineCyclePredictor` consumes one nightly (temperature, label) sample at a
+time and emits that day's phase prediction in O(1), so the daily sync path
+does not have to recompute the whole history. Its state is plain JSON-able
+data and can be persisted between syncs with `to_dict` / `from_dict`.
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Tuple, Union
+
+from phase_labels import PhaseCodes, PhaseLabels, encode_phases, phase_code
+from menstrual_cycle_prediction import (
+    FERTILE_DAYS_BEFORE_LUTEAL,
+    FERTILE_DAYS_DURING_LUTEAL,
+    PERIOD_LENGTH_DAYS,
+)
+
+
+class OnlineCyclePredictor:
+    """
+    Incremental label-aware weighted-window spike detector.
+
+    Replaying a full series through `update` reproduces
+    `period_adjusting_identify_weighted_windowed_spikes` exactly; see
+    `replay_series`.
+
+    Parameters
+    ----------
+    n : int, default 14
+        Rolling window size used for calculating the moving average.
+    """
+
+    def __init__(self, n: int = 14):
+        if n <= 0:
+            raise ValueError("n must be positive")
+
+        self.n = n
+        self.day = 0                    # index of the next sample
+        self.window: List[float] = []   # ring buffer of the last n samples
+        self.window_pos = 0             # oldest sample in the ring buffer
+        self.window_sum = 0.0
+        self.current_run_size = n
+        self.spiked_run = False
+        self.first_period_day = None    # first "period" label seen during warmup
+        self.previous_label = None      # phase code of the previous sample
+
+        # Predictions already scheduled for today or future days
+        self.ovulation_days: deque = deque()
+        self.fertile_until = -1
+        self.period_until = -1
+
+    # ------------------------------------------------------------------
+    # Streaming API
+    # ------------------------------------------------------------------
+
+    def update(self, temperature: float, label: Union[str, int]) -> str:
+        """
+        Consume one day of data and return that day's predicted phase.
+
+        Parameters
+        ----------
+        temperature : float
+            Smoothed temperature (or other physiological signal) for the day.
+        label : str or int
+            User-reported label for the day (e.g. "period" or PhaseCodes.PERIOD).
+
+        Returns
+        -------
+        str
+            One of "ovulation", "fertile", "luteal", "period", "follicular",
+            using the same priority as `create_generated_labels`. Days inside
+            the initial warmup window are reported as "follicular".
+        """
+        phase, _ = self.update_with_events(temperature, label)
+        return phase
+
+    def update_with_events(
+        self,
+        temperature: float,
+        label: Union[str, int],
+    ) -> Tuple[str, List[Tuple[str, int, int]]]:
+        """
+        Like `update`, but also return the predictions scheduled by this day.
+
+        Returns
+        -------
+        phase : str
+            The day's predicted phase, as returned by `update`.
+        events : list of (kind, start, length)
+            Windows scheduled today: "fertile", "ovulation", "luteal" or
+            "period", starting at day index `start` and lasting `length`
+            days. Clipped to the series, their union over all days gives
+            the indices of `period_adjusting_identify_weighted_windowed_spikes`.
+        """
+        code = phase_code(label)
+        i = self.day
+        n = self.n
+        self.day += 1
+
+        # ------------------------------------------------------------------
+        # Warmup: fill the window before any prediction is made
+        # ------------------------------------------------------------------
+        if i < n:
+            self.window.append(temperature)
+            self.window_sum += temperature
+            if code == PhaseCodes.PERIOD and self.first_period_day is None:
+                self.first_period_day = i
+            if i == n - 1 and self.first_period_day is not None:
+                self.current_run_size = n - self.first_period_day
+            self.previous_label = code
+            return "follicular", []
+
+        events = []
+        spiked_today = False
+
+        # Predict fertility/ovulation window relative to expected spike day
+        if self.current_run_size == n - FERTILE_DAYS_BEFORE_LUTEAL and not self.spiked_run:
+            fertile_span = FERTILE_DAYS_BEFORE_LUTEAL + FERTILE_DAYS_DURING_LUTEAL
+            events.append(("fertile", i, fertile_span))
+            self.fertile_until = max(self.fertile_until, i + fertile_span - 1)
+
+            ov_idx = i + FERTILE_DAYS_BEFORE_LUTEAL
+            events.append(("ovulation", ov_idx, 1))
+            self.ovulation_days.append(ov_idx)
+
+        # Weighted threshold calculation
+        run_weight = self.current_run_size / n
+        run_weight = run_weight if self.spiked_run else (2 - run_weight)
+        threshold = run_weight * (self.window_sum / n)
+
+        # Spike detection logic
+        if temperature > threshold:
+            if not self.spiked_run:
+                self.spiked_run = True
+                self.current_run_size = 0
+            events.append(("luteal", i, 1))
+            spiked_today = True
+        elif self.spiked_run:
+            self.spiked_run = False
+            events.append(("period", i, PERIOD_LENGTH_DAYS))
+            self.period_until = max(self.period_until, i + PERIOD_LENGTH_DAYS - 1)
+            self.current_run_size = 0
+
+        # Rolling window update
+        self.window_sum += temperature - self.window[self.window_pos]
+        self.window[self.window_pos] = temperature
+        self.window_pos = (self.window_pos + 1) % n
+        self.current_run_size += 1
+
+        # Recalibrate if user-reported period input appears
+        if self.previous_label != PhaseCodes.PERIOD and code == PhaseCodes.PERIOD:
+            self.current_run_size = 1
+            self.spiked_run = False
+        self.previous_label = code
+
+        return self._phase_for_day(i, spiked_today), events
+
+    def _phase_for_day(self, i: int, spiked_today: bool) -> str:
+        """Resolve today's phase from the scheduled predictions."""
+        while self.ovulation_days and self.ovulation_days[0] < i:
+            self.ovulation_days.popleft()
+
+        if self.ovulation_days and self.ovulation_days[0] == i:
+            return "ovulation"
+        if i <= self.fertile_until:
+            return "fertile"
+        if spiked_today:
+            return "luteal"
+        if i <= self.period_until:
+            return "period"
+        return "follicular"
+
+    def forecast(self, days: int) -> List[str]:
+        """
+        Phases predicted for the next `days` days from what is known now.
+
+        Scheduled ovulation, fertile and period windows are kept. Beyond
+        them, the current state is assumed to persist: luteal continues while
+        a spike run is active, no period is reported, and outside a spike run
+        the fertile window is projected to the day the growing run would
+        trigger it. Uses the same priority as `update`.
+
+        Parameters
+        ----------
+        days : int
+            Number of days after the last consumed sample to forecast.
+
+        Returns
+        -------
+        List[str]
+            Predicted phase for days `self.day` .. `self.day + days - 1`.
+        """
+        n = self.n
+        ovulation = set(self.ovulation_days)
+        projected_fertile = range(0)
+        if self.day >= n and not self.spiked_run:
+            wait = n - FERTILE_DAYS_BEFORE_LUTEAL - self.current_run_size
+            if wait >= 0:
+                start = self.day + wait
+                projected_fertile = range(start, start + FERTILE_DAYS_BEFORE_LUTEAL + FERTILE_DAYS_DURING_LUTEAL)
+                ovulation.add(start + FERTILE_DAYS_BEFORE_LUTEAL)
+
+        phases = []
+        for i in range(self.day, self.day + days):
+            if i < n:
+                phases.append("follicular")
+            elif i in ovulation:
+                phases.append("ovulation")
+            elif i <= self.fertile_until or i in projected_fertile:
+                phases.append("fertile")
+            elif self.spiked_run:
+                phases.append("luteal")
+            elif i <= self.period_until:
+                phases.append("period")
+            else:
+                phases.append("follicular")
+        return phases
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the predictor state as JSON-serializable data."""
+        return {
+            "n": self.n,
+            "day": self.day,
+            "window": list(self.window),
+            "window_pos": self.window_pos,
+            "window_sum": self.window_sum,
+            "current_run_size": self.current_run_size,
+            "spiked_run": self.spiked_run,
+            "first_period_day": self.first_period_day,
+            "previous_label": self.previous_label,
+            "ovulation_days": list(self.ovulation_days),
+            "fertile_until": self.fertile_until,
+            "period_until": self.period_until,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "OnlineCyclePredictor":
+        """Rebuild a predictor from the output of `to_dict`."""
+        predictor = cls(n=state["n"])
+        predictor.day = state["day"]
+        predictor.window = list(state["window"])
+        predictor.window_pos = state["window_pos"]
+        predictor.window_sum = state["window_sum"]
+        predictor.current_run_size = state["current_run_size"]
+        predictor.spiked_run = state["spiked_run"]
+        predictor.first_period_day = state["first_period_day"]
+        predictor.previous_label = state["previous_label"]
+        predictor.ovulation_days = deque(state["ovulation_days"])
+        predictor.fertile_until = state["fertile_until"]
+        predictor.period_until = state["period_until"]
+        return predictor
+
+
+def replay_series(
+    data: List[float],
+    labels: Union[List[str], PhaseLabels],
+    n: int = 14
+) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """
+    Stream a full series through `OnlineCyclePredictor`.
+
+    Returns the same (ovulation, fertility, spike, period) index lists as
+    `period_adjusting_identify_weighted_windowed_spikes(data, labels, n)`.
+    """
+    if len(data) < n:
+        return [], [], [], []
+
+    predictor = OnlineCyclePredictor(n=n)
+    indices = {"ovulation": [], "fertile": [], "luteal": [], "period": []}
+
+    for temperature, code in zip(data, encode_phases(labels).tolist()):
+        _, events = predictor.update_with_events(temperature, code)
+
+        for kind, start, length in events:
+            indices[kind].extend(
+                idx for idx in range(start, start + length) if idx < len(data)
+            )
+
+    return indices["ovulation"], indices["fertile"], indices["luteal"], indices["period"]
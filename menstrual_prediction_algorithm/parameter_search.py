@@ -0,0 +1,204 @@
+"""
+Parameter sweep for the period-adjusting spike detector.
+
+Evaluates `period_adjusting_identify_weighted_windowed_spikes` over a grid (or
+a random sample of the grid) of window sizes and phase constants for every
+validation participant, and ranks the configurations on a leaderboard.
+
+- The low-pass smoothed series is computed once and shared by all configs,
+  and each worker builds one `RollingStats` per participant, so every window
+  size in the grid reads its window means off the same prefix sums.
+- Configurations are scored in parallel worker processes.
+- Each configuration's result is cached as JSON on disk, keyed by the config,
+  a fingerprint of the input data and `SEARCH_CACHE_VERSION`, so re-running a
+  sweep only evaluates new configurations.
+"""
+
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from accuracy import compute_accuracy, compute_fertility_accuracy, compute_ovulation_accuracy
+from batch_evaluation import load_validation_data
+from data_processing_utils import low_pass
+from phase_labels import PhaseLabels, encode_phases
+from rolling_stats import RollingStats
+from menstrual_cycle_prediction import (
+    FERTILE_DAYS_BEFORE_LUTEAL,
+    FERTILE_DAYS_DURING_LUTEAL,
+    PERIOD_LENGTH_DAYS,
+    period_adjusting_identify_weighted_windowed_spikes,
+)
+
+
+SEARCH_CACHE_DIR = "../cache/parameter_search"
+# Bump when the detector or scoring semantics change so cached results are not reused
+SEARCH_CACHE_VERSION = 2
+
+DEFAULT_GRID = {
+    "n": [10, 12, 14, 16, 18],
+    "fertile_days_before_luteal": [4, 5, FERTILE_DAYS_BEFORE_LUTEAL, 7],
+    "fertile_days_during_luteal": [2, FERTILE_DAYS_DURING_LUTEAL, 4],
+    "period_length_days": [4, PERIOD_LENGTH_DAYS, 6],
+}
+
+# Shared read-only inputs for worker processes (set by _init_worker)
+_SMOOTHED: Dict[str, List[float]] = {}
+_LABELS: Dict[str, PhaseLabels] = {}
+_STATS: Dict[str, RollingStats] = {}
+
+
+def grid_configs(grid: Dict[str, Sequence[int]] = DEFAULT_GRID) -> List[Dict[str, int]]:
+    """Expand a parameter grid into the list of all configurations."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_configs(
+    grid: Dict[str, Sequence[int]] = DEFAULT_GRID,
+    num_samples: int = 20,
+    seed: int = 0,
+) -> List[Dict[str, int]]:
+    """Sample `num_samples` distinct configurations from a parameter grid."""
+    configs = grid_configs(grid)
+    return random.Random(seed).sample(configs, min(num_samples, len(configs)))
+
+
+def data_fingerprint(smoothed: Dict[str, List[float]], labels: Dict[str, PhaseLabels]) -> str:
+    """Hash the sweep inputs so cached results are invalidated when data changes."""
+    payload = json.dumps(
+        [(p, smoothed[p], labels[p].codes.tolist()) for p in sorted(smoothed)], allow_nan=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _config_key(config: Dict[str, int], fingerprint: str) -> str:
+    payload = json.dumps(
+        {"config": config, "data": fingerprint, "version": SEARCH_CACHE_VERSION}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _init_worker(smoothed: Dict[str, List[float]], labels: Dict[str, PhaseLabels]) -> None:
+    global _SMOOTHED, _LABELS, _STATS
+    _SMOOTHED, _LABELS = smoothed, labels
+    _STATS = {participant: RollingStats(series) for participant, series in smoothed.items()}
+
+
+def evaluate_config(config: Dict[str, int]) -> Dict[str, float]:
+    """
+    Score one configuration on every participant loaded into this process.
+
+    Returns
+    -------
+    dict
+        The configuration plus mean luteal, ovulation and fertility accuracy.
+    """
+    n = config["n"]
+    luteal, ovulation, fertility = [], [], []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for participant in sorted(_SMOOTHED):
+            smoothed, labels = _SMOOTHED[participant], _LABELS[participant]
+            window_means = _STATS[participant].window_means(n).tolist()
+            ovulation_indices, fertility_indices, spike_indices, _ = (
+                period_adjusting_identify_weighted_windowed_spikes(
+                    smoothed, labels, window_means=window_means, **config
+                )
+            )
+            luteal.append(compute_accuracy(labels, set(spike_indices), warmup_period=n)[0])
+            ovulation.append(compute_ovulation_accuracy(labels, set(ovulation_indices), warmup_period=n)[0])
+            fertility.append(compute_fertility_accuracy(labels, set(fertility_indices), warmup_period=n)[0])
+
+    return {
+        **config,
+        "luteal_accuracy": sum(luteal) / len(luteal),
+        "ovulation_accuracy": sum(ovulation) / len(ovulation),
+        "fertility_accuracy": sum(fertility) / len(fertility),
+    }
+
+
+def run_search(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, Union[List[str], PhaseLabels]],
+    configs: Optional[List[Dict[str, int]]] = None,
+    cache_dir: str = SEARCH_CACHE_DIR,
+    max_workers: Optional[int] = None,
+    rank_by: str = "luteal_accuracy",
+) -> pd.DataFrame:
+    """
+    Evaluate every configuration and return a ranked leaderboard.
+
+    Parameters
+    ----------
+    temp_data : dict
+        Participant id → raw temperature series.
+    labels : dict
+        Participant id → ground-truth phase labels.
+    configs : list of dict, optional
+        Configurations to evaluate. Defaults to the full `DEFAULT_GRID`.
+    cache_dir : str
+        Directory for per-configuration JSON results.
+    max_workers : int, optional
+        Process pool size. Defaults to the number of CPUs.
+    rank_by : str, default "luteal_accuracy"
+        Metric column used to rank the leaderboard.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per configuration, best first.
+    """
+    if configs is None:
+        configs = grid_configs()
+    if not temp_data:
+        raise ValueError("No participants to evaluate.")
+
+    smoothed = {p: low_pass(temp_data[p], window_size=3) for p in temp_data}
+    labels = {p: PhaseLabels(encode_phases(labels[p])) for p in temp_data}
+    fingerprint = data_fingerprint(smoothed, labels)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    results, pending = [], []
+    for config in configs:
+        path = os.path.join(cache_dir, f"{_config_key(config, fingerprint)}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                results.append(json.load(f))
+        else:
+            pending.append((config, path))
+
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            initializer=_init_worker,
+            initargs=(smoothed, labels),
+        ) as pool:
+            for (config, path), result in zip(
+                pending, pool.map(evaluate_config, [c for c, _ in pending])
+            ):
+                with open(path, "w") as f:
+                    json.dump(result, f)
+                results.append(result)
+
+    leaderboard = pd.DataFrame(results).sort_values(rank_by, ascending=False)
+    return leaderboard.reset_index(drop=True)
+
+
+def main() -> None:
+    """Run the default grid over the mcPHASES validation set and print the top configs."""
+    temp_data, _, labels = load_validation_data()
+    leaderboard = run_search(temp_data, labels)
+    print(leaderboard.head(20).to_string())
+
+
+if __name__ == "__main__":
+    main()
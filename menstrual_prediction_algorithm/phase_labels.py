@@ -0,0 +1,154 @@
+"""
+Compact integer-coded phase labels.
+
+Phase labels are stored as `uint8` codes from `PhaseCodes` and only converted
+to/from strings at the I/O edges (CSV loaders, printing). `PhaseLabels` wraps
+a code array; it still iterates and indexes as strings so that display code
+keeps working, while `codes` and `mask()` give vectorizable comparisons.
+"""
+
+from enum import IntEnum
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+
+class PhaseCodes(IntEnum):
+    """Integer code for each phase label ("missing" is 0 so zero-padding is safe)."""
+
+    MISSING = 0
+    FOLLICULAR = 1
+    PERIOD = 2
+    FERTILE = 3
+    OVULATION = 4
+    LUTEAL = 5
+
+    @property
+    def label(self) -> str:
+        """String form used in CSVs and printouts (e.g. "period")."""
+        return self.name.lower()
+
+
+PHASE_NAMES = tuple(code.label for code in PhaseCodes)
+_NAME_TO_CODE = {code.label: code.value for code in PhaseCodes}
+_NAMES_ARRAY = np.array(PHASE_NAMES, dtype=object)
+
+
+def phase_code(label: Union[str, int], unknown: Optional[int] = None) -> int:
+    """
+    Return the integer code for a single label.
+
+    Parameters
+    ----------
+    label : str or int
+        Phase name (e.g. "period") or an existing code. Non-string,
+        non-integer values such as NaN map to MISSING.
+    unknown : int, optional
+        Code for labels that are not a phase name or code (NaN, "Luteal",
+        ...). By default NaN maps to MISSING and unknown strings raise.
+
+    Raises
+    ------
+    ValueError
+        If a string label is not a known phase and `unknown` is not given.
+    """
+    if isinstance(label, (int, np.integer)):
+        return PhaseCodes(label).value
+    if not isinstance(label, str):
+        return PhaseCodes.MISSING.value if unknown is None else int(unknown)
+    try:
+        return _NAME_TO_CODE[label]
+    except KeyError:
+        if unknown is not None:
+            return int(unknown)
+        raise ValueError(f"Unknown phase label {label!r}") from None
+
+
+def encode_phases(
+    labels: Union["PhaseLabels", np.ndarray, Iterable],
+    unknown: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Convert labels to a uint8 code array.
+
+    Accepts a `PhaseLabels`, an integer array of codes (returned as-is) or an
+    iterable of string labels. `unknown` is passed to `phase_code`.
+    """
+    if isinstance(labels, PhaseLabels):
+        return labels.codes
+    if isinstance(labels, np.ndarray) and labels.dtype.kind in "iu":
+        return labels.astype(np.uint8, copy=False)
+    return np.fromiter((phase_code(label, unknown) for label in labels), dtype=np.uint8)
+
+
+def decode_phases(codes: np.ndarray) -> List[str]:
+    """Convert a code array back to a list of string labels."""
+    return _NAMES_ARRAY[np.asarray(codes, dtype=np.intp)].tolist()
+
+
+class PhaseLabels:
+    """
+    uint8-backed sequence of phase labels.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Phase codes (values of `PhaseCodes`).
+    """
+
+    __slots__ = ("codes",)
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = np.asarray(codes, dtype=np.uint8)
+
+    @classmethod
+    def from_strings(cls, labels: Iterable) -> "PhaseLabels":
+        """Encode string labels (the I/O edge)."""
+        return cls(encode_phases(labels))
+
+    @classmethod
+    def filled(cls, length: int, phase: PhaseCodes) -> "PhaseLabels":
+        """Labels of the given length, all set to `phase`."""
+        return cls(np.full(length, phase, dtype=np.uint8))
+
+    def to_strings(self) -> List[str]:
+        """Decode to string labels (the I/O edge)."""
+        return decode_phases(self.codes)
+
+    def mask(self, *phases: Union[str, int]) -> np.ndarray:
+        """Boolean mask of positions whose label is any of `phases`."""
+        return np.isin(self.codes, [phase_code(p) for p in phases])
+
+    def count(self, phase: Union[str, int]) -> int:
+        return int(np.count_nonzero(self.codes == phase_code(phase)))
+
+    def index(self, phase: Union[str, int]) -> int:
+        hits = np.flatnonzero(self.codes == phase_code(phase))
+        if len(hits) == 0:
+            raise ValueError(f"{phase!r} is not in labels")
+        return int(hits[0])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, item):
+        # Scalars give a name like a list would; slices, masks and index arrays give PhaseLabels
+        if isinstance(item, slice) or np.ndim(item) > 0:
+            return PhaseLabels(self.codes[item])
+        return PHASE_NAMES[self.codes[item]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_strings())
+
+    def __contains__(self, phase) -> bool:
+        return bool(np.any(self.codes == phase_code(phase)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PhaseLabels):
+            return np.array_equal(self.codes, other.codes)
+        if isinstance(other, list):
+            return self.to_strings() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PhaseLabels({self.to_strings()!r})"
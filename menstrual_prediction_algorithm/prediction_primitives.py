@@ -1,7 +1,27 @@
-from typing import Iterable, List
+from typing import Iterable, List, Optional, Sequence
 
 
-def identify_windowed_spikes(data: Iterable[float], n: int = 14) -> List[int]:
+def incremental_window_means(data: Sequence[float], n: int = 14) -> List[float]:
+    """
+    Mean of data[i-n : i] for every i >= n.
+
+    The window sum is updated in O(1) per step (`+= data[i] - data[i - n]`);
+    every detector below uses this accumulation order unless precomputed
+    means (e.g. `RollingStats.window_means(n)`) are passed in.
+    """
+    window_sum = sum(data[:n])
+    means = []
+    for i in range(n, len(data)):
+        means.append(window_sum / n)
+        window_sum += data[i] - data[i - n]
+    return means
+
+
+def identify_windowed_spikes(
+    data: Iterable[float],
+    n: int = 14,
+    window_means: Optional[Sequence[float]] = None,
+) -> List[int]:
     """
     Identify indices where a value exceeds the average of the previous `n` samples.
 
@@ -16,6 +36,9 @@ def identify_windowed_spikes(data: Iterable[float], n: int = 14) -> List[int]:
     n : int, optional
         Size of the sliding window used to compute the average.
         Default is 14.
+    window_means : Sequence[float], optional
+        Precomputed means of data[k : k + n] (see `RollingStats.window_means`),
+        shared across detectors and sweeps. Computed incrementally if omitted.
 
     Returns
     -------
@@ -31,22 +54,22 @@ def identify_windowed_spikes(data: Iterable[float], n: int = 14) -> List[int]:
     if n <= 0 or len(data) < n:
         return []
 
-    window_sum = sum(data[:n])
+    if window_means is None:
+        window_means = incremental_window_means(data, n)
     spike_indices = []
 
     for i in range(n, len(data)):
-        window_avg = window_sum / n
-
-        if data[i] > window_avg:
+        if data[i] > window_means[i - n]:
             spike_indices.append(i)
 
-        # Slide the window forward
-        window_sum += data[i] - data[i - n]
-
     return spike_indices
 
 
-def identify_weighted_windowed_spikes(data: Iterable[float], n: int = 14) -> List[int]:
+def identify_weighted_windowed_spikes(
+    data: Iterable[float],
+    n: int = 14,
+    window_means: Optional[Sequence[float]] = None,
+) -> List[int]:
     """
     Identify spikes using a dynamic threshold based on a weighted sliding window.
 
@@ -67,6 +90,9 @@ def identify_weighted_windowed_spikes(data: Iterable[float], n: int = 14) -> Lis
         Sequence of numeric samples.
     n : int, optional
         Window size for the rolling average. Default is 14.
+    window_means : Sequence[float], optional
+        Precomputed means of data[k : k + n] (see `RollingStats.window_means`),
+        shared across detectors and sweeps. Computed incrementally if omitted.
 
     Returns
     -------
@@ -83,14 +109,15 @@ def identify_weighted_windowed_spikes(data: Iterable[float], n: int = 14) -> Lis
     if n <= 0 or len(data) < n:
         return []
 
-    window_sum = sum(data[:n])
+    if window_means is None:
+        window_means = incremental_window_means(data, n)
     spike_indices = []
 
     in_run = False
     run_length = n  # Incentivizes run behavior around window size
 
     for i in range(n, len(data)):
-        base_avg = window_sum / n
+        base_avg = window_means[i - n]
         run_weight = run_length / n
 
         # Adjust threshold based on run status
@@ -111,8 +138,6 @@ def identify_weighted_windowed_spikes(data: Iterable[float], n: int = 14) -> Lis
             in_run = False
             run_length = 0
 
-        # Slide the window
-        window_sum += data[i] - data[i - n]
         run_length += 1
 
     return spike_indices
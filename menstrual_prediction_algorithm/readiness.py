@@ -0,0 +1,150 @@
+"""
+Extraction of numeric fields from Oura `readiness` blobs.
+
+Depending on how the export was produced, the `readiness` cell is either a
+Python repr (single quotes, `None`) or JSON (double quotes, `null`), e.g.
+
+    {'contributors': {'body_temperature': 100, 'hrv_balance': None, ...},
+     'score': 89, 'temperature_deviation': -0.08, 'temperature_trend_deviation': None}
+
+`extract_readiness_fields` pulls the numeric fields out of a whole column by
+rewriting the repr tokens to JSON and decoding every cell with one
+`json.loads` call, instead of running `ast.literal_eval` per row.
+`parse_readiness_blob` is the full per-row evaluation; it is the fallback for
+cells the fast path cannot decode.
+"""
+
+import ast
+import json
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+READINESS_CONTRIBUTORS = (
+    "activity_balance",
+    "body_temperature",
+    "hrv_balance",
+    "previous_day_activity",
+    "previous_night",
+    "recovery_index",
+    "resting_heart_rate",
+    "sleep_balance",
+    "sleep_regularity",
+)
+
+READINESS_FIELDS = (
+    "temperature_deviation",
+    "temperature_trend_deviation",
+    "score",
+) + READINESS_CONTRIBUTORS
+
+# Python-repr tokens and their JSON spellings
+_REPR_TO_JSON = (("'", '"'), ("None", "null"), ("True", "true"), ("False", "false"))
+
+
+def parse_readiness_blob(entry) -> Dict:
+    """
+    Fully evaluate one readiness cell.
+
+    Parameters
+    ----------
+    entry : str, dict or None
+        JSON or Python-repr string, an already parsed dict, or a missing value.
+
+    Returns
+    -------
+    dict
+        The parsed blob, or an empty dict if the cell is missing or malformed.
+    """
+    if isinstance(entry, dict):
+        return entry
+    if not isinstance(entry, str):
+        return {}
+    try:
+        parsed = json.loads(entry)
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(entry)
+        except (ValueError, SyntaxError):
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _to_json(entry: str) -> str:
+    for token, replacement in _REPR_TO_JSON:
+        entry = entry.replace(token, replacement)
+    return entry
+
+
+def _parse_fast(entry: str) -> Dict:
+    """Parse one blob as (normalized) JSON, falling back to full evaluation."""
+    try:
+        parsed = json.loads(_to_json(entry))
+    except ValueError:
+        return parse_readiness_blob(entry)
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _blob_row(blob: Dict, fields: Sequence[str]) -> List[float]:
+    """Numeric `fields` of a parsed blob (NaN if absent); top-level keys win over contributors."""
+    contributors = blob.get("contributors")
+    if isinstance(contributors, dict):
+        blob = {**contributors, **blob}
+    row = []
+    for field in fields:
+        value = blob.get(field)
+        row.append(value if type(value) in (int, float) else np.nan)
+    return row
+
+
+def extract_readiness_fields(
+    readiness: pd.Series,
+    fields: Sequence[str] = READINESS_FIELDS,
+    fast: bool = True,
+) -> pd.DataFrame:
+    """
+    Extract numeric fields from a column of readiness blobs.
+
+    Parameters
+    ----------
+    readiness : pd.Series
+        Raw `readiness` column: repr or JSON strings, dicts, or NaN.
+    fields : sequence of str
+        Keys to extract. Contributor scores are looked up by their own name
+        (e.g. "body_temperature").
+    fast : bool, default True
+        Normalize the string cells to JSON and decode them all with a single
+        `json.loads` call. If that fails (e.g. a malformed cell), cells are
+        decoded one at a time, falling back to `parse_readiness_blob`. With
+        False every cell is fully evaluated with `parse_readiness_blob`.
+
+    Returns
+    -------
+    pd.DataFrame
+        One float64 column per field, aligned with `readiness`; NaN where the
+        cell is missing or the value is absent/None.
+    """
+    fields = list(fields)
+    cells = readiness.to_numpy(dtype=object)
+    is_string = np.fromiter((isinstance(cell, str) for cell in cells), dtype=bool, count=len(cells))
+
+    if not fast:
+        blobs = [parse_readiness_blob(cell) for cell in cells]
+    else:
+        blobs = [cell if isinstance(cell, dict) else {} for cell in cells]
+        string_rows = np.flatnonzero(is_string)
+        strings = cells[string_rows].tolist()
+        try:
+            parsed = json.loads("[" + _to_json(",".join(strings)) + "]")
+            if len(parsed) != len(strings) or not all(isinstance(blob, dict) for blob in parsed):
+                raise ValueError("readiness cells did not decode to one object each")
+        except ValueError:
+            parsed = [_parse_fast(entry) for entry in strings]
+        for row, blob in zip(string_rows.tolist(), parsed):
+            blobs[row] = blob
+
+    values = np.array([_blob_row(blob, fields) for blob in blobs], dtype=np.float64)
+    values = values.reshape(len(cells), len(fields))
+    return pd.DataFrame(values, index=readiness.index, columns=fields)
@@ -0,0 +1,139 @@
+"""
+Prefix-sum rolling statistics shared across window sizes.
+
+`RollingStats` precomputes the prefix sums and prefix sums of squares of a
+series (or of every row of a users x days batch) once. After that, the sum,
+mean or variance of any window data[start:stop] is O(1), and the statistics of
+every window of size n are two array subtractions. Sweeping many window sizes
+over the same series therefore costs one pass over the data in total instead
+of one pass per size:
+
+    stats = RollingStats(smoothed)
+    for n in (10, 12, 14, 16, 18):
+        spikes = weighted_windowed_spike_mask(smoothed, n, window_means=stats.window_means(n))
+
+A window containing a NaN sample has a NaN statistic; other windows are
+unaffected, as in `filters.moving_average`.
+
+Sums taken from prefix sums round differently from the incremental updates
+of the reference detectors, so results may differ from them in the last few
+bits. The detectors only use these sums when they are passed in.
+"""
+
+from typing import Union
+
+import numpy as np
+
+
+class RollingStats:
+    """
+    Prefix sums of a 1-D series or a 2-D (users x days) batch.
+
+    Parameters
+    ----------
+    data : array-like
+        1-D series or 2-D batch; statistics are taken along the last axis.
+    """
+
+    __slots__ = ("shape", "_sums", "_squares", "_nans")
+
+    def __init__(self, data):
+        arr = np.asarray(data, dtype=np.float64)
+        if arr.ndim not in (1, 2):
+            raise ValueError(f"Expected a 1-D or 2-D array, got {arr.ndim} dimensions")
+
+        is_nan = np.isnan(arr)
+        values = np.where(is_nan, 0.0, arr)
+        zero_pad = [(0, 0)] * (arr.ndim - 1) + [(1, 0)]
+
+        self.shape = arr.shape
+        self._sums = np.pad(np.cumsum(values, axis=-1), zero_pad)
+        self._squares = np.pad(np.cumsum(values * values, axis=-1), zero_pad)
+        self._nans = np.pad(np.cumsum(is_nan, axis=-1), zero_pad)
+
+    def __len__(self) -> int:
+        """Number of samples per series."""
+        return self.shape[-1]
+
+    # ------------------------------------------------------------------
+    # Arbitrary windows
+    # ------------------------------------------------------------------
+
+    def _window(self, prefix: np.ndarray, start, stop) -> np.ndarray:
+        total = prefix[..., stop] - prefix[..., start]
+        has_nan = (self._nans[..., stop] - self._nans[..., start]) > 0
+        return np.where(has_nan, np.nan, total)
+
+    def sum(self, start: Union[int, np.ndarray], stop: Union[int, np.ndarray]) -> np.ndarray:
+        """
+        Sum of data[start:stop].
+
+        `start` and `stop` may be integers or equal-shape index arrays, so many
+        windows (of different sizes) are answered in one call.
+        """
+        return self._window(self._sums, start, stop)
+
+    def mean(self, start: Union[int, np.ndarray], stop: Union[int, np.ndarray]) -> np.ndarray:
+        """Mean of data[start:stop]; empty windows are NaN."""
+        size = np.asarray(stop) - np.asarray(start)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum(start, stop) / size
+
+    def var(
+        self,
+        start: Union[int, np.ndarray],
+        stop: Union[int, np.ndarray],
+        ddof: int = 0,
+    ) -> np.ndarray:
+        """
+        Variance of data[start:stop].
+
+        Computed as (sum of squares - sum^2 / size) / (size - ddof) and
+        clipped at zero, since cancellation can leave a tiny negative value.
+        """
+        size = np.asarray(stop) - np.asarray(start)
+        total = self.sum(start, stop)
+        squares = self._window(self._squares, start, stop)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (squares - total * total / size) / (size - ddof)
+        return np.maximum(variance, 0.0)
+
+    def std(
+        self,
+        start: Union[int, np.ndarray],
+        stop: Union[int, np.ndarray],
+        ddof: int = 0,
+    ) -> np.ndarray:
+        """Standard deviation of data[start:stop]."""
+        return np.sqrt(self.var(start, stop, ddof))
+
+    # ------------------------------------------------------------------
+    # Every window of one size
+    # ------------------------------------------------------------------
+
+    def _starts(self, window_size: int) -> np.ndarray:
+        if window_size <= 0:
+            raise ValueError("window_size must be positive")
+        return np.arange(max(0, len(self) - window_size + 1))
+
+    def window_sums(self, window_size: int) -> np.ndarray:
+        """
+        Sum of every complete window data[k:k + window_size].
+
+        Returns
+        -------
+        np.ndarray
+            Shape (..., len - window_size + 1). Column k is the window starting
+            at k, i.e. the window preceding index k + window_size.
+        """
+        starts = self._starts(window_size)
+        return self.sum(starts, starts + window_size)
+
+    def window_means(self, window_size: int) -> np.ndarray:
+        """Mean of every complete window; same layout as `window_sums`."""
+        return self.window_sums(window_size) / window_size
+
+    def window_variances(self, window_size: int, ddof: int = 0) -> np.ndarray:
+        """Variance of every complete window; same layout as `window_sums`."""
+        starts = self._starts(window_size)
+        return self.var(starts, starts + window_size, ddof)
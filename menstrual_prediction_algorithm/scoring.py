@@ -0,0 +1,177 @@
+"""
+Array-based scoring of phase predictions.
+
+Labels are integer-encoded once (see `phase_labels`) and predictions are
+boolean masks, so every metric is a handful of array reductions instead of
+per-day set lookups. All functions accept a single participant (1-D arrays)
+or a batch of participants (2-D arrays, one row each, padded with MISSING).
+
+The `accuracy` values returned by `score_phases` match `compute_accuracy`,
+`compute_ovulation_accuracy` and `compute_fertility_accuracy` exactly.
+"""
+
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from phase_labels import PhaseCodes, encode_phases
+
+
+def encode_label_batch(label_lists: Sequence[Iterable]) -> np.ndarray:
+    """Encode several label lists into one (participants x days) array padded with MISSING."""
+    encoded = [encode_phases(labels) for labels in label_lists]
+    batch = np.full((len(encoded), max((len(e) for e in encoded), default=0)), PhaseCodes.MISSING, dtype=np.uint8)
+    for row, codes in enumerate(encoded):
+        batch[row, :len(codes)] = codes
+    return batch
+
+
+def indices_to_mask(indices: Iterable[int], length: int) -> np.ndarray:
+    """Convert predicted indices into a boolean mask; indices outside [0, `length`) are dropped."""
+    mask = np.zeros(length, dtype=bool)
+    idx = np.fromiter(indices, dtype=np.int64)
+    mask[idx[(idx >= 0) & (idx < length)]] = True
+    return mask
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Binary dilation along the last axis: True wherever a True lies within +/- radius.
+
+    Implemented with a running count so the cost does not depend on `radius`.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if radius <= 0:
+        return mask.copy()
+
+    length = mask.shape[-1]
+    pad = [(0, 0)] * (mask.ndim - 1) + [(1, 0)]
+    counts = np.pad(np.cumsum(mask, axis=-1), pad)
+    positions = np.arange(length)
+    hi = np.minimum(positions + radius + 1, length)
+    lo = np.maximum(positions - radius, 0)
+    return (counts[..., hi] - counts[..., lo]) > 0
+
+
+def confusion_matrix(truth: np.ndarray, predicted: np.ndarray, num_classes: int = len(PhaseCodes)) -> np.ndarray:
+    """
+    Multi-class confusion counts in one pass.
+
+    Returns
+    -------
+    np.ndarray
+        (num_classes x num_classes) counts; rows are truth codes, columns predicted codes.
+    """
+    truth = np.asarray(truth, dtype=np.int64).ravel()
+    predicted = np.asarray(predicted, dtype=np.int64).ravel()
+    counts = np.bincount(truth * num_classes + predicted, minlength=num_classes * num_classes)
+    return counts.reshape(num_classes, num_classes)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def _metrics(tp, fp, fn, accuracy, considered) -> Dict[str, np.ndarray]:
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    return {
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "precision": precision,
+        "recall": recall,
+        "f1": _ratio(2 * precision * recall, precision + recall),
+        "accuracy": accuracy,
+        "considered": considered,
+    }
+
+
+def score_phases(
+    codes: np.ndarray,
+    luteal_mask: Optional[np.ndarray] = None,
+    ovulation_mask: Optional[np.ndarray] = None,
+    fertility_mask: Optional[np.ndarray] = None,
+    warmup_period: int = 0,
+    ovulation_forgiveness_window_days: int = 3,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Score luteal, ovulation and fertility predictions in one pass.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Truth labels as `PhaseCodes` values, 1-D or (participants x days).
+    luteal_mask, ovulation_mask, fertility_mask : np.ndarray of bool
+        Prediction masks with the same shape as `codes`. Missing masks are
+        treated as "no predictions".
+    warmup_period : int, default 0
+        Number of initial days to skip.
+    ovulation_forgiveness_window_days : int, default 3
+        An ovulation prediction within +/- this many days of a true
+        ovulation day counts as correct.
+
+    Returns
+    -------
+    dict
+        {"luteal" | "ovulation" | "fertility": {"tp", "fp", "fn", "precision",
+        "recall", "f1", "accuracy", "considered"}}. Values are scalars for
+        1-D input and per-participant arrays for 2-D input. "luteal" also
+        includes "tn".
+    """
+    codes = np.asarray(codes)
+    empty = np.zeros(codes.shape, dtype=bool)
+    luteal_mask = empty if luteal_mask is None else np.asarray(luteal_mask, dtype=bool)
+    ovulation_mask = empty if ovulation_mask is None else np.asarray(ovulation_mask, dtype=bool)
+    fertility_mask = empty if fertility_mask is None else np.asarray(fertility_mask, dtype=bool)
+
+    after_warmup = np.arange(codes.shape[-1]) >= warmup_period
+    axis = -1
+
+    # Luteal vs. everything else, excluding missing labels
+    valid = after_warmup & (codes != PhaseCodes.MISSING)
+    truth_luteal = (codes == PhaseCodes.LUTEAL) | (codes == PhaseCodes.OVULATION)
+    tp = np.sum(valid & truth_luteal & luteal_mask, axis=axis)
+    fp = np.sum(valid & ~truth_luteal & luteal_mask, axis=axis)
+    fn = np.sum(valid & truth_luteal & ~luteal_mask, axis=axis)
+    tn = np.sum(valid & ~truth_luteal & ~luteal_mask, axis=axis)
+    considered = np.sum(valid, axis=axis)
+    luteal = _metrics(tp, fp, fn, _ratio(tp + tn, considered), considered)
+    luteal["tn"] = tn
+
+    # Ovulation with a forgiveness window
+    radius = ovulation_forgiveness_window_days
+    truth_ovulation = after_warmup & (codes == PhaseCodes.OVULATION)
+    considered = np.sum(truth_ovulation, axis=axis)
+    correct = np.sum(ovulation_mask & dilate(truth_ovulation, radius), axis=axis)
+    found = np.sum(truth_ovulation & dilate(ovulation_mask, radius), axis=axis)
+    num_predicted = np.sum(ovulation_mask, axis=axis)
+    ovulation = _metrics(
+        tp=correct,
+        fp=num_predicted - correct,
+        fn=considered - found,
+        accuracy=_ratio(correct, considered),
+        considered=considered,
+    )
+    # Recall counts true ovulation days that were found, not matching predictions
+    ovulation["recall"] = _ratio(found, considered)
+    ovulation["f1"] = _ratio(
+        2 * ovulation["precision"] * ovulation["recall"],
+        ovulation["precision"] + ovulation["recall"],
+    )
+
+    # Fertility: ovulation or fertile days
+    truth_fertile = (codes == PhaseCodes.OVULATION) | (codes == PhaseCodes.FERTILE)
+    considered = np.sum(after_warmup & truth_fertile, axis=axis)
+    correct = np.sum(fertility_mask & truth_fertile, axis=axis)
+    fertility = _metrics(
+        tp=correct,
+        fp=np.sum(fertility_mask & ~truth_fertile, axis=axis),
+        fn=np.sum(after_warmup & truth_fertile & ~fertility_mask, axis=axis),
+        accuracy=_ratio(correct, considered),
+        considered=considered,
+    )
+
+    return {"luteal": luteal, "ovulation": ovulation, "fertility": fertility}
@@ -0,0 +1,220 @@
+"""
+Columnar cache for the Oura `sleep_*.csv` export.
+
+The first load parses the CSV once, pulls the needed fields out of the
+`readiness` blob with `readiness.extract_readiness_fields` instead of
+`ast.literal_eval`, and writes each column as a typed `.npy` file. Later loads memory-map those files.
+
+The cache is keyed by the source file's size, mtime and SHA-256: a changed
+mtime alone only triggers a re-hash, and the columns are rebuilt only when the
+content actually changed.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, timed
+from readiness import extract_readiness_fields
+
+
+CACHE_DIR = "../cache"
+CACHE_VERSION = 2
+
+# Status codes for the readiness blob of each row
+READINESS_OK = 0
+READINESS_MISSING_TEMP = 1      # blob present, temperature_deviation missing/None
+READINESS_NOT_STRING = 2        # cell is empty / not a string
+
+# Sleep session types, in order of preference for a day's primary session.
+# Stored as their index; unknown types are stored as -1.
+SESSION_TYPES = ("long_sleep", "sleep", "late_nap", "rest")
+
+_COLUMNS = (
+    "day",
+    "session_type",
+    "total_sleep_duration",
+    "lowest_heart_rate",
+    "temperature_deviation",
+    "readiness_status",
+)
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(source: str, cache_dir: str) -> str:
+    """Cache directory for `source`: one subdirectory per export file name."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cache_dir, stem)
+
+
+def _read_meta(path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path: str, meta: Dict) -> None:
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def cache_is_fresh(source: str, path: str, version: int, files: Iterable[str]) -> bool:
+    """
+    Check whether the cache in `path` was built from the current `source`.
+
+    A changed mtime alone only triggers a re-hash; if the content is
+    unchanged the stored mtime is updated and the cache stays valid.
+
+    Parameters
+    ----------
+    source : str
+        Source file the cache was built from.
+    path : str
+        Cache directory holding `meta.json` and the cached files.
+    version : int
+        Expected cache format version.
+    files : iterable of str
+        File names that must exist in `path`.
+    """
+    meta = _read_meta(path)
+    stat = os.stat(source)
+
+    fresh = (
+        meta is not None
+        and meta.get("version") == version
+        and meta.get("size") == stat.st_size
+        and all(os.path.exists(os.path.join(path, name)) for name in files)
+    )
+
+    if fresh and meta["mtime_ns"] != stat.st_mtime_ns:
+        # Touched but possibly unchanged: confirm with the content hash
+        fresh = meta["sha256"] == file_sha256(source)
+        if fresh:
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_meta(path, meta)
+
+    return fresh
+
+
+def write_cache_meta(source: str, path: str, version: int, **extra) -> None:
+    """Record the size, mtime and SHA-256 of `source` in `path`/meta.json."""
+    stat = os.stat(source)
+    _write_meta(path, {
+        "version": version,
+        "source": os.path.abspath(source),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(source),
+        **extra,
+    })
+
+
+def extract_temperature_deviation(readiness: pd.Series) -> Dict[str, np.ndarray]:
+    """
+    Extract `temperature_deviation` from raw readiness blobs.
+
+    Parameters
+    ----------
+    readiness : pd.Series
+        Raw `readiness` column (dict-like strings, or NaN).
+
+    Returns
+    -------
+    dict
+        "temperature_deviation" (float64, NaN when missing) and
+        "readiness_status" (int8, one of the READINESS_* codes).
+    """
+    is_string = readiness.map(lambda entry: isinstance(entry, str)).to_numpy(dtype=bool)
+    fields = extract_readiness_fields(readiness.where(is_string), ["temperature_deviation"])
+    temperature = fields["temperature_deviation"].to_numpy(dtype=np.float64)
+
+    status = np.full(len(readiness), READINESS_OK, dtype=np.int8)
+    status[np.isnan(temperature)] = READINESS_MISSING_TEMP
+    status[~is_string] = READINESS_NOT_STRING
+
+    return {"temperature_deviation": temperature, "readiness_status": status}
+
+
+@timed()
+def ingest_sleep_export(source: str, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Parse a sleep export and write its typed columns to the cache.
+
+    Parameters
+    ----------
+    source : str
+        Path to the `sleep_*.csv` export.
+    cache_dir : str
+        Root directory for cached columns.
+
+    Returns
+    -------
+    str
+        Directory holding the cached columns.
+    """
+    df = pd.read_csv(source, usecols=["day", "type", "total_sleep_duration", "lowest_heart_rate", "readiness"])
+
+    columns = {
+        "day": df["day"].to_numpy(dtype="datetime64[D]"),
+        "session_type": pd.Categorical(df["type"], categories=SESSION_TYPES).codes.astype(np.int8),
+        "total_sleep_duration": pd.to_numeric(df["total_sleep_duration"], errors="coerce").to_numpy(dtype=np.float64),
+        "lowest_heart_rate": pd.to_numeric(df["lowest_heart_rate"], errors="coerce").to_numpy(dtype=np.float64),
+    }
+    columns.update(extract_temperature_deviation(df["readiness"]))
+    count("rows_parsed", len(df))
+
+    path = cache_path(source, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    for name in _COLUMNS:
+        np.save(os.path.join(path, f"{name}.npy"), columns[name])
+
+    write_cache_meta(source, path, CACHE_VERSION, rows=len(df))
+    return path
+
+
+def load_sleep_columns(source: str, cache_dir: str = CACHE_DIR) -> Dict[str, np.ndarray]:
+    """
+    Load the cached sleep columns, ingesting the export first if needed.
+
+    Parameters
+    ----------
+    source : str
+        Path to the `sleep_*.csv` export.
+    cache_dir : str
+        Root directory for cached columns.
+
+    Returns
+    -------
+    dict
+        Read-only memory-mapped arrays, one entry per sleep session:
+        "day" (datetime64[D]), "session_type" (int8 index into
+        SESSION_TYPES, -1 if unknown), "total_sleep_duration" (float64,
+        seconds), "lowest_heart_rate" (float64), "temperature_deviation"
+        (float64) and "readiness_status" (int8).
+    """
+    path = cache_path(source, cache_dir)
+    fresh = cache_is_fresh(source, path, CACHE_VERSION, [f"{name}.npy" for name in _COLUMNS])
+
+    if not fresh:
+        ingest_sleep_export(source, cache_dir)
+
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in _COLUMNS
+    }
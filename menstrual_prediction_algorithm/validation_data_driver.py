@@ -1,36 +1,36 @@
-import pandas as pd
 import ast
 import matplotlib.pyplot as plt
 from datetime import date
 
-from data_processing_utils import compute_spiked_prediction_accuracy, compute_weighted_window_spiked_prediction_accuracy, compute_weighted_window_period_adjusting_spiked_prediction_accuracy
+from menstrual_cycle_prediction import (
+    compute_spiked_prediction_accuracy,
+    compute_weighted_window_spiked_prediction_accuracy,
+    compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy,
+)
+from validation_loading import read_validation_csv
 
 # Parse data per participant (each is a dictionary of lists)
 def load_processed_data(
-        filepath, 
-        tempDataPerParticipant={}, 
-        minHeartRatePerParticipant={}, 
-        labelsPerParticipant={}
+        filepath,
+        tempDataPerParticipant=None,
+        minHeartRatePerParticipant=None,
+        labelsPerParticipant=None
     ):
-    data = pd.read_csv(filepath)
-    # tempDataPerParticipant, minHeartRatePerParticipant, labelsPerParticipant = {}, {}, {}
+    """
+    Load one mcPHASES CSV into per-participant dicts.
 
-    allParticipants = set(data['id'].to_list())
+    Pass the dicts returned for a previous file to merge several files.
+    Parsing and the per-participant split happen in one pass in
+    `validation_loading.read_validation_csv`.
+    """
+    tempDataPerParticipant = {} if tempDataPerParticipant is None else tempDataPerParticipant
+    minHeartRatePerParticipant = {} if minHeartRatePerParticipant is None else minHeartRatePerParticipant
+    labelsPerParticipant = {} if labelsPerParticipant is None else labelsPerParticipant
 
-    # Replace labels to only have luteal, period, follicular, ovulation
-    for participant in allParticipants:
-        participant_mask = data['id'] == participant
-        tempDataPerParticipant[participant] = data['basal_body_temperature'][participant_mask].to_list()
-        minHeartRatePerParticipant[participant] = data['min_heart_rate'][participant_mask].to_list()
-        labelsPerParticipant[participant] = data['phase'][participant_mask]
-        labelsPerParticipant[participant] = labelsPerParticipant[participant].replace('Luteal', 'luteal')
-        labelsPerParticipant[participant] = labelsPerParticipant[participant].replace('Menstrual', 'period')
-        labelsPerParticipant[participant] = labelsPerParticipant[participant].replace('Fertility', 'follicular') # For now assume all fertile periods are follicular
-        labelsPerParticipant[participant] = labelsPerParticipant[participant].replace('Follicular', 'follicular')
-        labelsPerParticipant[participant] = labelsPerParticipant[participant].to_list()
-
-    
-    # breakpoint()
+    temp, min_hr, labels = read_validation_csv(filepath).to_dicts()
+    tempDataPerParticipant.update(temp)
+    minHeartRatePerParticipant.update(min_hr)
+    labelsPerParticipant.update(labels)
 
     return tempDataPerParticipant, minHeartRatePerParticipant, labelsPerParticipant
 
@@ -45,11 +45,10 @@ def main():
     # DEBUG_PARTICIPANT = '50_2024' # Needs something to extend phases and dynamicly recalibrate if mispredict on period day
     # DEBUG_PARTICIPANT = '10_2024' # Needs something to account for predicting period, but mispredicting
     # DEBUG_PARTICIPANT = '13_2022' # Needs something to account for predicting period, but mispredicting
-    # accuracy, total_correct, total_considered = compute_weighted_window_period_adjusting_spiked_prediction_accuracy(tempData[DEBUG_PARTICIPANT], labels[DEBUG_PARTICIPANT], visualize=True)
+    # accuracy, total_correct, total_considered = compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy(tempData[DEBUG_PARTICIPANT], labels[DEBUG_PARTICIPANT], visualize=True)
     # breakpoint()
 
     accuracies = []
-    breakpoint()
     total_skipped = 0
     for participant in tempData.keys():
         # if 'period' in labels[participant]:
@@ -62,7 +61,7 @@ def main():
             # accuracy, total_correct, total_considered = compute_weighted_window_spiked_prediction_accuracy(tempData[participant], labels[participant], visualize=False)
             
             # Period aware, which take into account suprise period during luteal prediction - 73.45439191518064
-            accuracy, total_correct, total_considered = compute_weighted_window_period_adjusting_spiked_prediction_accuracy(tempData[participant], labels[participant], visualize=False)
+            accuracy, total_correct, total_considered = compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy(tempData[participant], labels[participant], visualize=False)
             accuracies.append(accuracy)
             print()
         else:
@@ -72,7 +71,8 @@ def main():
     print(f"Average accuracy: {sum(accuracies) / len(accuracies)}")
     print(f"Skipped {total_skipped} participants")
     # accuracy, total_correct, total_considered = compute_spiked_prediction_accuracy(tempData, labels, visualize=True)
-    breakpoint()
+    # For a parallel, headless sweep use batch_evaluation.main()
+    # For tuning scored on held-out participants use cross_validation.main()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,219 @@
+"""
+Columnar loader for the mcPHASES validation CSVs.
+
+A validation file has one row per participant-day. `read_validation_csv`
+parses it in a single typed pass (categorical ids and phases, float32
+signals), maps the phases to integer `PhaseCodes` and groups the rows by
+participant with one stable sort, so every participant is a contiguous
+slice of the column arrays:
+
+    rows of participants[i] == column[offsets[i]:offsets[i + 1]]
+
+Row order within a participant is the file order. The arrays are cached per
+source file under `../cache/validation` (invalidated like the sleep cache),
+so repeated sweeps skip CSV parsing entirely.
+"""
+
+import os
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from phase_labels import PhaseCodes, PhaseLabels, phase_code
+from sleep_cache import cache_is_fresh, cache_path, write_cache_meta
+
+
+VALIDATION_FILES = (
+    "../validation_data/mcphases_2022.csv",
+    "../validation_data/mcphases_2024.csv",
+)
+VALIDATION_CACHE_DIR = "../cache/validation"
+VALIDATION_CACHE_VERSION = 1
+
+# Replace labels to only have luteal, period, follicular
+MCPHASES_PHASE_MAP = {
+    "Luteal": "luteal",
+    "Menstrual": "period",
+    "Fertility": "follicular",  # For now assume all fertile periods are follicular
+    "Follicular": "follicular",
+}
+
+_SIGNALS = {
+    "temperature": "basal_body_temperature",
+    "min_heart_rate": "min_heart_rate",
+}
+_COLUMNS = ("temperature", "min_heart_rate", "phase", "day_in_study")
+
+
+class ValidationCohort:
+    """
+    Per-participant validation data as contiguous slices of flat columns.
+
+    Parameters
+    ----------
+    participants : np.ndarray
+        Participant ids ("<id>_<study_interval>"), one per slice.
+    offsets : np.ndarray
+        int64 array of length participants + 1.
+    columns : dict
+        "temperature", "min_heart_rate" (float32), "phase" (uint8 PhaseCodes)
+        and "day_in_study" (int32), all of length offsets[-1].
+    """
+
+    __slots__ = ("participants", "offsets", "columns", "_index")
+
+    def __init__(self, participants: np.ndarray, offsets: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.participants = participants
+        self.offsets = offsets
+        self.columns = columns
+        self._index = {participant: i for i, participant in enumerate(participants.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.participants)
+
+    def __contains__(self, participant: str) -> bool:
+        return participant in self._index
+
+    def rows(self, participant: str) -> slice:
+        """Slice of the columns holding `participant`."""
+        i = self._index[participant]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def column(self, name: str, participant: str) -> np.ndarray:
+        """One participant's values of column `name` (a view)."""
+        return self.columns[name][self.rows(participant)]
+
+    def labels(self, participant: str) -> PhaseLabels:
+        return PhaseLabels(self.column("phase", participant))
+
+    def to_dicts(self) -> Tuple[Dict[str, List[float]], Dict[str, List[float]], Dict[str, PhaseLabels]]:
+        """Per-participant temperature, minimum heart rate and labels, as dicts keyed by participant."""
+        temp_data, min_hr_data, labels = {}, {}, {}
+        for participant in self._index:
+            temp_data[participant] = self.column("temperature", participant).tolist()
+            min_hr_data[participant] = self.column("min_heart_rate", participant).tolist()
+            labels[participant] = PhaseLabels(np.array(self.column("phase", participant)))
+        return temp_data, min_hr_data, labels
+
+    @classmethod
+    def concatenate(cls, cohorts: Sequence["ValidationCohort"]) -> "ValidationCohort":
+        """
+        Stack cohorts from several files.
+
+        Raises
+        ------
+        ValueError
+            If a participant appears in more than one cohort.
+        """
+        if len(cohorts) == 1:
+            return cohorts[0]
+        participants = np.concatenate([cohort.participants for cohort in cohorts])
+        unique, counts = np.unique(participants, return_counts=True)
+        if (counts > 1).any():
+            raise ValueError(f"Participants appear in more than one file: {unique[counts > 1].tolist()}")
+
+        lengths = np.concatenate([np.diff(cohort.offsets) for cohort in cohorts])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        columns = {
+            name: np.concatenate([cohort.columns[name] for cohort in cohorts])
+            for name in _COLUMNS
+        }
+        return cls(participants, offsets, columns)
+
+
+def _phase_codes(phase: pd.Series) -> np.ndarray:
+    """uint8 PhaseCodes of a categorical mcPHASES phase column (unknown / NaN → MISSING)."""
+    category_codes = np.array(
+        [phase_code(MCPHASES_PHASE_MAP.get(name)) for name in phase.cat.categories] + [PhaseCodes.MISSING],
+        dtype=np.uint8,
+    )
+    return category_codes[phase.cat.codes.to_numpy()]      # code -1 (NaN) picks the trailing MISSING
+
+
+def read_validation_csv(filepath: str) -> ValidationCohort:
+    """
+    Parse one mcPHASES validation CSV.
+
+    Participants are keyed "<id>_<study_interval>"; ids that already carry
+    the interval suffix (as in mcphases_2022.csv) are kept as they are, so
+    files with bare ids (validation_data.csv) split the two intervals.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV.
+
+    Returns
+    -------
+    ValidationCohort
+        Participants in sorted (id, study_interval) order.
+    """
+    data = pd.read_csv(
+        filepath,
+        usecols=["id", "study_interval", "day_in_study", "phase", *_SIGNALS.values()],
+        dtype={
+            "id": "category",
+            "study_interval": np.int32,
+            "day_in_study": np.int32,
+            "phase": "category",
+            **{column: np.float32 for column in _SIGNALS.values()},
+        },
+    )
+
+    groups = data.groupby(["id", "study_interval"], sort=True, observed=True)
+    group = groups.ngroup().to_numpy()
+    participants = np.array([
+        participant if participant.endswith(f"_{interval}") else f"{participant}_{interval}"
+        for participant, interval in groups.size().index
+    ])
+
+    order = np.argsort(group, kind="stable")
+    offsets = np.zeros(len(participants) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(group, minlength=len(participants)), out=offsets[1:])
+
+    columns = {name: data[column].to_numpy()[order] for name, column in _SIGNALS.items()}
+    columns["phase"] = _phase_codes(data["phase"])[order]
+    columns["day_in_study"] = data["day_in_study"].to_numpy()[order]
+    return ValidationCohort(participants, offsets, columns)
+
+
+def _cache_files() -> List[str]:
+    return ["participants.npy", "offsets.npy", *(f"{name}.npy" for name in _COLUMNS)]
+
+
+def load_validation_file(filepath: str, cache_dir: str = VALIDATION_CACHE_DIR) -> ValidationCohort:
+    """`read_validation_csv` through the on-disk cache (arrays are memory-mapped)."""
+    path = cache_path(filepath, cache_dir)
+    if not cache_is_fresh(filepath, path, VALIDATION_CACHE_VERSION, _cache_files()):
+        cohort = read_validation_csv(filepath)
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "participants.npy"), cohort.participants)
+        np.save(os.path.join(path, "offsets.npy"), cohort.offsets)
+        for name in _COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), cohort.columns[name])
+        write_cache_meta(filepath, path, VALIDATION_CACHE_VERSION, rows=int(cohort.offsets[-1]))
+
+    return ValidationCohort(
+        np.load(os.path.join(path, "participants.npy")),
+        np.load(os.path.join(path, "offsets.npy")),
+        {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _COLUMNS},
+    )
+
+
+def load_validation_cohort(
+    filepaths: Iterable[str] = VALIDATION_FILES,
+    cache_dir: str = VALIDATION_CACHE_DIR,
+) -> ValidationCohort:
+    """
+    Load and merge the validation files.
+
+    Parameters
+    ----------
+    filepaths : iterable of str
+        mcPHASES CSV files to merge.
+    cache_dir : str
+        Root directory for the cached arrays.
+    """
+    return ValidationCohort.concatenate([load_validation_file(filepath, cache_dir) for filepath in filepaths])
@@ -1,5 +1,13 @@
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
 import matplotlib.pyplot as plt
-from typing import Iterable, List
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 
 
 def plot_curve_pairs(
@@ -50,6 +58,89 @@ def plot_curve_pairs(
     plt.show()
 
 
+def index_runs(indices: Iterable[int]) -> List[Tuple[int, int]]:
+    """
+    Group indices into contiguous runs.
+
+    Parameters
+    ----------
+    indices : Iterable[int]
+        Day indices, in any order; duplicates are ignored.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        (first, last) index of each run, inclusive, in ascending order.
+    """
+    days = np.unique(np.asarray(list(indices), dtype=np.int64))
+    if len(days) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(days) > 1)
+    firsts = np.concatenate(([days[0]], days[breaks + 1]))
+    lasts = np.concatenate((days[breaks], [days[-1]]))
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+def highlight_runs(ax, indices: Iterable[int], color: str, alpha: float = 0.35) -> PolyCollection:
+    """
+    Shade every contiguous run of `indices` as one full-height span.
+
+    All spans go into a single collection, so the number of artists does not
+    grow with the number of highlighted days. Each day covers [i - 0.5, i + 0.5].
+    """
+    spans = [
+        [(first - 0.5, 0), (first - 0.5, 1), (last + 0.5, 1), (last + 0.5, 0)]
+        for first, last in index_runs(indices)
+    ]
+    collection = PolyCollection(
+        spans, facecolors=color, edgecolors="none", alpha=alpha,
+        transform=ax.get_xaxis_transform(),     # x in data, y in axes coordinates
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def _draw_stacked(ax_top, ax_bottom, data0, spikes0, data1, spikes1, data0Name, data1Name) -> None:
+    # Top plot
+    ax_top.plot(data0, color="blue")
+    ax_top.set_title(data0Name)
+    highlight_runs(ax_top, spikes0, color="red")
+
+    # Bottom plot
+    ax_bottom.plot(data1, color="orange")
+    ax_bottom.set_title(data1Name)
+    highlight_runs(ax_bottom, spikes1, color="green")
+
+
+def render_stacked_with_highlights(
+    data0: Iterable[float],
+    spikes0: List[int],
+    data1: Iterable[float],
+    spikes1: List[int],
+    data0Name: str = "data0",
+    data1Name: str = "data1",
+) -> Figure:
+    """
+    Headless version of `graph_stacked_with_highlights`.
+
+    The figure is drawn on an Agg canvas without going through pyplot, so it
+    needs no display, is not registered with pyplot's figure manager and is
+    freed once it goes out of scope. Margins are fixed rather than computed
+    by tight_layout, which would otherwise take half of the rendering time.
+
+    Returns
+    -------
+    Figure
+        The rendered figure; save it with `fig.savefig(path)`.
+    """
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax_top, ax_bottom = fig.subplots(nrows=2, ncols=1, sharex=True)
+    _draw_stacked(ax_top, ax_bottom, data0, spikes0, data1, spikes1, data0Name, data1Name)
+    fig.subplots_adjust(left=0.07, right=0.98, bottom=0.05, top=0.95, hspace=0.2)
+    return fig
+
+
 def graph_stacked_with_highlights(
     data0: Iterable[float],
     spikes0: List[int],
@@ -57,9 +148,12 @@ def graph_stacked_with_highlights(
     spikes1: List[int],
     data0Name: str = "data0",
     data1Name: str = "data1",
+    path: Optional[str] = None,
 ) -> None:
     """
-    Plot two aligned stacked time-series curves with vertical lines marking spike indices.
+    Plot two aligned stacked time-series curves with spike indices shaded.
+
+    Contiguous runs of spike indices are drawn as one span each.
 
     Parameters
     ----------
@@ -75,27 +169,117 @@ def graph_stacked_with_highlights(
         Title for the first plot.
     data1Name : str
         Title for the second plot.
+    path : str, optional
+        Save the figure here (format from the extension) instead of showing
+        it. Rendering is then headless.
     """
+    if path is not None:
+        render_stacked_with_highlights(data0, spikes0, data1, spikes1, data0Name, data1Name).savefig(path)
+        return
+
     fig, (ax_top, ax_bottom) = plt.subplots(
         nrows=2, ncols=1, sharex=True, figsize=(10, 6)
     )
+    _draw_stacked(ax_top, ax_bottom, data0, spikes0, data1, spikes1, data0Name, data1Name)
 
-    # Top plot
-    ax_top.plot(data0, color="blue")
-    ax_top.set_title(data0Name)
+    plt.tight_layout()
+    plt.show()
 
-    for idx in spikes0:
-        ax_top.axvline(x=idx, color="red", linestyle="-", linewidth=1.5)
 
-    # Bottom plot
-    ax_bottom.plot(data1, color="orange")
-    ax_bottom.set_title(data1Name)
+# --------------------------------------------------------------------------------------
+# BATCH REPORTS
+# --------------------------------------------------------------------------------------
 
-    for idx in spikes1:
-        ax_bottom.axvline(x=idx, color="green", linestyle="-", linewidth=1.5)
+class ReportPanel(NamedTuple):
+    """Inputs of one participant's stacked report figure."""
 
-    plt.tight_layout()
-    plt.show()
+    data0: List[float]
+    spikes0: List[int]
+    data1: List[float]
+    spikes1: List[int]
+    data0Name: str = "predicted"
+    data1Name: str = "true_label"
+    caption: str = ""
+
+
+def _report_filename(name: str, fmt: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return f"{safe}.{fmt}"
+
+
+def _render_report(task: Tuple[str, ReportPanel, str, str]) -> str:
+    """Worker entry point: render one panel to a file and return the file name."""
+    name, panel, output_dir, fmt = task
+    filename = _report_filename(name, fmt)
+    fig = render_stacked_with_highlights(
+        panel.data0, panel.spikes0, panel.data1, panel.spikes1,
+        data0Name=f"{name}: {panel.data0Name}", data1Name=panel.data1Name,
+    )
+    # Fast zlib level: compression is a large share of the PNG time
+    options = {"pil_kwargs": {"compress_level": 1}} if fmt == "png" else {}
+    fig.savefig(os.path.join(output_dir, filename), dpi=80, **options)
+    return filename
+
+
+def _write_index(output_dir: str, panels: Dict[str, ReportPanel], filenames: List[str], title: str) -> str:
+    rows = "\n".join(
+        f'<figure id="{html.escape(name)}"><figcaption><b>{html.escape(name)}</b> '
+        f'{html.escape(panel.caption)}</figcaption>'
+        f'<img src="{html.escape(filename)}" loading="lazy" width="800"></figure>'
+        for (name, panel), filename in zip(panels.items(), filenames)
+    )
+    links = " ".join(f'<a href="#{html.escape(name)}">{html.escape(name)}</a>' for name in panels)
+    path = os.path.join(output_dir, "index.html")
+    with open(path, "w") as f:
+        f.write(
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n"
+            f"<body><h1>{html.escape(title)}</h1>\n<nav>{links}</nav>\n{rows}\n</body></html>\n"
+        )
+    return path
+
+
+def render_reports(
+    panels: Dict[str, ReportPanel],
+    output_dir: str,
+    fmt: str = "png",
+    title: str = "Cycle prediction reports",
+    max_workers: Optional[int] = None,
+) -> str:
+    """
+    Render one report per participant in parallel and link them from an HTML index.
+
+    Parameters
+    ----------
+    panels : dict
+        Participant id → ReportPanel. The index keeps this order.
+    output_dir : str
+        Directory for the images and index.html (created if needed).
+    fmt : str, default "png"
+        Image format ("png" or "svg").
+    title : str
+        Heading of the index page.
+    max_workers : int, optional
+        Process pool size. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    str
+        Path of index.html.
+    """
+    if fmt not in ("png", "svg"):
+        raise ValueError(f"Unsupported report format {fmt!r}; expected 'png' or 'svg'")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(name, panel, output_dir, fmt) for name, panel in panels.items()]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        filenames = [_render_report(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            filenames = list(pool.map(_render_report, tasks, chunksize=chunksize))
+
+    return _write_index(output_dir, panels, filenames, title)
 
 
 def display_labels(
@@ -0,0 +1,286 @@
+"""
+Walk-forward backtest of the period-adjusting detector.
+
+`compute_weighted_window_period_adjusting_spiked_prediction_with_ovulation_accuracy`
+scores every day with hindsight: `low_pass` averages each day with the two
+days after it, so a day's prediction depends on data that was not yet
+recorded on that day. The backtest replays each participant day by day
+instead and records what the app would have shown on each day, using only
+the data recorded up to and including that day:
+
+    predictions[d, h] = phase predicted on day d for day d + h
+
+Row 0 of the horizon axis is the as-of prediction for the day itself. The
+detector state is carried forward with `OnlineCyclePredictor`, so each day
+costs O(horizon) rather than a rerun of
+`period_adjusting_identify_weighted_windowed_spikes` on the whole prefix.
+Later horizons come from `OnlineCyclePredictor.forecast`. Participants are
+replayed in parallel across a process pool.
+
+Usage:
+    python walk_forward.py [--horizon 7] [--smoothing-window 3] [--output results.csv]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from filters import moving_average
+from instrumentation import count, timed
+from online_prediction import OnlineCyclePredictor
+from phase_labels import PhaseCodes, PhaseLabels, encode_phases, phase_code
+from scoring import score_phases
+
+
+DEFAULT_HORIZON = 7
+DEFAULT_SMOOTHING_WINDOW = 3     # matches low_pass in the accuracy entry points
+
+
+class AsOfPredictions(NamedTuple):
+    """
+    Everything predicted on each day of one participant's series.
+
+    phases : np.ndarray
+        (days x horizon + 1) uint8 PhaseCodes; [d, h] is the phase predicted
+        on day d for day d + h. MISSING where no prediction was made (before
+        the first smoothed sample) or d + h is past the end of the series.
+    luteal : np.ndarray
+        (days x horizon + 1) bool; [d, h] is True if day d + h was predicted
+        to be in a luteal spike run (scored like `spike_indices`, regardless
+        of the fertile/ovulation priority in `phases`).
+    lag : int
+        Days between a raw sample and the first smoothed value it completes.
+    """
+    phases: np.ndarray
+    luteal: np.ndarray
+    lag: int
+
+    @property
+    def horizon(self) -> int:
+        return self.phases.shape[1] - 1
+
+    def for_horizon(self, h: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Phases and luteal flags predicted `h` days ahead, indexed by target day."""
+        num_days = len(self.phases)
+        phases = np.full(num_days, PhaseCodes.MISSING, dtype=np.uint8)
+        luteal = np.zeros(num_days, dtype=bool)
+        phases[h:] = self.phases[:num_days - h, h]
+        luteal[h:] = self.luteal[:num_days - h, h]
+        return phases, luteal
+
+
+# --------------------------------------------------------------------------------------
+# REPLAY
+# --------------------------------------------------------------------------------------
+
+@timed()
+def backtest_series(
+    data: Sequence[float],
+    labels: Union[List[str], PhaseLabels],
+    window_size: int = 14,
+    smoothing_window: int = DEFAULT_SMOOTHING_WINDOW,
+    horizon: int = DEFAULT_HORIZON,
+) -> AsOfPredictions:
+    """
+    Replay one participant day by day and record every as-of prediction.
+
+    On day d the moving average is complete up to index d - lag (lag =
+    smoothing_window - 1). That sample and its reported label are fed to the
+    predictor, and the phases of days d .. d + horizon are read off its
+    state. With smoothing_window=1 the as-of predictions at horizon 0 are
+    exactly those of `period_adjusting_identify_weighted_windowed_spikes`
+    on `data`.
+
+    Parameters
+    ----------
+    data : sequence of float
+        Raw nightly temperatures (or other signal).
+    labels : List[str] or PhaseLabels
+        User-reported labels, aligned with `data`.
+    window_size : int, default 14
+        Rolling window size of the detector.
+    smoothing_window : int, default 3
+        Moving-average window applied before detection.
+    horizon : int, default 7
+        Number of days ahead to forecast on each day.
+
+    Returns
+    -------
+    AsOfPredictions
+    """
+    if horizon < 0:
+        raise ValueError("horizon must be non-negative")
+
+    num_days = len(data)
+    codes = encode_phases(labels)
+    smoothed = moving_average(data, smoothing_window, edge="valid").tolist()
+    lag = smoothing_window - 1
+
+    phases = np.full((num_days, horizon + 1), PhaseCodes.MISSING, dtype=np.uint8)
+    luteal = np.zeros((num_days, horizon + 1), dtype=bool)
+    predictor = OnlineCyclePredictor(n=window_size)
+
+    for j, temperature in enumerate(smoothed):
+        day = j + lag
+        today, events = predictor.update_with_events(temperature, int(codes[j]))
+        ahead = min(lag + horizon, num_days - 1 - j)     # days after j still inside the series
+        upcoming = [today] + predictor.forecast(ahead)
+        spiked = [any(kind == "luteal" for kind, _, _ in events)] + [predictor.spiked_run] * ahead
+
+        # upcoming[k] is the prediction for index j + k = day + (k - lag)
+        row = slice(lag, lag + horizon + 1)
+        predicted = upcoming[row]
+        phases[day, :len(predicted)] = [phase_code(phase) for phase in predicted]
+        luteal[day, :len(predicted)] = spiked[row]
+
+    count("days_backtested", len(smoothed))
+    return AsOfPredictions(phases, luteal, lag)
+
+
+# --------------------------------------------------------------------------------------
+# SCORING
+# --------------------------------------------------------------------------------------
+
+def score_backtest(
+    labels: Union[List[str], PhaseLabels],
+    predictions: AsOfPredictions,
+    warmup_period: Optional[int] = None,
+    window_size: int = 14,
+) -> pd.DataFrame:
+    """
+    Score the predictions made 0 .. horizon days ahead against the truth.
+
+    Parameters
+    ----------
+    labels : List[str] or PhaseLabels
+        Ground-truth phase labels.
+    predictions : AsOfPredictions
+        Output of `backtest_series`.
+    warmup_period : int, optional
+        Number of initial target days to skip. Defaults to
+        window_size + lag + horizon, the first day every horizon has a
+        prediction from a warmed-up detector, so all horizons are scored on
+        the same days.
+    window_size : int, default 14
+        Rolling window size of the detector (for the default warmup).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per horizon with luteal, ovulation and fertility accuracy and
+        the number of luteal days considered.
+    """
+    if warmup_period is None:
+        warmup_period = window_size + predictions.lag + predictions.horizon
+
+    horizons = range(predictions.horizon + 1)
+    aligned = [predictions.for_horizon(h) for h in horizons]
+    phases = np.stack([phase for phase, _ in aligned])
+    luteal = np.stack([spiked for _, spiked in aligned])
+
+    codes = np.broadcast_to(encode_phases(labels), phases.shape)
+    scores = score_phases(
+        codes,
+        luteal_mask=luteal,
+        ovulation_mask=phases == PhaseCodes.OVULATION,
+        fertility_mask=(phases == PhaseCodes.FERTILE) | (phases == PhaseCodes.OVULATION),
+        warmup_period=warmup_period,
+    )
+    return pd.DataFrame({
+        "horizon": list(horizons),
+        "luteal_accuracy": scores["luteal"]["accuracy"],
+        "ovulation_accuracy": scores["ovulation"]["accuracy"],
+        "fertility_accuracy": scores["fertility"]["accuracy"],
+        "total_considered": scores["luteal"]["considered"],
+    })
+
+
+# --------------------------------------------------------------------------------------
+# PARALLEL SWEEP
+# --------------------------------------------------------------------------------------
+
+def _backtest_participant(task: Tuple[str, List[float], PhaseLabels, int, int, int]) -> pd.DataFrame:
+    """Worker entry point: replay and score a single participant."""
+    participant, data, labels, window_size, smoothing_window, horizon = task
+    predictions = backtest_series(data, labels, window_size, smoothing_window, horizon)
+    scores = score_backtest(labels, predictions, window_size=window_size)
+    scores.insert(0, "participant", participant)
+    return scores
+
+
+def backtest_participants(
+    temp_data: Dict[str, List[float]],
+    labels: Dict[str, PhaseLabels],
+    window_size: int = 14,
+    smoothing_window: int = DEFAULT_SMOOTHING_WINDOW,
+    horizon: int = DEFAULT_HORIZON,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Walk-forward backtest of every participant in parallel.
+
+    Parameters
+    ----------
+    temp_data : dict
+        Participant id → temperature series.
+    labels : dict
+        Participant id → ground-truth phase labels.
+    window_size, smoothing_window, horizon : int
+        As for `backtest_series`.
+    max_workers : int, optional
+        Process pool size. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    results : pd.DataFrame
+        One row per participant and horizon (see `score_backtest`).
+    summary : pd.DataFrame
+        Mean accuracies per horizon.
+    """
+    tasks = [
+        (participant, temp_data[participant], labels[participant], window_size, smoothing_window, horizon)
+        for participant in sorted(temp_data)
+    ]
+    if not tasks:
+        raise ValueError("No participants to backtest.")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * max_workers))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pd.concat(pool.map(_backtest_participant, tasks, chunksize=chunksize), ignore_index=True)
+
+    summary = results.drop(columns="participant").groupby("horizon").mean()
+    summary["total_considered"] = results.groupby("horizon")["total_considered"].sum()
+    return results, summary
+
+
+def main() -> None:
+    """Walk-forward backtest over the mcPHASES validation set."""
+    from validation_loading import load_validation_cohort
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the period-adjusting detector.")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="days ahead to forecast")
+    parser.add_argument("--smoothing-window", type=int, default=DEFAULT_SMOOTHING_WINDOW)
+    parser.add_argument("--window-size", type=int, default=14)
+    parser.add_argument("--output", metavar="CSV", help="write the per-participant results to CSV")
+    args = parser.parse_args()
+
+    temp_data, _, labels = load_validation_cohort().to_dicts()
+    results, summary = backtest_participants(
+        temp_data, labels,
+        window_size=args.window_size, smoothing_window=args.smoothing_window, horizon=args.horizon,
+    )
+
+    print(summary.to_string(float_format="{:.4f}".format))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
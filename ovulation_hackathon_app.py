@@ -3,13 +3,23 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import timedelta
-import json
+import hashlib
+import io
+import os
+import sys
 
-st.set_page_config(page_title="Romi Cycle Visualization", layout="wide")
-st.title("Romi Cycle Visualization")
+ALGORITHM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "menstrual_prediction_algorithm")
+
+# The helpers import the flat modules in menstrual_prediction_algorithm/ when called;
+# main() puts that directory on sys.path so importing this module has no side effects
+def add_algorithm_path():
+    if ALGORITHM_DIR not in sys.path:
+        sys.path.insert(0, ALGORITHM_DIR)
 
 # ---------------- Helpers ----------------
 def extract_trend_first(df: pd.DataFrame, smooth_win: int = 5) -> pd.Series:
+    from readiness import extract_readiness_fields
+
     lc_map = {c.lower().strip(): c for c in df.columns}
     # 1) Preferred: temperature_trend_deviation
     for key in ["temperature_trend_deviation", "temp_trend_deviation", "temp_trend"]:
@@ -18,20 +28,11 @@ def extract_trend_first(df: pd.DataFrame, smooth_win: int = 5) -> pd.Series:
     for lc_name, orig in lc_map.items():
         if "temperature_trend_deviation" in lc_name or "temp_trend_deviation" in lc_name:
             return pd.to_numeric(df[orig], errors="coerce")
-    # 2) Readiness JSON blob with contributors.temperature_trend_deviation
+    # 2) Readiness blob (JSON or Python repr) with temperature_trend_deviation
     for rc in [c for c in df.columns if c.lower().strip() in ["readiness", "readiness_json", "readiness_data"]]:
-        try:
-            if isinstance(df[rc].iloc[0], dict):
-                series = df[rc].apply(lambda x: x.get("contributors", {}).get("temperature_trend_deviation", np.nan) if isinstance(x, dict) else np.nan)
-                if series.notna().sum() > 0:
-                    return pd.to_numeric(series, errors="coerce")
-            else:
-                parsed = df[rc].apply(lambda s: json.loads(s) if isinstance(s, str) and s.strip().startswith("{") else {})
-                series = parsed.apply(lambda x: x.get("contributors", {}).get("temperature_trend_deviation", np.nan) if isinstance(x, dict) else np.nan)
-                if series.notna().sum() > 0:
-                    return pd.to_numeric(series, errors="coerce")
-        except Exception:
-            pass
+        series = extract_readiness_fields(df[rc], ["temperature_trend_deviation"])["temperature_trend_deviation"]
+        if series.notna().sum() > 0:
+            return series
     # 3) Fallback to temperature_deviation (smoothed)
     for key in ["temperature_deviation", "temp_deviation"]:
         if key in lc_map:
@@ -65,7 +66,19 @@ def prepare_df(raw: pd.DataFrame) -> pd.DataFrame:
         raise ValueError("CSV must include a date-like column (date/summary_date/day).")
     df = raw.rename(columns={date_col: "date"})
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"]).sort_values("date").drop_duplicates("date").reset_index(drop=True)
+    df = df.dropna(subset=["date"])
+    if "type" in df.columns:
+        # Oura sleep export: one row per session, keep each day's primary session
+        from daily_aggregation import primary_session_rows
+        from sleep_cache import SESSION_TYPES
+
+        duration = df["total_sleep_duration"] if "total_sleep_duration" in df.columns else pd.Series(np.nan, index=df.index)
+        df = df.iloc[primary_session_rows(
+            df["date"].dt.normalize().to_numpy().astype("datetime64[D]"),
+            pd.Categorical(df["type"], categories=SESSION_TYPES).codes,
+            pd.to_numeric(duration, errors="coerce").to_numpy(),
+        )]
+    df = df.sort_values("date").drop_duplicates("date").reset_index(drop=True)
 
     temp = extract_trend_first(df, smooth_win=5)
     temp = pd.to_numeric(temp, errors="coerce").replace([np.inf, -np.inf], np.nan).interpolate(limit_direction="both")
@@ -86,40 +99,62 @@ def prepare_df(raw: pd.DataFrame) -> pd.DataFrame:
                 break
     return df
 
-def find_nadir_then_rise(sig_c, idx, rise_min=0.25, rise_days=3):
-    n = len(sig_c)
-    if idx + rise_days >= n:
-        return False, None, 0.0
-    base = sig_c.iloc[idx]
-    window = sig_c.iloc[idx+1: idx+1+rise_days]
-    cond = (window - base) >= rise_min
-    if cond.all():
-        return True, idx+1, float((window - base).mean())
-    return False, None, float((window - base).clip(lower=0).mean())
+def find_nadir_then_rise_all(sig_c, rise_min=0.25, rise_days=3):
+    """Vectorized nadir + sustained-rise test for every day of the series at once.
+
+    Returns (nadir_positions, mean_rises): positions i where sig[i] is a strict local
+    minimum and each of the next `rise_days` values is at least `rise_min` above it.
+    """
+    sig = np.asarray(sig_c, dtype=float)
+    n = len(sig)
+    if n < 3 or n - 1 - rise_days < 1:
+        return np.array([], dtype=int), np.array([], dtype=float)
+
+    # Local nadir: strictly below both neighbours (NaN compares False)
+    nadir = np.zeros(n, dtype=bool)
+    nadir[1:-1] = (sig[1:-1] < sig[:-2]) & (sig[1:-1] < sig[2:])
+
+    # rises[i, k] = sig[i+1+k] - sig[i] for every i that has rise_days days after it
+    num_windows = n - rise_days
+    windows = np.lib.stride_tricks.sliding_window_view(sig[1:], rise_days)[:num_windows]
+    rises = windows - sig[:num_windows, None]
+    sustained = np.zeros(n, dtype=bool)
+    sustained[:num_windows] = (rises >= rise_min).all(axis=1)
+
+    positions = np.flatnonzero(nadir & sustained)
+    return positions, rises[positions].mean(axis=1)
 
 # -------- Strong detector (nadir + sustained rise) --------
+def candidates_to_records(dates, positions, mean_rises, rise_days=3):
+    return [
+        {
+            "ovulation_date": dates[i + 1].date(),
+            "nadir_date": dates[i].date(),
+            "rise_mean_c": float(mean_rise),
+            "confidence": "high" if mean_rise >= 0.30 and rise_days >= 3 else "medium",
+        }
+        for i, mean_rise in zip(positions.tolist(), mean_rises.tolist())
+    ]
+
+def filter_candidates(dates, positions, mean_rises, search_start=None, search_end=None,
+                      first_pos=0, last_pos=None, rise_days=3):
+    """Keep candidates whose nadir falls in the search dates and whose nadir and rise
+    window lie inside rows [first_pos, last_pos] (a contiguous slice of the series)."""
+    last_pos = len(dates) - 1 if last_pos is None else last_pos
+    keep = (positions >= first_pos + 1) & (positions <= last_pos - 1) & (positions + rise_days <= last_pos)
+    nadir_days = dates.dt.normalize().to_numpy()[positions]
+    if search_start is not None:
+        keep &= nadir_days >= np.datetime64(pd.Timestamp(search_start))
+    if search_end is not None:
+        keep &= nadir_days <= np.datetime64(pd.Timestamp(search_end))
+    return positions[keep], mean_rises[keep]
+
 def detect_ovulation_candidates(df: pd.DataFrame, rise_min=0.25, rise_days=3, search_start=None, search_end=None):
-    sig_c = df["temp_signal_c"].reset_index(drop=True)
+    sig_c = df["temp_signal_c"].to_numpy(dtype=float)
     dates = pd.Series(df["date"]).reset_index(drop=True)
-    candidates = []
-    for i in range(1, len(sig_c)-1):
-        d_i = dates[i].date()
-        if search_start is not None and d_i < search_start:
-            continue
-        if search_end is not None and d_i > search_end:
-            continue
-        if pd.isna(sig_c.iloc[i-1]) or pd.isna(sig_c.iloc[i]) or pd.isna(sig_c.iloc[i+1]):
-            continue
-        if sig_c.iloc[i] < sig_c.iloc[i-1] and sig_c.iloc[i] < sig_c.iloc[i+1]:
-            ok, rise_idx, mean_rise = find_nadir_then_rise(sig_c, i, rise_min, rise_days)
-            if ok:
-                candidates.append({
-                    "ovulation_date": dates[rise_idx].date(),
-                    "nadir_date": dates[i].date(),
-                    "rise_mean_c": float(mean_rise),
-                    "confidence": "high" if mean_rise >= 0.30 and rise_days >= 3 else "medium",
-                })
-    return candidates
+    positions, mean_rises = find_nadir_then_rise_all(sig_c, rise_min, rise_days)
+    positions, mean_rises = filter_candidates(dates, positions, mean_rises, search_start, search_end, rise_days=rise_days)
+    return candidates_to_records(dates, positions, mean_rises, rise_days)
 
 # -------- Fallback: pick best-scoring day even if below threshold --------
 def pick_best_fallback(df: pd.DataFrame, win_start, win_end, rise_days=3):
@@ -205,46 +240,86 @@ def label_phases(df,
         out.loc[(out["phase"] == "unlabeled") & (out["temp_signal_c"] >  mid), "phase"] = "luteal"
         return out
 
-    dates = out["date"].dt.date
-    for i, start in enumerate(menses_starts):
-        end = menses_starts[i+1] - timedelta(days=1) if i+1 < len(menses_starts) else dates.max()
-        cyc_mask = (dates >= start) & (dates <= end)
-        if not cyc_mask.any():
+    # -------- Cycle indexing: one searchsorted over the (sorted) start dates --------
+    date_col = out["date"]
+    if date_col.dt.tz is not None:
+        date_col = date_col.dt.tz_localize(None)
+    days = date_col.dt.normalize().to_numpy()
+    one_day = np.timedelta64(1, "D")
+    starts = pd.to_datetime(pd.Series(menses_starts)).to_numpy()
+    ends = np.append(starts[1:] - one_day, days.max())
+    num_cycles = len(starts)
+
+    cycle_id = np.searchsorted(starts, days, side="right") - 1     # -1 before the first start
+    in_cycle = cycle_id >= 0
+    cycle_day = (days - starts[np.maximum(cycle_id, 0)]) // one_day
+    first_row = np.searchsorted(cycle_id, np.arange(num_cycles), side="left")
+    last_row = np.searchsorted(cycle_id, np.arange(num_cycles), side="right") - 1
+
+    # Menstruation: D1–D5 of each cycle
+    menses = in_cycle & (cycle_day < 5)
+
+    # Ovulation search window per cycle (wider by default)
+    win_starts = starts + search_days[0] * one_day
+    win_ends = np.minimum(ends, starts + search_days[1] * one_day)
+
+    # Strong detector: candidates for the whole series in one pass, then the best
+    # (largest mean rise, earliest on ties) candidate whose nadir, neighbours and
+    # rise window lie inside its cycle and whose nadir is in the search window
+    positions, mean_rises = find_nadir_then_rise_all(out["temp_signal_c"].to_numpy(dtype=float), rise_min, rise_days)
+    cand_cycle = cycle_id[positions]
+    c = np.maximum(cand_cycle, 0)
+    keep = ((cand_cycle >= 0)
+            & (positions >= first_row[c] + 1)
+            & (positions + np.maximum(rise_days, 1) <= last_row[c])
+            & (days[positions] >= win_starts[c])
+            & (days[positions] <= win_ends[c]))
+    positions, mean_rises, cand_cycle = positions[keep], mean_rises[keep], cand_cycle[keep]
+    order = np.lexsort((positions, -mean_rises, cand_cycle))
+    best_cycles, best_idx = np.unique(cand_cycle[order], return_index=True)
+    best_pos = dict(zip(best_cycles.tolist(), positions[order][best_idx].tolist()))
+    best_rise = dict(zip(best_cycles.tolist(), mean_rises[order][best_idx].tolist()))
+
+    # Ovulation date per cycle; record the last cycle whose window covers each row
+    window_owner = np.full(len(out), -1)
+    timestamps = out["date"]
+    for i in range(num_cycles):
+        if last_row[i] < first_row[i]:
             continue
-
-        # Menstruation: D1–D5
-        for d in range(5):
-            day = start + timedelta(days=d)
-            if day > end: break
-            out.loc[out["date"].dt.date == day, "phase"] = "menstruation"
-
-        # Search window (wider by default)
-        win_start = start + timedelta(days=search_days[0])
-        win_end   = min(end, start + timedelta(days=search_days[1]))
-
-        # Strong detector
-        cands = detect_ovulation_candidates(out.loc[cyc_mask], rise_min, rise_days, win_start, win_end)
-        if cands:
-            best = max(cands, key=lambda c: c["rise_mean_c"])
-            ovu = best["ovulation_date"]; conf = best["confidence"]
-        else:
+        if i in best_pos:
+            ovu = timestamps.iloc[best_pos[i] + 1].date()
+            conf = "high" if best_rise[i] >= 0.30 and rise_days >= 3 else "medium"
+        elif force_one_window_per_cycle:
             # Fallback to still show one window per cycle
-            if force_one_window_per_cycle:
-                ovu, _, _ = pick_best_fallback(out, pd.to_datetime(win_start), pd.to_datetime(win_end), rise_days)
-                conf = "low" if ovu else None
-            else:
-                ovu, conf = None, None
+            ovu, _, _ = pick_best_fallback(out, pd.Timestamp(win_starts[i]), pd.Timestamp(win_ends[i]), rise_days)
+            conf = "low" if ovu else None
+        else:
+            ovu, conf = None, None
 
         if ovu:
-            out.loc[out["date"].between(pd.to_datetime(ovu)-pd.Timedelta(days=window_half_width),
-                                        pd.to_datetime(ovu)+pd.Timedelta(days=window_half_width)), "phase"] = "ovulation_window"
-            out.loc[out["date"] == pd.to_datetime(ovu), "ovulation_estimate"] = pd.to_datetime(ovu)
-            out.loc[out["date"] == pd.to_datetime(ovu), "ovulation_confidence"] = conf
-
-        # Fill remaining days by relative level
-        cyc_mid = out.loc[cyc_mask, "temp_signal_c"].median()
-        out.loc[cyc_mask & (out["phase"] == "unlabeled") & (out["temp_signal_c"] <= cyc_mid), "phase"] = "follicular"
-        out.loc[cyc_mask & (out["phase"] == "unlabeled") & (out["temp_signal_c"] >  cyc_mid), "phase"] = "luteal"
+            ovu_ts = pd.to_datetime(ovu)
+            lo = timestamps.searchsorted(ovu_ts - pd.Timedelta(days=window_half_width), side="left")
+            hi = timestamps.searchsorted(ovu_ts + pd.Timedelta(days=window_half_width), side="right")
+            window_owner[lo:hi] = i
+            lo = timestamps.searchsorted(ovu_ts, side="left")
+            hi = timestamps.searchsorted(ovu_ts, side="right")
+            out.iloc[lo:hi, out.columns.get_loc("ovulation_estimate")] = ovu_ts
+            out.iloc[lo:hi, out.columns.get_loc("ovulation_confidence")] = conf
+
+    # -------- Phase fill as array operations --------
+    # Per cycle the phases were written in the order menstruation → ovulation window →
+    # median split of still-unlabeled days, so an ovulation window wins over
+    # menstruation only if it belongs to the same or a later cycle.
+    ovulation_window = (window_owner >= 0) & ((window_owner >= cycle_id) | ~menses)
+    temp = out["temp_signal_c"]
+    cyc_mid = temp.groupby(cycle_id).transform("median").where(in_cycle)
+
+    phase = np.full(len(out), "unlabeled", dtype=object)
+    phase[in_cycle & (temp <= cyc_mid).to_numpy()] = "follicular"
+    phase[in_cycle & (temp > cyc_mid).to_numpy()] = "luteal"
+    phase[menses] = "menstruation"
+    phase[ovulation_window] = "ovulation_window"
+    out["phase"] = phase
 
     return out
 
@@ -279,76 +354,114 @@ def plot_static_matplotlib(df_win: pd.DataFrame, title: str = "120-day cycle vie
     fig.tight_layout()
     return fig
 
+# ---------------- Caching ----------------
+# Streamlit reruns the whole script on every interaction. The prepared frame is
+# cached per uploaded file (keyed on its content hash) and the labeled frame per
+# (file, detection settings), so moving the window slider only re-slices and
+# redraws. max_entries bounds memory; the least recently used entries are evicted.
+DEMO_DATA_KEY = "demo"
+
+def make_demo_raw(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=200, freq="D")
+    base = np.sin(np.linspace(0, 4*np.pi, len(dates))) * 0.05
+    bump = np.zeros_like(base)
+    bump[60:63] += np.array([0.1, 0.25, 0.35])
+    bump[130:133] += np.array([0.08, 0.22, 0.33])
+    noise = rng.standard_normal(len(dates)) * 0.03
+    temp = base + bump + noise
+    return pd.DataFrame({"date": dates, "temperature_trend_deviation": temp})
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_prepared(data_key, _file_bytes=None):
+    # data_key is the upload's SHA-256 (or DEMO_DATA_KEY); the bytes are not hashed again
+    raw = make_demo_raw() if data_key == DEMO_DATA_KEY else pd.read_csv(io.BytesIO(_file_bytes))
+    return prepare_df(raw)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_labeled(data_key, min_cycle, max_cycle, rise_min, rise_days, search_days,
+                 window_half_width, force_one, _file_bytes=None):
+    full_df = load_prepared(data_key, _file_bytes)
+    menses_starts = infer_menses_starts(full_df, min_cycle, max_cycle)
+    return label_phases(
+        full_df,
+        menses_starts,
+        rise_min=rise_min,
+        rise_days=rise_days,
+        search_days=search_days,
+        window_half_width=window_half_width,
+        force_one_window_per_cycle=force_one
+    )
+
 # ---------------- UI ----------------
-st.markdown("Drop your Oura **daily** CSV and choose a 120-day window to visualize. We color-code phases using temperature_trend_deviation (or fallbacks).")
-
-with st.sidebar:
-    st.header("Detection settings")
-    rise_min = st.slider("Rise threshold (°C)", 0.1, 0.6, 0.25, 0.01)
-    rise_days = st.slider("Rise persistence (days)", 2, 5, 3, 1)
-    min_cycle = st.slider("Min cycle length", 18, 26, 21, 1)
-    max_cycle = st.slider("Max cycle length", 30, 60, 45, 1)
-    # NEW knobs
-    search_days = st.slider("Ovulation search window (cycle day range)", 6, 30, (8, 24))
-    window_half_width = st.slider("Ovulation window half-width (days)", 0, 3, 1)
-    force_one = st.checkbox("Guarantee one ovulation window per cycle", value=True)
-
-upl = st.file_uploader("Upload Oura CSV", type=["csv"])
-use_demo = st.checkbox("No CSV? Use demo data", value=False)
-
-if not use_demo and upl is None:
-    st.info("Upload a CSV or enable 'Use demo data'.")
-    st.stop()
-
-# Load/prepare data
-try:
+def main():
+    add_algorithm_path()
+    st.set_page_config(page_title="Romi Cycle Visualization", layout="wide")
+    st.title("Romi Cycle Visualization")
+
+    st.markdown("Drop your Oura **daily** CSV and choose a 120-day window to visualize. We color-code phases using temperature_trend_deviation (or fallbacks).")
+
+    with st.sidebar:
+        st.header("Detection settings")
+        rise_min = st.slider("Rise threshold (°C)", 0.1, 0.6, 0.25, 0.01)
+        rise_days = st.slider("Rise persistence (days)", 2, 5, 3, 1)
+        min_cycle = st.slider("Min cycle length", 18, 26, 21, 1)
+        max_cycle = st.slider("Max cycle length", 30, 60, 45, 1)
+        # NEW knobs
+        search_days = st.slider("Ovulation search window (cycle day range)", 6, 30, (8, 24))
+        window_half_width = st.slider("Ovulation window half-width (days)", 0, 3, 1)
+        force_one = st.checkbox("Guarantee one ovulation window per cycle", value=True)
+
+    upl = st.file_uploader("Upload Oura CSV", type=["csv"])
+    use_demo = st.checkbox("No CSV? Use demo data", value=False)
+
+    if not use_demo and upl is None:
+        st.info("Upload a CSV or enable 'Use demo data'.")
+        st.stop()
+
+    # Load/prepare data, then label phases once on the whole dataset (both cached)
     if use_demo:
-        dates = pd.date_range("2025-01-01", periods=200, freq="D")
-        base = np.sin(np.linspace(0, 4*np.pi, len(dates))) * 0.05
-        bump = np.zeros_like(base)
-        bump[60:63] += np.array([0.1, 0.25, 0.35])
-        bump[130:133] += np.array([0.08, 0.22, 0.33])
-        noise = np.random.randn(len(dates)) * 0.03
-        temp = base + bump + noise
-        raw = pd.DataFrame({"date": dates, "temperature_trend_deviation": temp})
+        data_key, file_bytes = DEMO_DATA_KEY, None
     else:
-        raw = pd.read_csv(upl)
-    full_df = prepare_df(raw)
-except Exception as e:
-    st.error(f"Failed to process CSV: {e}")
-    st.stop()
-
-# Label phases once on the whole dataset, then slice 120-day windows
-menses_starts = infer_menses_starts(full_df, min_cycle, max_cycle)
-labeled = label_phases(
-    full_df,
-    menses_starts,
-    rise_min=rise_min,
-    rise_days=rise_days,
-    search_days=search_days,
-    window_half_width=window_half_width,
-    force_one_window_per_cycle=force_one
-)
-
-# Window selection: pick a start date; we display 120 days from there
-unique_dates = labeled["date"].dt.date.unique()
-if len(unique_dates) < 2:
-    st.warning("Not enough data to visualize. Need at least a few days.")
-    st.stop()
-
-start_idx = st.slider("Choose start index (0 = first record) → shows 120 consecutive days", 0, max(0, len(unique_dates)-1), 0)
-start_date = unique_dates[start_idx]
-end_date = unique_dates[min(start_idx + 119, len(unique_dates)-1)]
-win_mask = labeled["date"].dt.date.between(start_date, end_date)
-df_win = labeled.loc[win_mask].copy()
-
-st.write(f"**Window:** {start_date} → {end_date} ({len(df_win)} days shown)")
-
-if df_win["temp_signal_c"].notna().sum() < 2:
-    st.info("Need at least two valid temperature points in this window to plot.")
-else:
-    fig = plot_static_matplotlib(df_win, title=f"Cycle view: {start_date} → {end_date}")
-    st.pyplot(fig, clear_figure=True)
-
-st.dataframe(df_win[["date","temp_signal_c","phase","ovulation_estimate","ovulation_confidence"]].tail(20), use_container_width=True, hide_index=True)
-st.caption("Static view only — no Vega-Lite/Altair, just Matplotlib. Not a medical device.")
+        file_bytes = upl.getvalue()
+        data_key = hashlib.sha256(file_bytes).hexdigest()
+
+    try:
+        labeled = load_labeled(
+            data_key, min_cycle, max_cycle, rise_min, rise_days, tuple(search_days),
+            window_half_width, force_one, _file_bytes=file_bytes
+        )
+    except Exception as e:
+        st.error(f"Failed to process CSV: {e}")
+        st.stop()
+
+    # Window selection: pick a start date; we display 120 days from there
+    unique_dates = labeled["date"].dt.date.unique()
+    if len(unique_dates) < 2:
+        st.warning("Not enough data to visualize. Need at least a few days.")
+        st.stop()
+
+    start_idx = st.slider("Choose start index (0 = first record) → shows 120 consecutive days", 0, max(0, len(unique_dates)-1), 0)
+    start_date = unique_dates[start_idx]
+    end_date = unique_dates[min(start_idx + 119, len(unique_dates)-1)]
+    # Rows are sorted by date (prepare_df), so the window is a positional slice
+    days = labeled["date"].dt.normalize()
+    lo = days.searchsorted(pd.Timestamp(start_date), side="left")
+    hi = days.searchsorted(pd.Timestamp(end_date), side="right")
+    df_win = labeled.iloc[lo:hi].copy()
+
+    st.write(f"**Window:** {start_date} → {end_date} ({len(df_win)} days shown)")
+
+    if df_win["temp_signal_c"].notna().sum() < 2:
+        st.info("Need at least two valid temperature points in this window to plot.")
+    else:
+        fig = plot_static_matplotlib(df_win, title=f"Cycle view: {start_date} → {end_date}")
+        st.pyplot(fig, clear_figure=True)
+
+    st.dataframe(df_win[["date","temp_signal_c","phase","ovulation_estimate","ovulation_confidence"]].tail(20), use_container_width=True, hide_index=True)
+    st.caption("Static view only — no Vega-Lite/Altair, just Matplotlib. Not a medical device.")
+
+
+# Streamlit runs the script as __main__; importing the module only defines the helpers
+if __name__ == "__main__":
+    main()